@@ -43,6 +43,7 @@ docker compose up -d --remove-orphans
 # 4) Run migrations & collectstatic (best-effort)
 echo "[deploy] Running migrate and collectstatic (best-effort)"
 docker compose exec -T backend python manage.py migrate --noinput || echo "[deploy] migrate may fail if backend not ready"
+docker compose exec -T backend python manage.py createcachetable || echo "[deploy] createcachetable may fail if backend not ready"
 docker compose exec -T backend python manage.py collectstatic --noinput || echo "[deploy] collectstatic done or not needed"
 
 echo "[deploy] Deployment finished."
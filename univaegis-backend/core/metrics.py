@@ -0,0 +1,150 @@
+"""
+Prometheus metrics for requests, pipeline stages and DB queries.
+
+- RequestTimingMiddleware (core/middleware.py) records every request by
+  method, URL route and status, and returns a Server-Timing header.
+- span() / timed() time a pipeline stage (rasterize, ocr, extract,
+  eligibility) into SPAN_LATENCY.
+- Every DB query is timed through a connection execute wrapper.
+
+Multi-process: with PROMETHEUS_MULTIPROC_DIR set, each process (gunicorn
+worker, OCR worker, PDF pool process) writes its samples to its own file
+in that directory, and render() merges them, so any worker can answer
+/metrics for the whole server. The directory must be empty at startup,
+see reset_multiprocess_dir(); gunicorn and the OCR worker each need
+their own.
+"""
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, Optional, Tuple
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Seconds; requests and OCR stages range from milliseconds to minutes
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+_QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by method, URL route and status code.",
+    ["method", "route", "status"],
+    buckets=_LATENCY_BUCKETS,
+)
+SPAN_LATENCY = Histogram(
+    "span_duration_seconds",
+    "Time spent in a pipeline stage (rasterize, ocr, extract, eligibility).",
+    ["span"],
+    buckets=_LATENCY_BUCKETS,
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds",
+    "Database query latency by connection alias.",
+    ["alias"],
+    buckets=_QUERY_BUCKETS,
+)
+
+# Per-request totals ({"db": seconds, "ocr": seconds, ...}) for the
+# Server-Timing header; None outside a request (workers, commands).
+request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+
+def _record(name: str, elapsed: float) -> None:
+    timings = request_timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + elapsed
+
+
+@contextmanager
+def span(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        SPAN_LATENCY.labels(name).observe(elapsed)
+        _record(name, elapsed)
+
+
+def timed(name: str):
+    """
+    Decorator form of span().
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _time_query(execute, sql, params, many, context):
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        DB_QUERY_LATENCY.labels(context["connection"].alias).observe(elapsed)
+        _record("db", elapsed)
+
+
+@receiver(connection_created)
+def _instrument_connection(sender, connection, **kwargs):
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+def is_multiprocess() -> bool:
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def reset_multiprocess_dir() -> None:
+    """
+    Empty PROMETHEUS_MULTIPROC_DIR. Call once in the parent process
+    before any child starts: files left by a previous run would
+    otherwise be merged into /metrics as if those processes were alive.
+    """
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def registry() -> CollectorRegistry:
+    if not is_multiprocess():
+        return REGISTRY
+    merged = CollectorRegistry()
+    multiprocess.MultiProcessCollector(merged)
+    return merged
+
+
+def render() -> Tuple[bytes, str]:
+    """
+    Text exposition of all metrics, and its content type.
+    """
+    return generate_latest(registry()), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int) -> None:
+    """
+    Call from the parent when a child process exits (gunicorn worker,
+    OCR worker), so its live gauges are dropped. Histograms are kept.
+    """
+    if is_multiprocess():
+        multiprocess.mark_process_dead(pid)
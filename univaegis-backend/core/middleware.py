@@ -0,0 +1,90 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import metrics
+
+
+class RequestTimingMiddleware:
+    """
+    Times every request into the http_request_duration_seconds histogram
+    (labelled with the URL route, e.g. "api/documents/jobs/<int:pk>/",
+    not the raw path) and adds a Server-Timing header with the total and
+    the per-stage breakdown (db, ocr, extract, ...) of this request.
+
+    Keep it first in MIDDLEWARE so the total covers the whole stack.
+    Works sync (WSGI) and async (ASGI).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = {}
+        token = metrics.request_timings.set(timings)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.request_timings.reset(token)
+        return self._finish(request, response, timings, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        timings = {}
+        token = metrics.request_timings.set(timings)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.request_timings.reset(token)
+        return self._finish(request, response, timings, time.perf_counter() - start)
+
+    def _finish(self, request, response, timings, elapsed):
+        match = getattr(request, "resolver_match", None)
+        route = match.route if match else "unmatched"
+        metrics.REQUEST_LATENCY.labels(request.method, route, str(response.status_code)).observe(elapsed)
+
+        parts = [f"total;dur={elapsed * 1000:.1f}"]
+        parts += [f"{name};dur={seconds * 1000:.1f}" for name, seconds in sorted(timings.items())]
+        response["Server-Timing"] = ", ".join(parts)
+        return response
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise, usable under ASGI too. WhiteNoiseMiddleware is sync-only,
+    and one sync middleware makes Django run every ASGI request's whole
+    chain in a thread; serving a static file only needs a dict lookup.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        static_file = self._static_file(request)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+    def _static_file(self, request):
+        if self.autorefresh:
+            return self.find_file(request.path_info)
+        return self.files.get(request.path_info)
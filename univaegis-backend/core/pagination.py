@@ -0,0 +1,104 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+
+Rows are ordered newest first on (timestamp, id) and the cursor is the
+(timestamp, id) of the last row served, so the next page is an index
+range scan starting right after it: page 1000 costs the same as page 1,
+unlike OFFSET, which reads and discards every earlier row.
+"""
+import json
+import base64
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers, status
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def get_page_size() -> int:
+    return getattr(settings, "API_PAGE_SIZE", 50)
+
+
+def get_max_page_size() -> int:
+    return getattr(settings, "API_MAX_PAGE_SIZE", 200)
+
+
+class KeysetPagination:
+    """
+    paginate_queryset() returns one page of `queryset` (ordered by
+    -timestamp_field, -id); get_paginated_response() wraps it with the
+    cursor and URL of the next page (None on the last page).
+
+    The queryset should be backed by an index on (timestamp_field, id),
+    possibly after equality filters, e.g. (doc_type, uploaded_at, id).
+    """
+
+    cursor_param = "cursor"
+    page_size_param = "page_size"
+
+    def __init__(self, timestamp_field: str):
+        self.timestamp_field = timestamp_field
+        self.next_cursor: Optional[str] = None
+        self.request = None
+
+    def encode_cursor(self, row) -> str:
+        position = [getattr(row, self.timestamp_field).isoformat(), row.pk]
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def decode_cursor(self, cursor: str):
+        try:
+            timestamp, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            timestamp = parse_datetime(timestamp)
+            pk = int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            timestamp = None
+        if timestamp is None:
+            raise serializers.ValidationError({self.cursor_param: ["Invalid cursor."]})
+        return timestamp, pk
+
+    def get_page_size(self, request) -> int:
+        try:
+            size = int(request.query_params.get(self.page_size_param, get_page_size()))
+        except ValueError:
+            raise serializers.ValidationError({self.page_size_param: ["Must be an integer."]})
+        return min(max(size, 1), get_max_page_size())
+
+    def paginate_queryset(self, queryset, request) -> List[Any]:
+        """
+        Raises serializers.ValidationError for a bad cursor or page size.
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(f"-{self.timestamp_field}", "-id")
+
+        cursor = request.query_params.get(self.cursor_param)
+        if cursor:
+            timestamp, pk = self.decode_cursor(cursor)
+            # (ts, id) < (timestamp, pk); the redundant <= bounds the index range scan
+            queryset = queryset.filter(**{f"{self.timestamp_field}__lte": timestamp}).exclude(
+                **{self.timestamp_field: timestamp, "id__gte": pk}
+            )
+
+        # One extra row tells whether there is a next page
+        rows = list(queryset[: page_size + 1])
+        page = rows[:page_size]
+        self.next_cursor = self.encode_cursor(page[-1]) if len(rows) > page_size else None
+        return page
+
+    def get_next_link(self) -> Optional[str]:
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_param, self.next_cursor)
+
+    def get_paginated_response(self, data: List[Dict[str, Any]]) -> Response:
+        return Response(
+            {
+                "success": True,
+                "results": data,
+                "next_cursor": self.next_cursor,
+                "next": self.get_next_link(),
+            },
+            status=status.HTTP_200_OK,
+        )
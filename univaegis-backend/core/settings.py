@@ -53,9 +53,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.RequestTimingMiddleware",  # first, so its timing covers everything below
     'django.middleware.security.SecurityMiddleware',
     "corsheaders.middleware.CorsMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "core.middleware.StaticFilesMiddleware",  # WhiteNoise, async-capable
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -177,3 +178,89 @@ REST_FRAMEWORK = {
 }
 
 
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Shared by all processes (upload rate limits, core/throttling.py)
+    "throttle": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "django_cache_throttle",
+    },
+}
+
+
+# OCR job queue (documents/jobs.py, run workers with `python manage.py ocr_worker`)
+OCR_WORKER_CONCURRENCY = int(os.getenv("OCR_WORKER_CONCURRENCY", "2"))
+OCR_QUEUE_POLL_INTERVAL = float(os.getenv("OCR_QUEUE_POLL_INTERVAL", "1.0"))
+OCR_JOB_MAX_ATTEMPTS = int(os.getenv("OCR_JOB_MAX_ATTEMPTS", "3"))
+# A running job is refreshed every heartbeat interval, and requeued once it
+# has gone OCR_JOB_STALE_AFTER seconds without one (keep that several intervals)
+OCR_JOB_HEARTBEAT_INTERVAL = float(os.getenv("OCR_JOB_HEARTBEAT_INTERVAL", "30"))  # seconds
+OCR_JOB_STALE_AFTER = int(os.getenv("OCR_JOB_STALE_AFTER", "120"))  # seconds
+
+# PDF OCR: rasterization DPI and number of processes OCR'ing pages in parallel
+OCR_PDF_DPI = int(os.getenv("OCR_PDF_DPI", "200"))
+OCR_PDF_WORKERS = int(os.getenv("OCR_PDF_WORKERS", "1"))
+# Pages rasterized per pdftoppm call; peak memory is about this many page bitmaps
+OCR_PDF_PAGE_WINDOW = int(os.getenv("OCR_PDF_PAGE_WINDOW", "1"))
+# Documents above these limits are rejected instead of OOM-killing the worker
+OCR_MAX_PDF_PAGES = int(os.getenv("OCR_MAX_PDF_PAGES", "100"))
+OCR_MAX_IMAGE_PIXELS = int(os.getenv("OCR_MAX_IMAGE_PIXELS", "60000000"))
+# Use the embedded PDF text layer (PyPDF2) and only OCR pages without usable text
+OCR_PDF_TEXT_LAYER = os.getenv("OCR_PDF_TEXT_LAYER", "True") == "True"
+OCR_TEXT_LAYER_MIN_CHARS = int(os.getenv("OCR_TEXT_LAYER_MIN_CHARS", "20"))
+# Reuse OCR results for re-uploads of identical files (keyed on SHA-256 + engine version + DPI)
+OCR_CACHE_ENABLED = os.getenv("OCR_CACHE_ENABLED", "True") == "True"
+# Image preprocessing before Tesseract (documents/preprocessing.py)
+OCR_PREPROCESS_ENABLED = os.getenv("OCR_PREPROCESS_ENABLED", "True") == "True"
+OCR_TARGET_TEXT_HEIGHT = int(os.getenv("OCR_TARGET_TEXT_HEIGHT", "32"))  # px per text line
+OCR_DESKEW = os.getenv("OCR_DESKEW", "True") == "True"
+OCR_CROP_BORDER = os.getenv("OCR_CROP_BORDER", "True") == "True"
+OCR_BINARIZE = os.getenv("OCR_BINARIZE", "True") == "True"
+# "tesserocr" (in-process engine kept per worker, needs `pip install tesserocr`),
+# "pytesseract" (tesseract subprocess per page) or "auto" (tesserocr if installed)
+OCR_BACKEND = os.getenv("OCR_BACKEND", "auto")
+# Most files accepted by POST /api/documents/batch-upload/; a batch costs one OCR_UPLOAD_BURST
+# token per file and bigger batches than the bucket are refused, so keep it <= OCR_UPLOAD_BURST
+DOCUMENT_BATCH_MAX_FILES = int(os.getenv("DOCUMENT_BATCH_MAX_FILES", "20"))
+# Resumable chunked uploads (POST /api/documents/uploads/)
+DOCUMENT_UPLOAD_MAX_SIZE = int(os.getenv("DOCUMENT_UPLOAD_MAX_SIZE", str(200 * 1024 * 1024)))
+DOCUMENT_UPLOAD_MAX_CHUNK = int(os.getenv("DOCUMENT_UPLOAD_MAX_CHUNK", str(16 * 1024 * 1024)))
+# Seconds one request may spend writing a chunk before another may take the upload over
+DOCUMENT_UPLOAD_LEASE = int(os.getenv("DOCUMENT_UPLOAD_LEASE", "300"))
+# Open uploads untouched this long expire (`manage.py cleanup_uploads` deletes them)
+DOCUMENT_UPLOAD_SESSION_TTL = int(os.getenv("DOCUMENT_UPLOAD_SESSION_TTL", str(24 * 60 * 60)))
+# Most (document, IELTS scores) pairs accepted by POST /api/eligibility/batch-check/
+ELIGIBILITY_BATCH_MAX_CHECKS = int(os.getenv("ELIGIBILITY_BATCH_MAX_CHECKS", "5000"))
+# Largest threshold grid (number of combinations) POST /api/eligibility/sweep/ evaluates
+ELIGIBILITY_SWEEP_MAX_COMBINATIONS = int(os.getenv("ELIGIBILITY_SWEEP_MAX_COMBINATIONS", "10000"))
+# How often each process reloads eligibility rule sets from the DB (seconds)
+ELIGIBILITY_RULES_REFRESH_SECONDS = float(os.getenv("ELIGIBILITY_RULES_REFRESH_SECONDS", "30"))
+# Per-process LRU of recent eligibility check fingerprints (repeat checks skip the DB)
+ELIGIBILITY_CHECK_LRU_SIZE = int(os.getenv("ELIGIBILITY_CHECK_LRU_SIZE", "2048"))
+# Keyset-paginated list endpoints (GET /api/documents/, /api/eligibility/checks/)
+API_PAGE_SIZE = int(os.getenv("API_PAGE_SIZE", "50"))
+API_MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", "200"))
+# Most results GET /api/documents/search/ returns (ranked full-text search, Postgres only)
+DOCUMENT_SEARCH_MAX_RESULTS = int(os.getenv("DOCUMENT_SEARCH_MAX_RESULTS", "100"))
+# Deep /health/ check results (DB, tesseract, poppler) are reused for this many seconds
+HEALTH_CACHE_SECONDS = float(os.getenv("HEALTH_CACHE_SECONDS", "10"))
+# In-process OCR pool of the async upload endpoint (POST /api/documents/async/upload/, ASGI):
+# processes, and uploads admitted at once (running + waiting) before new ones get 429
+OCR_EXECUTOR_WORKERS = int(os.getenv("OCR_EXECUTOR_WORKERS", "2"))
+OCR_EXECUTOR_MAX_PENDING = int(os.getenv("OCR_EXECUTOR_MAX_PENDING", "8"))
+# Admission control for OCR (documents/admission.py, core/throttling.py):
+# documents OCRed at once across all processes (Postgres advisory locks; flock files elsewhere),
+# queued jobs before uploads get 429, and a per-client (user or IP) token bucket on the upload
+# endpoints: OCR_UPLOAD_RATE documents/second sustained, bursts of OCR_UPLOAD_BURST. 0 disables each.
+OCR_MAX_CONCURRENT = int(os.getenv("OCR_MAX_CONCURRENT", "4"))
+OCR_MAX_QUEUED_JOBS = int(os.getenv("OCR_MAX_QUEUED_JOBS", "500"))
+OCR_UPLOAD_RATE = float(os.getenv("OCR_UPLOAD_RATE", "0.5"))
+OCR_UPLOAD_BURST = int(os.getenv("OCR_UPLOAD_BURST", "20"))
+# Cache holding the token buckets. It must be shared by every server process for the limit to
+# be per client: "throttle" is a database cache (`manage.py createcachetable`). Pointing it at
+# a local-memory cache makes the limit per process, i.e. multiplied by the gunicorn workers.
+OCR_THROTTLE_CACHE = os.getenv("OCR_THROTTLE_CACHE", "throttle")
+# Lock files of the non-Postgres OCR slot stand-in (default: <tmp>/univaegis-ocr-slots)
+OCR_SLOT_LOCK_DIR = os.getenv("OCR_SLOT_LOCK_DIR", "")
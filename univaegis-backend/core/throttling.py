@@ -0,0 +1,141 @@
+"""
+Token-bucket rate limiting for DRF views.
+
+Each client (user id when authenticated, else IP address as seen by DRF,
+honouring NUM_PROXIES) has a bucket of OCR_UPLOAD_BURST tokens that
+refills at OCR_UPLOAD_RATE per second. A request spends one token per
+document it submits, so a client can burst up to the bucket size and is
+then held to the sustained rate; anything over gets 429 with a
+Retry-After of when enough tokens will be back. A request for more
+documents than the bucket holds always gets 429 (without Retry-After).
+
+Buckets live in the Django cache named by OCR_THROTTLE_CACHE, by default
+a database cache shared by every server process, and each update holds
+a per-bucket lock taken with cache.add(), so concurrent requests of one
+client can't both spend the same tokens. Pointed at a local-memory cache
+instead, every gunicorn worker keeps its own buckets and a client's
+effective limit is multiplied by the number of workers.
+"""
+import math
+import time
+from contextlib import contextmanager
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+
+def get_upload_rate() -> float:
+    """
+    Sustained documents per second per client; 0 disables the throttle.
+    """
+    return getattr(settings, "OCR_UPLOAD_RATE", 0.5)
+
+
+def get_upload_burst() -> int:
+    return getattr(settings, "OCR_UPLOAD_BURST", 20)
+
+
+def get_throttle_cache():
+    return caches[getattr(settings, "OCR_THROTTLE_CACHE", "default")]
+
+
+class TokenBucket:
+    """
+    take() is a read-modify-write on the cache under a lock key: add() is
+    atomic on the shared cache backends (database, Redis, memcached). A
+    lock left by a crashed request expires after LOCK_TIMEOUT seconds.
+    """
+
+    LOCK_TIMEOUT = 1
+    # How long to wait for another request of the same client to finish its update
+    LOCK_WAIT = 0.5
+
+    def __init__(self, rate: float, capacity: int, cache=None, prefix: str = "bucket"):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.cache = cache if cache is not None else get_throttle_cache()
+        self.prefix = prefix
+
+    def take(self, key: str, tokens: int = 1, now: Optional[float] = None) -> Tuple[bool, Optional[float]]:
+        """
+        Spend `tokens` from key's bucket: (allowed, seconds until they would be).
+        More tokens than the bucket holds are never allowed: (False, None).
+        """
+        tokens = max(1, tokens)
+        if tokens > self.capacity:
+            return False, None
+        cache_key = f"{self.prefix}:{key}"
+
+        with self._locked(cache_key) as locked:
+            if not locked:
+                # The client's other requests hold its bucket; treat as over the limit
+                return False, float(self.LOCK_TIMEOUT)
+            now = time.time() if now is None else now
+            level, updated_at = self.cache.get(cache_key, (float(self.capacity), now))
+            level = min(float(self.capacity), level + (now - updated_at) * self.rate)
+            allowed = level >= tokens
+            if allowed:
+                level -= tokens
+            # Kept until the bucket would be full again; an expired key is a full bucket
+            self.cache.set(cache_key, (level, now), timeout=math.ceil(self.capacity / self.rate) + 1)
+        return allowed, 0.0 if allowed else (tokens - level) / self.rate
+
+    @contextmanager
+    def _locked(self, cache_key: str):
+        lock_key = f"{cache_key}:lock"
+        deadline = time.monotonic() + self.LOCK_WAIT
+        while not self.cache.add(lock_key, 1, timeout=self.LOCK_TIMEOUT):
+            if time.monotonic() >= deadline:
+                yield False
+                return
+            time.sleep(0.01)
+        try:
+            yield True
+        finally:
+            self.cache.delete(lock_key)
+
+
+class OCRUploadRateThrottle(BaseThrottle):
+    """
+    Per-client token bucket on the endpoints that queue OCR. Every request
+    is charged one token before its body is read, so a throttled client
+    doesn't get its upload parsed and spooled to disk. Views that queue
+    several documents charge the rest with settle() once the body is
+    parsed and the count is known (batch uploads).
+    """
+
+    def __init__(self):
+        self.wait_seconds: Optional[float] = None
+
+    def get_ident_key(self, request) -> str:
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            return f"user:{user.pk}"
+        return f"ip:{self.get_ident(request)}"
+
+    def _take(self, request, tokens: int) -> bool:
+        rate = get_upload_rate()
+        if rate <= 0:
+            return True
+        bucket = TokenBucket(rate, get_upload_burst(), prefix="ocr-upload")
+        allowed, self.wait_seconds = bucket.take(self.get_ident_key(request), tokens)
+        return allowed
+
+    def allow_request(self, request, view) -> bool:
+        return self._take(request, 1)
+
+    def settle(self, request, documents: int) -> bool:
+        """
+        Charge the rest of a request that queues `documents` documents (one
+        token was spent by allow_request). False means 429, see wait();
+        more documents than the bucket holds are always refused.
+        """
+        if documents > get_upload_burst() and get_upload_rate() > 0:
+            self.wait_seconds = None
+            return False
+        return documents <= 1 or self._take(request, documents - 1)
+
+    def wait(self) -> Optional[float]:
+        return self.wait_seconds
@@ -18,14 +18,15 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from core.views import health_check 
+from core.views import health_check, metrics_view
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api-auth/", include("rest_framework.urls")),  # DRF login/logout for browsable API
 
     path("api/", include("core.api_urls")),  # Core API routes
-    path("health/", health_check),  # Health check endpoint
+    path("health/", health_check),  # Readiness check (DB, tesseract, poppler), cached
+    path("metrics", metrics_view),  # Prometheus scrape endpoint
 ]
 
 if settings.DEBUG:
@@ -1,4 +1,82 @@
-from django.http import JsonResponse
+import time
+import shutil
+import threading
+
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse, JsonResponse
+
+from . import metrics
+
+_health_lock = threading.Lock()
+_health_cache = {"checked_at": 0.0, "checks": None}
+
+
+def get_health_cache_seconds() -> float:
+    return getattr(settings, "HEALTH_CACHE_SECONDS", 10.0)
+
+
+def _check_database() -> str:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+    return "ok"
+
+
+def _check_tesseract() -> str:
+    from documents.utils import get_ocr_backend
+
+    backend = get_ocr_backend()
+    return f"ok ({backend.name} {backend.tesseract_version()})"
+
+
+def _check_poppler() -> str:
+    from documents.utils import get_poppler_path
+
+    if not shutil.which("pdftoppm", path=get_poppler_path() or None):
+        raise RuntimeError("pdftoppm not found")
+    return "ok"
+
+
+HEALTH_CHECKS = {
+    "database": _check_database,
+    "tesseract": _check_tesseract,
+    "poppler": _check_poppler,
+}
+
+
+def run_health_checks():
+    """
+    {name: "ok ..." | "error: ..."} for every dependency. Results are
+    reused for HEALTH_CACHE_SECONDS, so frequent probes cost a dict lookup.
+    """
+    with _health_lock:
+        stale = time.monotonic() - _health_cache["checked_at"] > get_health_cache_seconds()
+        if _health_cache["checks"] is None or stale:
+            checks = {}
+            for name, check in HEALTH_CHECKS.items():
+                try:
+                    checks[name] = check()
+                except Exception as e:
+                    checks[name] = f"error: {e}"
+            _health_cache.update(checked_at=time.monotonic(), checks=checks)
+        return _health_cache["checks"]
+
 
 def health_check(request):
-    return JsonResponse({"status": "ok"})
+    """
+    Readiness: 200 when the DB, tesseract and poppler are all usable, else 503.
+    """
+    checks = run_health_checks()
+    healthy = all(result.startswith("ok") for result in checks.values())
+    return JsonResponse(
+        {"status": "ok" if healthy else "unavailable", "checks": checks},
+        status=200 if healthy else 503,
+    )
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint (all processes when PROMETHEUS_MULTIPROC_DIR is set).
+    """
+    body, content_type = metrics.render()
+    return HttpResponse(body, content_type=content_type)
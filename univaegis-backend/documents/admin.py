@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Document
+from .models import Document, OCRJob, UploadSession
 
 
 @admin.register(Document)
@@ -7,3 +7,15 @@ class DocumentAdmin(admin.ModelAdmin):
     list_display = ("id", "original_filename", "doc_type", "uploaded_at")
     list_filter = ("doc_type", "uploaded_at")
     search_fields = ("original_filename",)
+
+
+@admin.register(OCRJob)
+class OCRJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "document", "status", "attempts", "created_at", "finished_at")
+    list_filter = ("status",)
+
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ("id", "original_filename", "doc_type", "received", "size", "status", "updated_at")
+    list_filter = ("status",)
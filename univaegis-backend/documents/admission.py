@@ -0,0 +1,201 @@
+"""
+Admission control for OCR work.
+
+- OCR slots: at most OCR_MAX_CONCURRENT documents are OCRed at once
+  across every process (ocr_worker processes on any host, and the ASGI
+  servers' in-process pools). On Postgres a slot is a session advisory
+  lock, held on one dedicated connection per process, so a crashed
+  process frees its slots when the connection drops. Elsewhere (sqlite in development) the
+  stand-in is an flock()ed file per slot, shared by the processes of one
+  host.
+- OCRQueueThrottle: uploads are refused with 429 once
+  OCR_MAX_QUEUED_JOBS jobs are waiting, instead of accepting work the
+  workers won't reach for a long time.
+"""
+import os
+import math
+import fcntl
+import tempfile
+import threading
+from typing import Optional
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.db.models import Avg, F
+from rest_framework.throttling import BaseThrottle
+
+from .models import OCRJob
+
+# First key of the two-int advisory lock form, so our locks can't collide
+# with other users of pg_advisory_lock (b"OCR\0" as an int)
+ADVISORY_LOCK_CLASS = 0x4F435200
+
+# Retry-After estimate when no job has finished yet
+DEFAULT_JOB_SECONDS = 10.0
+
+
+def get_max_concurrent() -> int:
+    """
+    0 disables the limit.
+    """
+    return getattr(settings, "OCR_MAX_CONCURRENT", 4)
+
+
+def get_max_queued() -> int:
+    """
+    0 disables the limit.
+    """
+    return getattr(settings, "OCR_MAX_QUEUED_JOBS", 500)
+
+
+def get_slot_lock_dir() -> str:
+    return getattr(settings, "OCR_SLOT_LOCK_DIR", "") or os.path.join(tempfile.gettempdir(), "univaegis-ocr-slots")
+
+
+class Slot:
+    def release(self) -> None:
+        pass
+
+
+class _AdvisoryLockSlot(Slot):
+    def __init__(self, locks: "_AdvisoryLocks", number: int):
+        self.locks = locks
+        self.number = number
+
+    def release(self) -> None:
+        self.locks.release(self.number)
+
+
+class _AdvisoryLocks:
+    """
+    The advisory locks this process holds, all on one connection. A
+    session may take the same advisory lock twice, so the slot numbers
+    held here are tracked and skipped.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+        self._held = set()
+
+    def _get_connection(self):
+        if self._pid != os.getpid():
+            # Forked: the parent's connection and locks aren't ours
+            self._connection, self._pid, self._held = None, os.getpid(), set()
+        if self._connection is None:
+            # Not the thread's own connection, which Django may close or hand
+            # to other code; slots are taken and released from any thread
+            self._connection = connections.create_connection("default")
+            self._connection.inc_thread_sharing()
+        return self._connection
+
+    def _reset(self) -> None:
+        # A broken session has lost its locks too
+        connection, self._connection = self._connection, None
+        self._held.clear()
+        if connection is not None:
+            connection.close()
+
+    def _try_lock(self, limit: int) -> Optional[Slot]:
+        with self._get_connection().cursor() as cursor:
+            for number in range(limit):
+                if number in self._held:
+                    continue
+                cursor.execute("SELECT pg_try_advisory_lock(%s, %s)", [ADVISORY_LOCK_CLASS, number])
+                if cursor.fetchone()[0]:
+                    self._held.add(number)
+                    return _AdvisoryLockSlot(self, number)
+        return None
+
+    def acquire(self, limit: int) -> Optional[Slot]:
+        with self._lock:
+            try:
+                return self._try_lock(limit)
+            except DatabaseError:
+                # e.g. the server closed the idle connection: once more on a new one
+                self._reset()
+                return self._try_lock(limit)
+
+    def release(self, number: int) -> None:
+        with self._lock:
+            if number not in self._held:
+                return
+            self._held.discard(number)
+            try:
+                with self._connection.cursor() as cursor:
+                    cursor.execute("SELECT pg_advisory_unlock(%s, %s)", [ADVISORY_LOCK_CLASS, number])
+            except DatabaseError:
+                self._reset()
+
+
+_advisory_locks = _AdvisoryLocks()
+
+
+class _FileLockSlot(Slot):
+    def __init__(self, fd: int):
+        self.fd = fd
+
+    def release(self) -> None:
+        os.close(self.fd)  # drops the flock
+
+
+def _try_file_lock(limit: int) -> Optional[Slot]:
+    directory = get_slot_lock_dir()
+    os.makedirs(directory, exist_ok=True)
+    for number in range(limit):
+        fd = os.open(os.path.join(directory, f"slot-{number}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            continue
+        return _FileLockSlot(fd)
+    return None
+
+
+def try_acquire_ocr_slot() -> Optional[Slot]:
+    """
+    A free OCR slot, or None if all OCR_MAX_CONCURRENT are taken. Never
+    blocks. Call release() on the slot when the OCR is done.
+    """
+    limit = get_max_concurrent()
+    if limit <= 0:
+        return Slot()
+    if connections["default"].vendor == "postgresql":
+        return _advisory_locks.acquire(limit)
+    return _try_file_lock(limit)
+
+
+def average_job_seconds(sample: int = 50) -> float:
+    """
+    Mean run time of the last `sample` finished jobs.
+    """
+    recent = OCRJob.objects.filter(status=OCRJob.STATUS_DONE, started_at__isnull=False).order_by("-id")[:sample]
+    average = OCRJob.objects.filter(pk__in=recent.values("pk")).aggregate(
+        duration=Avg(F("finished_at") - F("started_at"))
+    )["duration"]
+    return average.total_seconds() if average else DEFAULT_JOB_SECONDS
+
+
+class OCRQueueThrottle(BaseThrottle):
+    """
+    Refuses uploads while the OCR queue is at OCR_MAX_QUEUED_JOBS.
+    Retry-After is roughly how long the workers need to get one job below
+    the limit again.
+    """
+
+    def __init__(self):
+        self.backlog = 0
+
+    def allow_request(self, request, view) -> bool:
+        limit = get_max_queued()
+        if limit <= 0:
+            return True
+        # Counting stops at the limit: an index range scan of bounded size
+        self.backlog = OCRJob.objects.filter(status=OCRJob.STATUS_QUEUED)[:limit].count()
+        return self.backlog < limit
+
+    def wait(self) -> Optional[float]:
+        parallel = get_max_concurrent() or getattr(settings, "OCR_WORKER_CONCURRENCY", 2)
+        return max(1.0, math.ceil(average_job_seconds() / max(1, parallel)))
@@ -0,0 +1,212 @@
+"""
+Synthetic document corpus for OCR benchmarks.
+
+Renders academic / financial documents with known field values, so OCR
+speed and extraction accuracy can be measured without real applicant data
+or network access. Variants simulate the inputs we actually receive:
+clean scans, small low-resolution scans and large skewed phone photos.
+
+write_corpus() stores the corpus as PNG and multi-page PDF files, and
+measure() / summarize() turn timings into the latency / throughput /
+peak RSS figures reported by `manage.py benchmark`.
+"""
+import time
+import resource
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+ACADEMIC_SAMPLES: List[Dict[str, Any]] = [
+    {"student_name": "Priya Sharma", "university": "Delhi University", "course": "BSc Computer Science",
+     "percentage": 86.5, "year_of_passing": 2021},
+    {"student_name": "Rahul Verma", "university": "Pune University", "course": "BCom Accounting",
+     "percentage": 78.0, "year_of_passing": 2019},
+]
+
+FINANCIAL_SAMPLES: List[Dict[str, Any]] = [
+    {"bank_name": "State Bank of India", "account_holder": "Priya Sharma", "available_balance": 1250000.0,
+     "date": "15/03/2024"},
+    {"bank_name": "HDFC Bank", "account_holder": "Rahul Verma", "available_balance": 482310.55,
+     "date": "02/11/2023"},
+]
+
+# name -> (scale, skew degrees, dark border px, noise sigma)
+VARIANTS: Dict[str, Tuple[float, float, int, float]] = {
+    "scan": (1.0, 0.0, 0, 0.0),
+    "small_scan": (0.6, 0.0, 0, 0.0),
+    "phone_photo": (3.0, 2.5, 120, 12.0),
+}
+
+# Letter-size page at 150 DPI
+PAGE_SIZE = (1275, 1650)
+
+
+def document_lines(doc_type: str, fields: Dict[str, Any]) -> List[str]:
+    if doc_type == "academic":
+        return [
+            "CERTIFICATE OF ACADEMIC RECORD",
+            "",
+            f"Name: {fields['student_name']}",
+            f"University: {fields['university']}",
+            f"Course: {fields['course']}",
+            f"Percentage: {fields['percentage']}%",
+            f"Year of Passing: {fields['year_of_passing']}",
+        ]
+    return [
+        fields["bank_name"],
+        "STATEMENT OF ACCOUNT",
+        "",
+        f"Account Holder: {fields['account_holder']}",
+        f"Available Balance: {fields['available_balance']:,.2f}",
+        f"Statement Date: {fields['date']}",
+    ]
+
+
+def render_page(lines: List[str], font_size: int = 28, page_size: Tuple[int, int] = PAGE_SIZE) -> Image.Image:
+    page = Image.new("L", page_size, 255)
+    draw = ImageDraw.Draw(page)
+    font = ImageFont.load_default(size=font_size)
+    y = page_size[1] // 10
+    for line in lines:
+        draw.text((page_size[0] // 10, y), line, font=font, fill=0)
+        y += int(font_size * 1.8)
+    return page
+
+
+def apply_variant(page: Image.Image, variant: str, seed: int = 0) -> Image.Image:
+    """
+    Degrade a clean page the way a scanner or phone camera would.
+    """
+    scale, skew, border, noise = VARIANTS[variant]
+    image = page
+    if skew:
+        image = image.rotate(skew, resample=Image.BICUBIC, expand=True, fillcolor=255)
+    if border:
+        image = ImageOps.expand(image, border=border, fill=30)
+    if scale != 1.0:
+        image = image.resize((round(image.width * scale), round(image.height * scale)), Image.BICUBIC)
+    if noise:
+        rng = np.random.default_rng(seed)
+        arr = np.asarray(image, dtype=np.float32) + rng.normal(0.0, noise, (image.height, image.width))
+        image = Image.fromarray(np.clip(arr, 0, 255).astype(np.uint8))
+    return image
+
+
+def synthetic_corpus(variants: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield {"name", "doc_type", "image", "expected"} for every sample x variant.
+    Deterministic, so results are comparable across runs.
+    """
+    samples = [("academic", s) for s in ACADEMIC_SAMPLES] + [("financial", s) for s in FINANCIAL_SAMPLES]
+    for variant in variants or list(VARIANTS):
+        for i, (doc_type, fields) in enumerate(samples):
+            page = render_page(document_lines(doc_type, fields))
+            yield {
+                "name": f"{doc_type}-{i}-{variant}",
+                "doc_type": doc_type,
+                "image": apply_variant(page, variant, seed=i),
+                "expected": fields,
+            }
+
+
+def field_accuracy(expected: Dict[str, Any], extracted: Dict[str, Any]) -> Tuple[int, int]:
+    """
+    (correct, total) over the expected fields. Strings compare
+    case-insensitively, numbers with a small tolerance.
+    """
+    correct = 0
+    for key, want in expected.items():
+        got = extracted.get(key)
+        if isinstance(want, (int, float)) and isinstance(got, (int, float)):
+            correct += abs(want - got) < 0.01
+        elif got is not None and str(want).strip().lower() == str(got).strip().lower():
+            correct += 1
+    return correct, len(expected)
+
+
+def write_corpus(
+    directory: Path,
+    variants: Optional[List[str]] = None,
+    pdf_pages: Iterable[int] = (1, 5),
+) -> List[Dict[str, Any]]:
+    """
+    Write every sample as a PNG per variant, and as an image-only PDF of
+    each page count in `pdf_pages` (the "scan" page repeated, so every
+    page needs OCR). Returns [{"name", "doc_type", "path", "format",
+    "pages", "bytes", "expected"}].
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    files = []
+
+    def add(item, path, fmt, pages):
+        files.append(
+            {
+                "name": path.stem,
+                "doc_type": item["doc_type"],
+                "path": str(path),
+                "format": fmt,
+                "pages": pages,
+                "bytes": path.stat().st_size,
+                "expected": item["expected"],
+            }
+        )
+
+    for item in synthetic_corpus(variants):
+        path = directory / f"{item['name']}.png"
+        item["image"].save(path)
+        add(item, path, "png", 1)
+
+    for item in synthetic_corpus(["scan"]):
+        for pages in pdf_pages:
+            path = directory / f"{item['name']}-{pages}p.pdf"
+            extra_pages = [item["image"]] * (pages - 1)
+            item["image"].save(path, "PDF", resolution=150.0, save_all=True, append_images=extra_pages)
+            add(item, path, "pdf", pages)
+    return files
+
+
+def peak_rss_mb() -> Dict[str, float]:
+    """
+    High-water resident set size so far (Linux reports KiB), for this
+    process and for its waited-for children (PDF pool processes).
+    It never goes down, so compare benchmarks that ran in the same order.
+    """
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return {"self": round(own / 1024, 1), "children": round(children / 1024, 1)}
+
+
+def summarize(latencies: List[float], wall_seconds: float) -> Dict[str, Any]:
+    """
+    Throughput and latency percentiles (ms) of one benchmark.
+    """
+    ms = np.array(latencies, dtype=np.float64) * 1000
+    return {
+        "count": len(latencies),
+        "throughput_per_s": round(len(latencies) / wall_seconds, 3) if wall_seconds else None,
+        "p50_ms": round(float(np.percentile(ms, 50)), 3) if len(ms) else None,
+        "p95_ms": round(float(np.percentile(ms, 95)), 3) if len(ms) else None,
+        "mean_ms": round(float(ms.mean()), 3) if len(ms) else None,
+        "max_ms": round(float(ms.max()), 3) if len(ms) else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def measure(func: Callable[[Any], Any], items: List[Any], iterations: int = 1, warmup: int = 1) -> Dict[str, Any]:
+    """
+    Call func(item) for every item, `iterations` times, timing each call.
+    The first `warmup` items are run once untimed (imports, caches, engine start).
+    """
+    for item in items[:warmup]:
+        func(item)
+
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(max(1, iterations)):
+        for item in items:
+            call_start = time.perf_counter()
+            func(item)
+            latencies.append(time.perf_counter() - call_start)
+    return summarize(latencies, time.perf_counter() - start)
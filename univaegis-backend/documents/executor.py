@@ -0,0 +1,188 @@
+"""
+Bounded in-process OCR for the async upload endpoint (served under ASGI).
+
+Under ASGI one process serves every connection from an event loop, so
+OCR, which is CPU-bound and takes seconds per page, must not run on it.
+OCRExecutor runs ocr_document() in a pool of OCR_EXECUTOR_WORKERS
+processes and admits at most OCR_EXECUTOR_MAX_PENDING jobs at a time
+(running or waiting for a process), each holding one of the global OCR
+slots (documents/admission.py). Past that, uploads get 429 with a
+Retry-After instead of queueing without bound, so the event loop stays
+free for status polls and health checks.
+
+Jobs run here are ordinary OCRJobs, claimed by this process (start_ocr);
+a retryable failure, or this process dying, puts them back on the queue
+for the ocr_worker. If a pool process dies (e.g. OOM-killed on a large
+PDF) the pool is broken for good: it is replaced, and the jobs it was
+running fail their attempt and go back on the queue.
+"""
+import math
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Set
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from . import ocr_cache
+from .admission import Slot, try_acquire_ocr_slot
+from .jobs import default_worker_name, heartbeat, run_job, start_ocr
+from .models import Document, OCRJob
+from .utils import _init_pdf_worker, ocr_document
+
+logger = logging.getLogger(__name__)
+
+# Retry-After estimate until a job has been timed
+DEFAULT_JOB_SECONDS = 10.0
+
+
+def get_executor_workers() -> int:
+    return getattr(settings, "OCR_EXECUTOR_WORKERS", 2)
+
+
+def get_executor_max_pending() -> int:
+    return getattr(settings, "OCR_EXECUTOR_MAX_PENDING", 8)
+
+
+def _with_connection(func, *args):
+    # Runs on a long-lived executor thread, outside any request: manage the
+    # thread's DB connection around the call the way a request does
+    close_old_connections()
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+class OCRExecutor:
+    """
+    Admission counter and process pool. Only touched from the event loop,
+    so the counter needs no lock.
+    """
+
+    def __init__(self, workers: int, max_pending: int, pool: Optional[Executor] = None):
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self.pending = 0
+        self.worker_name = f"asgi:{default_worker_name()}"
+        self._pool = pool
+        self._tasks: Set[asyncio.Task] = set()
+        self._job_seconds: Optional[float] = None
+
+    @property
+    def pool(self) -> Executor:
+        if self._pool is None:
+            # spawn, not fork: a forked child would inherit the server's DB
+            # connections and close them on exit
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_pdf_worker,
+            )
+        return self._pool
+
+    async def admit(self) -> Optional[Slot]:
+        """
+        Room for one more upload here and a global OCR slot, or None.
+        Pass the slot to submit(), or to release() if the upload fails.
+        """
+        if self.pending >= self.max_pending:
+            return None
+        self.pending += 1
+        slot = await sync_to_async(try_acquire_ocr_slot, thread_sensitive=False)()
+        if slot is None:
+            self.pending -= 1
+        return slot
+
+    def _discard_pool(self, pool: Executor) -> None:
+        # Only if no other job has replaced it already
+        if self._pool is pool:
+            self._pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    async def release(self, slot: Slot) -> None:
+        self.pending -= 1
+        await sync_to_async(slot.release, thread_sensitive=False)()
+
+    def retry_after(self) -> int:
+        """
+        Seconds until a slot is likely free: with every process busy, one
+        job finishes about every (job time / processes) seconds.
+        """
+        seconds = self._job_seconds or DEFAULT_JOB_SECONDS
+        return max(1, math.ceil(seconds / self.workers))
+
+    def start(self, document: Document) -> OCRJob:
+        """
+        Sync part of an admitted upload: create its job, claimed by this process.
+        """
+        return start_ocr(document, self.worker_name)
+
+    def submit(self, job: OCRJob, slot: Slot) -> None:
+        """
+        OCR an admitted job in the background; releases its slot when done.
+        """
+        task = asyncio.get_running_loop().create_task(self._run(job, slot))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def wait(self) -> None:
+        """
+        Until every submitted job has finished (tests, shutdown).
+        """
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _ocr_in_pool(self, path: str) -> asyncio.Future:
+        """
+        Run ocr_document(path) in the pool; the finished future. A broken
+        pool is replaced, and the job fails this attempt.
+        """
+        loop = asyncio.get_running_loop()
+        pool = self.pool
+        try:
+            future = loop.run_in_executor(pool, ocr_document, path)
+            await asyncio.wait([future])
+        except BrokenProcessPool as e:
+            # Broken before this job got in
+            future = loop.create_future()
+            future.set_exception(e)
+        if isinstance(future.exception(), BrokenProcessPool):
+            logger.error("OCR process pool is broken, starting a new one")
+            self._discard_pool(pool)
+        return future
+
+    async def _run(self, job: OCRJob, slot: Slot) -> None:
+        loop = asyncio.get_running_loop()
+        in_thread = sync_to_async(_with_connection, thread_sensitive=False)
+        try:
+            with heartbeat(job):
+                ocr = None
+                # A cache hit costs a query, not a process
+                if await in_thread(ocr_cache.lookup, job.document) is None:
+                    start = loop.time()
+                    future = await self._ocr_in_pool(job.document.file.path)
+                    elapsed = loop.time() - start
+                    previous = self._job_seconds
+                    self._job_seconds = elapsed if previous is None else 0.8 * previous + 0.2 * elapsed
+                    # run_job() records the result, or the exception OCR raised
+                    ocr = lambda path: future.result()  # noqa: E731
+                await in_thread(run_job, job, ocr)
+        except Exception as e:
+            logger.exception("In-process OCR job %s failed: %s", job.pk, e)
+        finally:
+            await self.release(slot)
+
+
+_executor: Optional[OCRExecutor] = None
+
+
+def get_ocr_executor() -> OCRExecutor:
+    global _executor
+    if _executor is None:
+        _executor = OCRExecutor(get_executor_workers(), get_executor_max_pending())
+    return _executor
@@ -0,0 +1,295 @@
+"""
+Field extraction from OCR text.
+
+Fields are described declaratively in ACADEMIC_FIELD_RULES /
+FINANCIAL_FIELD_RULES, compiled once at import. Each rule tries its
+patterns in order and converts the first match; the order of rules is
+the order of keys in the result.
+
+Every pattern is still its own re.search: a combined alternation would
+change which text a field gets where matches overlap, and measured
+slower. What is saved are the full-text scans of patterns whose keyword
+isn't in the document at all: a pattern may list hints, literals one of
+which any match must contain, checked against one casefolded copy of
+the text. An academic record without "GPA" used to spend most of its
+extraction time scanning for it.
+"""
+import re
+from typing import Any, Callable, Dict, List, Optional, Pattern, Sequence, Tuple
+
+from core.metrics import timed
+
+# (start, end) offsets of a match in the text
+Span = Tuple[int, int]
+
+
+class FieldRule:
+    """
+    One extracted field.
+
+    - patterns: (regex, flags, group) or (regex, flags, group, hints)
+      tuples, tried in order; the first pattern that matches wins, even
+      if `convert` then returns None. hints are lowercase literals, one
+      of which every match contains (case-insensitively); when none is
+      in the text the pattern is skipped without a search.
+    - convert: turns the matched group into the field value.
+    - fallback: called with the text when no pattern matches; returns
+      (value, span) like match().
+    """
+
+    def __init__(
+        self,
+        name: str,
+        patterns: Sequence[Tuple[Any, ...]],
+        convert: Callable[[str], Any] = str,
+        fallback: Optional[Callable[[str], Tuple[Any, Optional[Span]]]] = None,
+    ):
+        self.name = name
+        self.patterns: List[Tuple[Pattern, int, Tuple[str, ...]]] = [
+            (re.compile(regex, flags), group, tuple(hints[0]) if hints else ())
+            for regex, flags, group, *hints in patterns
+        ]
+        self.convert = convert
+        self.fallback = fallback
+
+    def match(self, text: str, folded: Optional[str] = None) -> Tuple[Any, Optional[Span]]:
+        """
+        Return (value, span of the matched text), or (None, None).
+        The span lets callers map a field back to the OCR'd words.
+        `folded` is text.casefold(), when the caller already has it.
+        """
+        if folded is None:
+            folded = text.casefold()
+        for regex, group, hints in self.patterns:
+            if hints and not any(map(folded.__contains__, hints)):
+                continue
+            m = regex.search(text)
+            if m:
+                return self.convert(m.group(group)), m.span(group)
+        if self.fallback is not None:
+            return self.fallback(text)
+        return None, None
+
+    def extract(self, text: str) -> Any:
+        return self.match(text)[0]
+
+
+def _float_or_none(value: str) -> Optional[float]:
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _amount(value: str) -> Optional[float]:
+    return _float_or_none(value.replace(",", ""))
+
+
+def _first_line(value: str) -> str:
+    return value.strip().split("\n")[0]
+
+
+_NAME_LINE_SPLIT = re.compile(r":|-")
+
+
+def _name_from_lines(text: str) -> Tuple[Optional[str], Optional[Span]]:
+    """
+    Fallback for student name: a short line mentioning "name",
+    taking whatever follows the first ":" or "-".
+    """
+    offset = 0
+    for line in text.splitlines(keepends=True):
+        content = line.splitlines()[0]  # line without its line break
+        if "name" in content.lower() and len(content.split()) <= 7:
+            parts = _NAME_LINE_SPLIT.split(content)
+            if len(parts) >= 2:
+                candidate = parts[1].strip()
+                if len(candidate) > 2:
+                    # parts[1] starts right after the first separator
+                    start = offset + len(parts[0]) + 1 + (len(parts[1]) - len(parts[1].lstrip()))
+                    return candidate, (start, start + len(candidate))
+        offset += len(line)
+    return None, None
+
+
+ACADEMIC_FIELD_RULES: List[FieldRule] = [
+    # Student Name: "Name: John Doe" or similar
+    FieldRule(
+        "student_name",
+        [(r"(Student Name|Name of Student|Name)[:\s\-]{1,10}([A-Z][A-Za-z ,.'-]{1,80})", 0, 2, ["name"])],
+        convert=str.strip,
+        fallback=_name_from_lines,
+    ),
+    # University / College / School
+    FieldRule(
+        "university",
+        [
+            (
+                r"(University|College|Institute|School)[:\s\-]{1,10}(.{3,120})",
+                re.IGNORECASE,
+                2,
+                ["university", "college", "institute", "school"],
+            )
+        ],
+        convert=_first_line,
+    ),
+    # Course / Program / Degree
+    FieldRule(
+        "course",
+        [
+            (
+                r"(Course|Program|Programme|Degree)[:\s\-]{1,10}(.{2,80})",
+                re.IGNORECASE,
+                2,
+                ["course", "program", "degree"],
+            )
+        ],
+        convert=_first_line,
+    ),
+    # Percentage like "85%" or "85.5 %", else "Percentage: 85"
+    FieldRule(
+        "percentage",
+        [
+            (r"(\d{1,3}(?:\.\d+)?)[\s]*%+", 0, 1, ["%"]),
+            (
+                r"(percentage|marks|scored)[\s:\-]*([0-9]{1,3}(?:\.\d+)?)",
+                re.IGNORECASE,
+                2,
+                ["percentage", "marks", "scored"],
+            ),
+        ],
+        convert=float,
+    ),
+    # GPA like "GPA: 8.5"
+    FieldRule(
+        "gpa",
+        [(r"\bGPA[:\s]*([0-9]\.?[0-9]?)\b", re.IGNORECASE, 1, ["gpa"])],
+        convert=_float_or_none,
+    ),
+    # Year of Passing: prefer labelled years, else any reasonable year (1990-2099)
+    FieldRule(
+        "year_of_passing",
+        [
+            (
+                r"(Year of Passing|Passed in|Passing Year|Class of)[\s:\-]*([12][0-9]{3})",
+                re.IGNORECASE,
+                2,
+                ["year of passing", "passed in", "passing year", "class of"],
+            ),
+            (r"\b(19[9][0-9]|20[0-9]{2})\b", 0, 1),
+        ],
+        convert=int,
+    ),
+]
+
+
+FINANCIAL_FIELD_RULES: List[FieldRule] = [
+    # Bank name (very heuristic)
+    FieldRule(
+        "bank_name",
+        [(r"(Bank of [A-Za-z ]+|[A-Za-z ]+ Bank)", 0, 0, ["bank"])],
+        convert=str.strip,
+    ),
+    # Account holder: "Account Holder: John Doe" or "A/c Name: ..."
+    FieldRule(
+        "account_holder",
+        [
+            (
+                r"(Account Holder|Account Name|A/c Name|A/c Holder)[:\s\-]{1,10}(.{2,80})",
+                re.IGNORECASE,
+                2,
+                ["account", "a/c"],
+            )
+        ],
+        convert=_first_line,
+    ),
+    # Balance or FD amount
+    FieldRule(
+        "available_balance",
+        [
+            (
+                r"(Available Balance|Balance|FD Amount|Deposit Amount)[:\s\-]*([0-9,]+\.\d{2}|[0-9,]+)",
+                re.IGNORECASE,
+                2,
+                ["balance", "fd amount", "deposit amount"],
+            )
+        ],
+        convert=_amount,
+    ),
+    # Date: DD/MM/YYYY, else YYYY-MM-DD
+    FieldRule(
+        "date",
+        [
+            (r"\b(\d{2}/\d{2}/\d{4})\b", 0, 1, ["/"]),
+            (r"\b(20[0-9]{2}-\d{2}-\d{2})\b", 0, 1),
+        ],
+    ),
+]
+
+
+def apply_rules(rules: Sequence[FieldRule], text: str) -> Tuple[Dict[str, Any], Dict[str, Span]]:
+    """
+    Run every rule over the text; returns (values, spans of matched fields).
+    "\r" -> "\n" keeps the text length, so spans index the original text.
+    """
+    t = text.replace("\r", "\n")
+    # One casefolded copy serves every rule's hints
+    folded = t.casefold()
+    values: Dict[str, Any] = {}
+    spans: Dict[str, Span] = {}
+    for rule in rules:
+        values[rule.name], span = rule.match(t, folded)
+        if span is not None:
+            spans[rule.name] = span
+    return values, spans
+
+
+def extract_academic_fields(text: str) -> Dict[str, Any]:
+    """
+    Extract fields from academic documents:
+    - Student Name
+    - University/School
+    - Course Name
+    - Percentage or GPA
+    - Year of Passing
+    """
+    return {"doc_type": "academic", **apply_rules(ACADEMIC_FIELD_RULES, text)[0]}
+
+
+def extract_financial_fields(text: str) -> Dict[str, Any]:
+    """
+    Extract fields from financial documents like bank statement / FD:
+    - Bank Name
+    - Account Holder Name
+    - Available Balance or FD Amount
+    - Date (one main date)
+    """
+    return {"doc_type": "financial", **apply_rules(FINANCIAL_FIELD_RULES, text)[0]}
+
+
+@timed("extract")
+def extract_fields_with_spans(doc_type: str, text: str) -> Tuple[Dict[str, Any], Dict[str, Span]]:
+    """
+    Like extract_fields, but also returns where in `text` each field was found.
+    """
+    if not text:
+        return {"error": "No text extracted from document."}, {}
+
+    if doc_type == "academic":
+        base = {"doc_type": "academic"}
+        values, spans = apply_rules(ACADEMIC_FIELD_RULES, text)
+    else:
+        base = {"doc_type": "financial"}
+        values, spans = apply_rules(FINANCIAL_FIELD_RULES, text)
+
+    base.update(values)
+    base["raw_text_snippet"] = text[:300]
+    return base, spans
+
+
+def extract_fields(doc_type: str, text: str) -> Dict[str, Any]:
+    """
+    Entry point: choose correct extraction based on doc_type.
+    Add a small raw_text_snippet for debugging.
+    """
+    return extract_fields_with_spans(doc_type, text)[0]
@@ -0,0 +1,268 @@
+import os
+import socket
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Callable, Dict, Any, List, Optional
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import ocr_cache
+from .admission import try_acquire_ocr_slot
+from .models import Document, OCRJob
+from .extraction import extract_fields, extract_fields_with_spans
+from .utils import ocr_document, field_confidences, OCRLimitExceeded
+
+logger = logging.getLogger(__name__)
+
+
+def get_max_attempts() -> int:
+    return getattr(settings, "OCR_JOB_MAX_ATTEMPTS", 3)
+
+
+def get_stale_after() -> int:
+    """
+    Seconds without a heartbeat after which a "running" job is considered
+    abandoned (e.g. the worker was OOM-killed) and may be picked up again.
+    """
+    return getattr(settings, "OCR_JOB_STALE_AFTER", 120)
+
+
+def get_heartbeat_interval() -> float:
+    return getattr(settings, "OCR_JOB_HEARTBEAT_INTERVAL", 30)
+
+
+def default_worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def process_document(document: Document, ocr: Optional[Callable[[str], Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Run OCR + field extraction for a Document and persist the results.
+    This is the work the upload view used to do inline.
+
+    Identical content uploaded earlier (same hash, engine version and DPI)
+    reuses that document's results instead of running OCR again.
+    `ocr` replaces ocr_document(), e.g. with a result computed in another process.
+    """
+    source = ocr_cache.lookup(document)
+    if source is not None:
+        ocr_text = source.ocr_text
+        pages = source.ocr_pages
+        confidence = source.ocr_confidence
+        field_confidence = source.field_confidence
+        # Extraction depends on doc_type, so only reuse it for the same type
+        if source.doc_type == document.doc_type and source.extracted_data:
+            extracted = source.extracted_data
+        else:
+            extracted = extract_fields(document.doc_type, ocr_text)
+            field_confidence = None
+    else:
+        result = (ocr or ocr_document)(document.file.path)
+        ocr_text = result["text"]
+        pages = result["pages"]
+        confidence = result["confidence"]
+        extracted, spans = extract_fields_with_spans(document.doc_type, ocr_text)
+        field_confidence = field_confidences(spans, result["words"])
+
+    document.extracted_data = extracted
+    document.ocr_confidence = confidence
+    document.ocr_pages = pages
+    document.field_confidence = field_confidence
+    with transaction.atomic():
+        document.save(update_fields=["extracted_data", "ocr_confidence", "ocr_pages", "field_confidence"])
+        document.save_ocr_text(ocr_text)
+
+    if source is None:
+        ocr_cache.store(document)
+
+    return {"extracted": extracted, "confidence": confidence, "cache_hit": source is not None}
+
+
+def enqueue_ocr(document: Document) -> OCRJob:
+    return OCRJob.objects.create(document=document)
+
+
+def enqueue_ocr_many(documents: List[Document]) -> List[OCRJob]:
+    """
+    Queue OCR for several documents with one INSERT. The ocr_worker
+    processes then claim and run them concurrently.
+    """
+    return OCRJob.objects.bulk_create([OCRJob(document=document) for document in documents])
+
+
+def start_ocr(document: Document, worker_name: str) -> OCRJob:
+    """
+    A job already claimed by `worker_name`, for OCR run in-process (the
+    async upload endpoint) instead of by the ocr_worker. If that process
+    dies, requeue_stale_jobs() hands the job to the ocr_worker.
+    """
+    return OCRJob.objects.create(
+        document=document,
+        status=OCRJob.STATUS_RUNNING,
+        attempts=1,
+        worker=worker_name,
+        started_at=timezone.now(),
+        heartbeat_at=timezone.now(),
+    )
+
+
+@contextmanager
+def heartbeat(job: OCRJob):
+    """
+    Refresh job.heartbeat_at every OCR_JOB_HEARTBEAT_INTERVAL seconds from
+    a background thread while the block runs, so a long OCR (a 100 page
+    PDF can take many minutes) isn't mistaken for an abandoned job and
+    run a second time by another worker.
+
+    Only beats while the job is still running under job.worker.
+    """
+    interval = get_heartbeat_interval()
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(interval):
+                OCRJob.objects.filter(pk=job.pk, status=OCRJob.STATUS_RUNNING, worker=job.worker).update(
+                    heartbeat_at=timezone.now()
+                )
+        except Exception as e:
+            logger.exception("Heartbeat for OCR job %s stopped: %s", job.pk, e)
+        finally:
+            # This thread's own connection
+            connections.close_all()
+
+    thread = threading.Thread(target=beat, name=f"ocr-heartbeat-{job.pk}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        # Not joined: a beat in flight finishes on its own
+        stop.set()
+
+
+def requeue_stale_jobs() -> int:
+    """
+    Put jobs whose worker disappeared mid-run (no heartbeat for
+    OCR_JOB_STALE_AFTER seconds) back on the queue, or fail them once they
+    are out of attempts. Returns the number of jobs requeued.
+    """
+    cutoff = timezone.now() - timedelta(seconds=get_stale_after())
+    stale = OCRJob.objects.filter(status=OCRJob.STATUS_RUNNING).filter(
+        # Rows claimed before heartbeats existed only have started_at
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    )
+
+    # A document that keeps killing its worker (e.g. OOM) must not loop forever
+    stale.filter(attempts__gte=get_max_attempts()).update(
+        status=OCRJob.STATUS_FAILED,
+        error="Worker stopped while processing this job.",
+        finished_at=timezone.now(),
+    )
+    return stale.update(status=OCRJob.STATUS_QUEUED, worker="")
+
+
+def claim_next_job(worker_name: str) -> Optional[OCRJob]:
+    """
+    Atomically claim the oldest queued job.
+
+    SKIP LOCKED lets concurrent workers each grab a different row
+    instead of blocking on the same one.
+    """
+    with transaction.atomic():
+        job = (
+            OCRJob.objects.select_for_update(skip_locked=True)
+            .filter(status=OCRJob.STATUS_QUEUED)
+            .order_by("created_at", "id")
+            .first()
+        )
+        if job is None:
+            return None
+
+        job.status = OCRJob.STATUS_RUNNING
+        job.attempts += 1
+        job.worker = worker_name
+        job.started_at = job.heartbeat_at = timezone.now()
+        job.save(update_fields=["status", "attempts", "worker", "started_at", "heartbeat_at"])
+
+    return job
+
+
+def run_job(job: OCRJob, ocr: Optional[Callable[[str], Dict[str, Any]]] = None) -> OCRJob:
+    """
+    Execute a claimed job and record the outcome.
+    Failed jobs are requeued until OCR_JOB_MAX_ATTEMPTS is reached,
+    except documents over the OCR size limits, which fail immediately.
+    """
+    try:
+        result = process_document(job.document, ocr)
+    except OCRLimitExceeded as e:
+        # Too many pages / pixels: retrying would only hit the limit again
+        job.error = str(e)
+        job.status = OCRJob.STATUS_FAILED
+        job.finished_at = timezone.now()
+    except Exception as e:
+        logger.exception("OCR job %s failed: %s", job.pk, e)
+        job.error = str(e)
+        if job.attempts < get_max_attempts():
+            job.status = OCRJob.STATUS_QUEUED
+        else:
+            job.status = OCRJob.STATUS_FAILED
+            job.finished_at = timezone.now()
+    else:
+        job.status = OCRJob.STATUS_DONE
+        job.cache_hit = result["cache_hit"]
+        job.error = ""
+        job.finished_at = timezone.now()
+
+    job.save(update_fields=["status", "cache_hit", "error", "finished_at"])
+    return job
+
+
+def work(worker_name: Optional[str] = None, poll_interval: float = 1.0, once: bool = False, should_stop=None) -> int:
+    """
+    Worker loop: claim and run jobs until stopped.
+
+    - once=True drains the queue and returns (useful for cron / tests).
+    - should_stop is an optional callable checked between jobs.
+    - A job is only claimed with one of the global OCR slots
+      (OCR_MAX_CONCURRENT, documents/admission.py) in hand; while none is
+      free the worker waits without touching the queue.
+
+    Returns the number of jobs processed.
+    """
+    worker_name = worker_name or default_worker_name()
+    processed = 0
+
+    while not (should_stop and should_stop()):
+        # Slot first: while OCR is at capacity the queue isn't touched at all
+        slot = try_acquire_ocr_slot()
+        if slot is None:
+            if once:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        try:
+            job = claim_next_job(worker_name)
+            if job is not None:
+                with heartbeat(job):
+                    run_job(job)
+                processed += 1
+        finally:
+            slot.release()
+
+        if job is None:
+            # Only look for abandoned jobs when idle, keeps the hot loop to one query
+            if requeue_stale_jobs():
+                continue
+            if once:
+                break
+            time.sleep(poll_interval)
+
+    return processed
@@ -0,0 +1,293 @@
+"""
+Closed-loop HTTP load generator for capacity checks (`manage.py loadtest`).
+
+Each virtual user sends one request, waits for the response and sends the
+next, so `concurrency` is the number of requests in flight. Levels are
+run one after another (a sweep) and every level reports throughput,
+latency percentiles and errors, which together show where the server
+stops scaling.
+
+Plain asyncio streams and HTTP/1.0 (one connection per request, like the
+gunicorn sync worker serves them), so there is no client dependency and
+the generator's own overhead stays far below the server's. Meant for
+local / staging servers only.
+"""
+import math
+import time
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import numpy as np
+
+# Body and content type of the next request; called per request so bodies can vary
+BodyFactory = Callable[[], Tuple[bytes, str]]
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: str
+    body: BodyFactory
+    # Any of these statuses counts as a success
+    expected: Tuple[int, ...] = (200,)
+
+
+@dataclass
+class Response:
+    status: int
+    body: bytes
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+class Target:
+    """
+    host:port of a plain-HTTP server, from a base URL like http://localhost:8000.
+    """
+
+    def __init__(self, base_url: str, timeout: float = 60.0):
+        parts = urlsplit(base_url)
+        if parts.scheme != "http" or not parts.hostname:
+            raise ValueError(f"Only http:// base URLs are supported, got {base_url!r}.")
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.host_header = parts.netloc
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+
+    async def request(self, method: str, path: str, body: bytes = b"", content_type: str = "") -> Response:
+        async def exchange() -> bytes:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+            try:
+                head = [
+                    f"{method} {self.prefix}{path} HTTP/1.0",
+                    f"Host: {self.host_header}",
+                    f"Content-Length: {len(body)}",
+                ]
+                if content_type:
+                    head.append(f"Content-Type: {content_type}")
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+                await writer.drain()
+                # HTTP/1.0: the server closes the connection after the response
+                return await reader.read()
+            finally:
+                writer.close()
+
+        raw = await asyncio.wait_for(exchange(), self.timeout)
+        head, _, payload = raw.partition(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        status_line = lines[0].split(" ", 2)
+        if len(status_line) < 2 or not status_line[1].isdigit():
+            raise ConnectionError(f"Malformed response: {lines[0]!r}")
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return Response(int(status_line[1]), payload, headers)
+
+
+def multipart(fields: Dict[str, str], files: Dict[str, Tuple[str, bytes, str]]) -> Tuple[bytes, str]:
+    """
+    multipart/form-data body for text fields and {name: (filename, content, content_type)}.
+    """
+    boundary = "univaegis-loadtest-boundary"
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, content, content_type) in files.items():
+        parts.append(
+            (
+                f"--{boundary}\r\n"
+                f'Content-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                f"Content-Type: {content_type}\r\n\r\n"
+            ).encode()
+            + content
+            + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def summarize_level(
+    concurrency: int, latencies: List[float], statuses: Dict[str, int], errors: int, wall_seconds: float
+) -> Dict[str, Any]:
+    """
+    One point of the curves: throughput of successful requests, latency
+    percentiles (ms, successful requests only) and the error rate.
+    """
+    ms = np.array(latencies, dtype=np.float64) * 1000
+    total = len(latencies) + errors
+
+    def pct(q):
+        return round(float(np.percentile(ms, q)), 1) if len(ms) else None
+
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "throughput_per_s": round(len(latencies) / wall_seconds, 2) if wall_seconds else 0.0,
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+        "mean_ms": round(float(ms.mean()), 1) if len(ms) else None,
+        "max_ms": round(float(ms.max()), 1) if len(ms) else None,
+        "statuses": dict(sorted(statuses.items())),
+    }
+
+
+async def run_level(
+    target: Target,
+    scenario: Scenario,
+    concurrency: int,
+    duration: Optional[float] = None,
+    requests: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    `concurrency` virtual users send requests until `duration` seconds have
+    passed or `requests` requests have been started, whichever is given.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration if duration else None
+    counter = iter(range(requests if requests is not None else 10 ** 12))
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    errors = 0
+
+    async def user():
+        nonlocal errors
+        while deadline is None or loop.time() < deadline:
+            if next(counter, None) is None:
+                return
+            body, content_type = scenario.body()
+            start = time.perf_counter()
+            try:
+                response = await target.request(scenario.method, scenario.path, body, content_type)
+                outcome = str(response.status)
+                ok = response.status in scenario.expected
+            except asyncio.TimeoutError:
+                outcome, ok = "timeout", False
+            except OSError as e:
+                # Refused / reset connections: the server's backlog is full or it is down
+                outcome, ok = type(e).__name__, False
+            elapsed = time.perf_counter() - start
+            statuses[outcome] = statuses.get(outcome, 0) + 1
+            if ok:
+                latencies.append(elapsed)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    return summarize_level(concurrency, latencies, statuses, errors, time.perf_counter() - start)
+
+
+async def sweep(
+    target: Target,
+    scenario: Scenario,
+    levels: List[int],
+    duration: Optional[float] = None,
+    requests: Optional[int] = None,
+    on_level: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> List[Dict[str, Any]]:
+    curve = []
+    for concurrency in levels:
+        point = await run_level(target, scenario, concurrency, duration, requests)
+        curve.append(point)
+        if on_level:
+            on_level(point)
+    return curve
+
+
+def knee(curve: List[Dict[str, Any]], slo_ms: float, max_error_rate: float) -> Optional[Dict[str, Any]]:
+    """
+    The lowest concurrency reaching 90% of the best throughput among levels
+    that meet the p95 SLO and error budget: past it, more concurrency only
+    adds queueing delay.
+    """
+    healthy = [
+        p
+        for p in curve
+        if p["p95_ms"] is not None and p["p95_ms"] <= slo_ms and p["error_rate"] <= max_error_rate
+    ]
+    if not healthy:
+        return None
+    best = max(p["throughput_per_s"] for p in healthy)
+    return min((p for p in healthy if p["throughput_per_s"] >= 0.9 * best), key=lambda p: p["concurrency"])
+
+
+def recommend(
+    curves: Dict[str, List[Dict[str, Any]]],
+    server_workers: int,
+    server_threads: int,
+    server_cpus: int,
+    slo_ms: float,
+    max_error_rate: float,
+    target_rps: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Gunicorn settings from the measured curves.
+
+    Per scenario, with S the mean latency at the lowest level (service time
+    without queueing) and X the throughput at the knee, X * S is how many
+    requests the server really handled in parallel (Little's law). If that
+    is close to the configured slots (workers * threads), the slots are the
+    limit and more would help; if it is well below, CPU, the database or
+    disk saturate first and more slots only add memory and queueing.
+
+    Slots needed = X_target * S * 1.25 headroom, where X_target is
+    --target-rps or, without it, the throughput the slots would reach if
+    they were the only limit. Workers are capped at 2 * CPUs + 1 (gunicorn's
+    guidance); the rest become threads, since these endpoints mostly wait
+    on the database and disk (OCR runs in the ocr_worker, not here).
+    """
+    slots = server_workers * server_threads
+    max_workers = 2 * server_cpus + 1
+    findings = {}
+    needed = 1
+    slowest_ms = 0.0
+
+    for name, curve in curves.items():
+        slowest_ms = max([slowest_ms] + [p["max_ms"] or 0.0 for p in curve])
+        point = knee(curve, slo_ms, max_error_rate)
+        base = curve[0]
+        if point is None or not base["mean_ms"]:
+            findings[name] = {"knee": None, "note": "No level met the SLO and error budget; try lower concurrency."}
+            continue
+
+        service_s = base["mean_ms"] / 1000
+        parallelism = point["throughput_per_s"] * service_s
+        slot_bound = parallelism >= 0.8 * slots
+        if target_rps:
+            demand = target_rps
+        elif slot_bound:
+            # Slots are the limit: assume throughput keeps scaling up to the CPU cap
+            demand = point["throughput_per_s"] * max(1.0, max_workers / slots)
+        else:
+            demand = point["throughput_per_s"]
+        needed = max(needed, math.ceil(demand * service_s * 1.25))
+        findings[name] = {
+            "knee": point,
+            "service_ms": base["mean_ms"],
+            "effective_parallelism": round(parallelism, 2),
+            "bottleneck": "worker slots" if slot_bound else "server resources (CPU, database or disk)",
+        }
+
+    workers = min(needed, max_workers)
+    threads = math.ceil(needed / workers)
+    # A few times the slowest request seen, so slow requests aren't killed mid-write
+    timeout = max(30, math.ceil(slowest_ms / 1000 * 4))
+    flags = f"--workers={workers}"
+    if threads > 1:
+        flags += f" --threads={threads}"
+    flags += f" --timeout={timeout}"
+    return {
+        "configured": {"workers": server_workers, "threads": server_threads, "cpus": server_cpus},
+        "scenarios": findings,
+        "workers": workers,
+        "threads": threads,
+        "timeout": timeout,
+        "gunicorn_args": flags,
+    }
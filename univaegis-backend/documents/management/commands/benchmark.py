@@ -0,0 +1,220 @@
+import os
+import json
+import shutil
+import platform
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from documents.benchmarking import (
+    ACADEMIC_SAMPLES,
+    FINANCIAL_SAMPLES,
+    VARIANTS,
+    document_lines,
+    measure,
+    write_corpus,
+)
+from documents.extraction import extract_fields
+from documents.jobs import work
+from documents.models import Document
+from documents.utils import get_ocr_backend, get_ocr_engine_version, get_pdf_dpi, get_pdf_workers, ocr_file
+from eligibility import rule_cache
+from eligibility.fingerprints import recent_checks
+
+SUITES = ("extract", "ocr", "upload", "eligibility")
+
+# Bump when the JSON layout changes, so comparisons don't mix formats
+SCHEMA_VERSION = 1
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the OCR / extraction pipeline and the upload and eligibility endpoints "
+        "on synthetic documents (PNG and multi-page PDF), without network access. "
+        "Reports throughput, p50/p95 latency and peak RSS as JSON. Database writes "
+        "are rolled back and files go to a temporary MEDIA_ROOT."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--suite", action="append", choices=SUITES, help="Suites to run (default: all).")
+        parser.add_argument("--iterations", type=int, default=3, help="Timed passes over each input.")
+        parser.add_argument("--variant", action="append", choices=list(VARIANTS), help="PNG variants (default: all).")
+        parser.add_argument(
+            "--pdf-pages", type=int, action="append", help="Page counts of the generated PDFs (default: 1 and 5)."
+        )
+        parser.add_argument("--label", default="", help="Free-form label stored in the results, e.g. a branch name.")
+        parser.add_argument("--output", help="Write the JSON results to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        suites = options["suite"] or list(SUITES)
+        iterations = max(1, options["iterations"])
+        workdir = Path(tempfile.mkdtemp(prefix="univaegis-bench-"))
+
+        results: Dict[str, Any] = {}
+        try:
+            corpus = write_corpus(workdir / "corpus", options["variant"], options["pdf_pages"] or (1, 5))
+            # Uploads must not hit the OCR cache of earlier runs, or OCR would be skipped;
+            # admission control (rate limit, queue cap, OCR slots held by running workers)
+            # would refuse or stall the timed uploads; the test client sends Host: testserver
+            with override_settings(
+                MEDIA_ROOT=str(workdir / "media"),
+                OCR_CACHE_ENABLED=False,
+                OCR_UPLOAD_RATE=0,
+                OCR_MAX_QUEUED_JOBS=0,
+                OCR_MAX_CONCURRENT=0,
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+            ):
+                with transaction.atomic():
+                    for suite in SUITES:
+                        if suite in suites:
+                            self.stderr.write(f"Running {suite}...")
+                            results[suite] = getattr(self, f"_bench_{suite}")(corpus, iterations)
+                    transaction.set_rollback(True)
+        finally:
+            # Rolled-back checks and rule sets must not stay cached in this process
+            recent_checks.clear()
+            rule_cache.invalidate()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        report = {
+            "schema": SCHEMA_VERSION,
+            "label": options["label"],
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "environment": self._environment(),
+            "parameters": {
+                "suites": suites,
+                "iterations": iterations,
+                "variants": options["variant"] or list(VARIANTS),
+                "pdf_pages": options["pdf_pages"] or [1, 5],
+                "corpus": [{k: f[k] for k in ("name", "format", "pages", "bytes")} for f in corpus],
+            },
+            "results": results,
+        }
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            Path(options["output"]).write_text(output + "\n")
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}."))
+        else:
+            self.stdout.write(output)
+
+    def _environment(self) -> Dict[str, Any]:
+        return {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "ocr_backend": get_ocr_backend().name,
+            "ocr_engine": get_ocr_engine_version(),
+            "pdf_dpi": get_pdf_dpi(),
+            "pdf_workers": get_pdf_workers(),
+            "preprocess": getattr(settings, "OCR_PREPROCESS_ENABLED", True),
+            "database": settings.DATABASES["default"]["ENGINE"].rsplit(".", 1)[-1],
+        }
+
+    def _tesseract_missing(self):
+        try:
+            get_ocr_backend().tesseract_version()
+        except Exception as e:
+            return f"OCR engine unavailable: {e}"
+        return None
+
+    def _bench_extract(self, corpus, iterations) -> Dict[str, Any]:
+        texts = [("academic", "\n".join(document_lines("academic", s))) for s in ACADEMIC_SAMPLES]
+        texts += [("financial", "\n".join(document_lines("financial", s))) for s in FINANCIAL_SAMPLES]
+        # Long OCR output (a 50-page statement) stresses the regex scans
+        long_texts = [(doc_type, "\n".join([text] * 50)) for doc_type, text in texts]
+
+        def run(item):
+            extract_fields(*item)
+
+        # Extraction takes microseconds: repeat enough for stable percentiles
+        return {
+            "extract_fields/page": measure(run, texts, iterations * 100),
+            "extract_fields/50_pages": measure(run, long_texts, iterations * 10),
+        }
+
+    def _bench_ocr(self, corpus, iterations) -> Dict[str, Any]:
+        missing = self._tesseract_missing()
+        if missing:
+            return {"skipped": missing}
+        return {
+            f"ocr_file/{item['name']}": measure(lambda f: ocr_file(f["path"]), [item], iterations)
+            for item in corpus
+        }
+
+    def _upload(self, client: Client, item: Dict[str, Any]):
+        content = Path(item["path"]).read_bytes()
+        content_type = "application/pdf" if item["format"] == "pdf" else "image/png"
+        response = client.post(
+            reverse("document-upload"),
+            {
+                "file": SimpleUploadedFile(Path(item["path"]).name, content, content_type=content_type),
+                "doc_type": item["doc_type"],
+            },
+        )
+        if response.status_code != 202:
+            raise CommandError(f"Upload of {item['name']} failed: {response.status_code} {response.content[:200]!r}")
+        return response
+
+    def _bench_upload(self, corpus, iterations) -> Dict[str, Any]:
+        client = Client()
+        results = {"upload": measure(lambda item: self._upload(client, item), corpus, iterations)}
+
+        missing = self._tesseract_missing()
+        if missing:
+            results["upload_to_result"] = {"skipped": missing}
+            return results
+
+        def upload_and_process(item):
+            # What a user waits for: upload, then the worker OCRs and extracts
+            self._upload(client, item)
+            work(worker_name="benchmark", once=True)
+
+        for item in corpus:
+            results[f"upload_to_result/{item['name']}"] = measure(upload_and_process, [item], iterations)
+        return results
+
+    def _bench_eligibility(self, corpus, iterations) -> Dict[str, Any]:
+        client = Client()
+        documents = [
+            Document.objects.create(
+                file="documents/benchmark.png",
+                doc_type="academic",
+                extracted_data=extract_fields("academic", "\n".join(document_lines("academic", sample))),
+            )
+            for sample in ACADEMIC_SAMPLES
+        ]
+        counter = iter(range(10 ** 9))
+
+        def scores(unique: bool) -> Dict[str, float]:
+            # Distinct scores make a new check; repeated ones are answered from the fingerprint LRU
+            bump = (next(counter) % 1000) / 1000 if unique else 0.0
+            return {band: 7.5 + bump for band in ("listening", "reading", "writing", "speaking")}
+
+        def check(document, unique=True):
+            response = client.post(
+                reverse("eligibility-check"),
+                {"document_id": document.pk, "ielts_scores": scores(unique)},
+                content_type="application/json",
+            )
+            if response.status_code != 200:
+                raise CommandError(f"Eligibility check failed: {response.status_code} {response.content[:200]!r}")
+
+        def batch(size):
+            checks = [
+                {"document_id": documents[i % len(documents)].pk, "ielts_scores": scores(True)} for i in range(size)
+            ]
+            client.post(reverse("eligibility-batch-check"), {"checks": checks}, content_type="application/json")
+
+        return {
+            "check/new": measure(check, documents, iterations * 20),
+            "check/repeat": measure(lambda d: check(d, unique=False), documents, iterations * 20),
+            "batch_check/100": measure(batch, [100], iterations * 5),
+        }
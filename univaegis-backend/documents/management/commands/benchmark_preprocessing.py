@@ -0,0 +1,99 @@
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from PIL import Image
+
+from documents.benchmarking import VARIANTS, field_accuracy, synthetic_corpus
+from documents.extraction import extract_fields
+from documents.utils import get_ocr_backend, run_ocr_on_image
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare OCR time and field-extraction accuracy with image preprocessing "
+        "off vs on, over the synthetic corpus (or --corpus DIR of <name>.png + <name>.json "
+        'files, where the JSON holds {"doc_type": ..., "expected": {...}}).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--corpus", help="Directory of real fixture images with expected-field JSON.")
+        parser.add_argument("--variant", action="append", choices=list(VARIANTS), help="Synthetic variants to run.")
+        parser.add_argument(
+            "--backend",
+            choices=["auto", "tesserocr", "pytesseract"],
+            help="OCR backend to benchmark (default: the OCR_BACKEND setting).",
+        )
+        parser.add_argument("--repeat", type=int, default=1, help="OCR each image this many times per mode.")
+        parser.add_argument("--json", action="store_true", help="Emit machine-readable JSON.")
+
+    def handle(self, *args, **options):
+        items = list(self._corpus(options))
+        if not items:
+            raise CommandError("Benchmark corpus is empty.")
+
+        backend = {"OCR_BACKEND": options["backend"]} if options["backend"] else {}
+        rows = []
+        for item in items:
+            row = {"name": item["name"], "pixels": item["image"].width * item["image"].height}
+            for mode, enabled in (("raw", False), ("preprocessed", True)):
+                with override_settings(OCR_PREPROCESS_ENABLED=enabled, **backend):
+                    row[mode] = self._measure(item, options["repeat"])
+            rows.append(row)
+
+        summary = {
+            mode: {
+                "total_seconds": round(sum(r[mode]["seconds"] for r in rows), 3),
+                "accuracy": round(
+                    sum(r[mode]["correct"] for r in rows) / max(1, sum(r[mode]["fields"] for r in rows)), 4
+                ),
+            }
+            for mode in ("raw", "preprocessed")
+        }
+
+        with override_settings(**backend):
+            backend_name = get_ocr_backend().name
+        if options["json"]:
+            self.stdout.write(json.dumps({"backend": backend_name, "documents": rows, "summary": summary}, indent=2))
+            return
+
+        self.stdout.write(f"OCR backend: {backend_name}")
+
+        self.stdout.write(f"{'document':<28}{'MPix':>7}{'raw s':>9}{'pre s':>9}{'raw acc':>9}{'pre acc':>9}")
+        for r in rows:
+            self.stdout.write(
+                f"{r['name']:<28}{r['pixels'] / 1e6:>7.1f}"
+                f"{r['raw']['seconds']:>9.2f}{r['preprocessed']['seconds']:>9.2f}"
+                f"{r['raw']['correct']:>6}/{r['raw']['fields']:<2}{r['preprocessed']['correct']:>6}/{r['preprocessed']['fields']:<2}"
+            )
+        for mode, s in summary.items():
+            self.stdout.write(f"{mode}: {s['total_seconds']}s total, field accuracy {s['accuracy']:.1%}")
+
+    def _measure(self, item: Dict[str, Any], repeat: int) -> Dict[str, Any]:
+        start = time.perf_counter()
+        for _ in range(max(1, repeat)):
+            text, _words = run_ocr_on_image(item["image"])
+        seconds = (time.perf_counter() - start) / max(1, repeat)
+
+        correct, fields = field_accuracy(item["expected"], extract_fields(item["doc_type"], text))
+        return {"seconds": round(seconds, 4), "correct": correct, "fields": fields}
+
+    def _corpus(self, options) -> Iterator[Dict[str, Any]]:
+        if not options["corpus"]:
+            yield from synthetic_corpus(options["variant"])
+            return
+
+        corpus = Path(options["corpus"])
+        if not corpus.is_dir():
+            raise CommandError(f"{corpus} is not a directory.")
+        for meta_path in sorted(corpus.glob("*.json")):
+            images: List[Path] = [p for p in corpus.glob(f"{meta_path.stem}.*") if p.suffix.lower() != ".json"]
+            if not images:
+                continue
+            meta = json.loads(meta_path.read_text())
+            with Image.open(images[0]) as img:
+                image = img.convert("L")
+            yield {"name": meta_path.stem, "doc_type": meta["doc_type"], "image": image, "expected": meta["expected"]}
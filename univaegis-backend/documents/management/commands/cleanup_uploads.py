@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from documents.uploads import delete_expired_sessions, expired_sessions
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete resumable uploads left open for longer than DOCUMENT_UPLOAD_SESSION_TTL "
+        "seconds, with their part files. Run it periodically (e.g. hourly from cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many uploads have expired.",
+        )
+
+    def handle(self, *args, **options):
+        if options["dry_run"]:
+            self.stdout.write(f"{expired_sessions().count()} expired upload(s).")
+            return
+        deleted = delete_expired_sessions()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired upload(s)."))
@@ -0,0 +1,206 @@
+import io
+import os
+import json
+import asyncio
+import itertools
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from documents.benchmarking import ACADEMIC_SAMPLES, apply_variant, document_lines, render_page
+from documents.loadtest import Scenario, Target, multipart, recommend, sweep
+
+SCENARIOS = ("upload", "eligibility")
+
+DEFAULT_LEVELS = "1,2,4,8,16,32"
+
+
+def _levels(value: str) -> List[int]:
+    try:
+        levels = sorted({int(v) for v in value.split(",") if v.strip()})
+    except ValueError:
+        raise CommandError(f"--concurrency must be comma-separated integers, got {value!r}.")
+    if not levels or levels[0] < 1:
+        raise CommandError("--concurrency levels must be >= 1.")
+    return levels
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test a running server: sweep POST /api/documents/upload/ and "
+        "/api/eligibility/check/ over increasing concurrency, print throughput, "
+        "latency and error curves, and recommend gunicorn workers / threads. "
+        "Every upload creates a document and an OCR job (identical bytes, so the "
+        "OCR cache answers them), and every check a row: use a local or staging "
+        "server, never production. Uploads are rate-limited per client; start the "
+        "server with OCR_UPLOAD_RATE=0 to measure capacity rather than the limit."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://localhost:8000", help="Server to load (http only).")
+        parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="Endpoints (default: both).")
+        parser.add_argument(
+            "--concurrency", default=DEFAULT_LEVELS, help=f"Comma-separated levels (default: {DEFAULT_LEVELS})."
+        )
+        parser.add_argument("--duration", type=float, default=15.0, help="Seconds per level.")
+        parser.add_argument(
+            "--requests", type=int, help="Requests per level instead of --duration (repeatable runs)."
+        )
+        parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds.")
+        parser.add_argument(
+            "--document-id",
+            type=int,
+            help="Academic document with extracted data for the eligibility checks (default: newest one).",
+        )
+        parser.add_argument("--slo-ms", type=float, default=1000.0, help="p95 latency a level must stay under.")
+        parser.add_argument("--max-error-rate", type=float, default=0.01, help="Error budget per level (0..1).")
+        parser.add_argument("--target-rps", type=float, help="Throughput the recommendation must sustain.")
+        # What the server under test runs with (gunicorn.conf.py defaults); the
+        # load generator can't see it
+        parser.add_argument("--server-workers", type=int, default=3, help="Gunicorn workers of the server.")
+        parser.add_argument("--server-threads", type=int, default=1, help="Gunicorn threads per worker.")
+        parser.add_argument(
+            "--server-cpus", type=int, default=os.cpu_count() or 1, help="CPUs of the server (default: this host's)."
+        )
+        parser.add_argument("--output", help="Also write the curves and recommendation as JSON to this file.")
+
+    def handle(self, *args, **options):
+        try:
+            target = Target(options["base_url"], timeout=options["timeout"])
+        except ValueError as e:
+            raise CommandError(str(e))
+        levels = _levels(options["concurrency"])
+        duration = None if options["requests"] else options["duration"]
+        names = options["scenario"] or list(SCENARIOS)
+
+        # Set up every scenario before loading anything: the eligibility document
+        # is looked up among the newest ones, which uploads would push out
+        scenarios = [getattr(self, f"_{name}_scenario")(target, options) for name in SCENARIOS if name in names]
+
+        curves: Dict[str, List[Dict[str, Any]]] = {}
+        for scenario in scenarios:
+            self._warm_up(target, scenario)
+            self.stdout.write(f"\n{scenario.method} {scenario.path}")
+            self.stdout.write(
+                f"{'conc':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>8}  statuses"
+            )
+            curves[scenario.name] = asyncio.run(
+                sweep(target, scenario, levels, duration, options["requests"], on_level=self._print_level)
+            )
+
+        advice = recommend(
+            curves,
+            server_workers=options["server_workers"],
+            server_threads=options["server_threads"],
+            server_cpus=options["server_cpus"],
+            slo_ms=options["slo_ms"],
+            max_error_rate=options["max_error_rate"],
+            target_rps=options["target_rps"],
+        )
+        self._print_recommendation(advice)
+
+        if options["output"]:
+            report = {
+                "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "base_url": options["base_url"],
+                "parameters": {
+                    "levels": levels,
+                    "duration": duration,
+                    "requests": options["requests"],
+                    "slo_ms": options["slo_ms"],
+                    "max_error_rate": options["max_error_rate"],
+                    "target_rps": options["target_rps"],
+                },
+                "curves": curves,
+                "recommendation": advice,
+            }
+            Path(options["output"]).write_text(json.dumps(report, indent=2) + "\n")
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}."))
+
+    def _warm_up(self, target: Target, scenario: Scenario):
+        # One untimed request: fails fast on a wrong URL or unusable document,
+        # and keeps lazy imports / first connections out of the first level
+        body, content_type = scenario.body()
+        try:
+            response = asyncio.run(target.request(scenario.method, scenario.path, body, content_type))
+        except (OSError, asyncio.TimeoutError) as e:
+            raise CommandError(f"{scenario.method} {scenario.path} failed: {e!r}")
+        if response.status not in scenario.expected:
+            raise CommandError(
+                f"{scenario.method} {scenario.path} returned {response.status}: {response.body[:300]!r}"
+            )
+
+    def _upload_scenario(self, target: Target, options) -> Scenario:
+        page = apply_variant(render_page(document_lines("academic", ACADEMIC_SAMPLES[0])), "scan")
+        buffer = io.BytesIO()
+        page.save(buffer, "PNG")
+        body = multipart({"doc_type": "academic"}, {"file": ("loadtest.png", buffer.getvalue(), "image/png")})
+        return Scenario("upload", "POST", reverse("document-upload"), lambda: body, expected=(202,))
+
+    def _eligibility_scenario(self, target: Target, options) -> Scenario:
+        document_id = options["document_id"] or self._find_document(target)
+
+        counter = itertools.count()
+
+        def body() -> Tuple[bytes, str]:
+            # Distinct scores per request (a million combinations), so every check is
+            # computed and written rather than answered from the idempotency fingerprint
+            n = next(counter)
+            scores = {
+                "listening": 6.0 + (n % 1000) / 1000,
+                "reading": 6.0 + (n // 1000 % 1000) / 1000,
+                "writing": 7.0,
+                "speaking": 7.0,
+            }
+            return json.dumps({"document_id": document_id, "ielts_scores": scores}).encode(), "application/json"
+
+        return Scenario("eligibility", "POST", reverse("eligibility-check"), body)
+
+    def _find_document(self, target: Target) -> int:
+        # Documents with an extracted percentage or GPA (indexed columns)
+        for column in ("min_percentage", "min_gpa"):
+            path = reverse("document-list") + f"?doc_type=academic&{column}=0&fields=id&page_size=1"
+            try:
+                response = asyncio.run(target.request("GET", path))
+            except (OSError, asyncio.TimeoutError) as e:
+                raise CommandError(f"GET {path} failed: {e!r}")
+            if response.status != 200:
+                raise CommandError(f"GET {path} returned {response.status}: {response.body[:300]!r}")
+            results = json.loads(response.body)["results"]
+            if results:
+                return results[0]["id"]
+        raise CommandError(
+            "No academic document with extracted data to check against: upload one and wait for "
+            "its OCR job, or pass --document-id."
+        )
+
+    def _print_level(self, point: Dict[str, Any]):
+        def ms(value):
+            return f"{value:9.1f}" if value is not None else f"{'-':>9}"
+
+        statuses = " ".join(f"{status}:{count}" for status, count in point["statuses"].items())
+        self.stdout.write(
+            f"{point['concurrency']:>5} {point['throughput_per_s']:9.2f} {ms(point['p50_ms'])} "
+            f"{ms(point['p95_ms'])} {ms(point['p99_ms'])} {point['error_rate']:8.1%}  {statuses}"
+        )
+
+    def _print_recommendation(self, advice: Dict[str, Any]):
+        configured = advice["configured"]
+        self.stdout.write(
+            f"\nServer under test: {configured['workers']} worker(s) x {configured['threads']} thread(s), "
+            f"{configured['cpus']} CPU(s)"
+        )
+        for name, finding in advice["scenarios"].items():
+            if finding["knee"] is None:
+                self.stdout.write(f"  {name}: {finding['note']}")
+                continue
+            knee = finding["knee"]
+            self.stdout.write(
+                f"  {name}: scales to {knee['concurrency']} concurrent requests "
+                f"({knee['throughput_per_s']} req/s, p95 {knee['p95_ms']} ms); "
+                f"{finding['effective_parallelism']} handled in parallel, limited by {finding['bottleneck']}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Recommended: GUNICORN_CMD_ARGS=\"{advice['gunicorn_args']}\""))
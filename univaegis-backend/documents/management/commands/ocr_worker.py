@@ -0,0 +1,105 @@
+import signal
+import multiprocessing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from prometheus_client import start_http_server
+
+from core import metrics
+
+from documents.jobs import work, default_worker_name
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the OCR worker pool. Each worker process claims queued OCRJob rows "
+        "from Postgres (FOR UPDATE SKIP LOCKED) and processes them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=getattr(settings, "OCR_WORKER_CONCURRENCY", 2),
+            help="Number of worker processes.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=getattr(settings, "OCR_QUEUE_POLL_INTERVAL", 1.0),
+            help="Seconds to sleep when the queue is empty.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Drain the queue and exit instead of polling forever.",
+        )
+        parser.add_argument(
+            "--metrics-port",
+            type=int,
+            help="Serve Prometheus metrics of all worker processes on this port.",
+        )
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options["concurrency"])
+        poll_interval = options["poll_interval"]
+        once = options["once"]
+        # Drop metric files of processes from the previous run before starting new ones
+        metrics.reset_multiprocess_dir()
+        if options["metrics_port"]:
+            start_http_server(options["metrics_port"], registry=metrics.registry())
+
+        if concurrency == 1:
+            processed = _run_worker(poll_interval, once)
+            self.stdout.write(self.style.SUCCESS(f"Processed {processed} OCR job(s)."))
+            return
+
+        # DB connections must not be shared across fork()
+        connections.close_all()
+
+        processes = [
+            multiprocessing.Process(target=_run_worker, args=(poll_interval, once), daemon=False)
+            for _ in range(concurrency)
+        ]
+        for p in processes:
+            p.start()
+        self.stdout.write(f"Started {concurrency} OCR worker process(es).")
+
+        def _forward(signum, frame):
+            for p in processes:
+                if p.is_alive():
+                    p.terminate()
+
+        signal.signal(signal.SIGTERM, _forward)
+        signal.signal(signal.SIGINT, _forward)
+
+        for p in processes:
+            p.join()
+            metrics.mark_process_dead(p.pid)
+
+        self.stdout.write(self.style.SUCCESS("OCR workers stopped."))
+
+
+def _run_worker(poll_interval: float, once: bool) -> int:
+    """
+    Entry point for one worker process. SIGTERM finishes the current job
+    and then exits, so a document is never left half-written.
+    """
+    stopping = {"flag": False}
+
+    def _stop(signum, frame):
+        stopping["flag"] = True
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    try:
+        return work(
+            worker_name=default_worker_name(),
+            poll_interval=poll_interval,
+            once=once,
+            should_stop=lambda: stopping["flag"],
+        )
+    finally:
+        connections.close_all()
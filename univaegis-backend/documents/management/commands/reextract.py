@@ -0,0 +1,169 @@
+import os
+import json
+import multiprocessing
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from documents.extraction import extract_fields
+from documents.models import EXTRACTED_COLUMNS, Document, DocumentText
+
+# (document id, doc_type, ocr_text)
+Row = Tuple[int, str, str]
+
+
+def _extract_batch(rows: List[Row]) -> List[Tuple[int, Dict[str, Any]]]:
+    """
+    Pool task: pure CPU, no DB access, so workers never touch a connection.
+    """
+    return [(pk, extract_fields(doc_type, text)) for pk, doc_type, text in rows]
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-run field extraction over stored ocr_text and write the results back "
+        "to Document.extracted_data. Streams rows, extracts in a process pool and "
+        "bulk-updates in batches. Note: this overwrites manual edits to extracted_data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Rows per extraction task / bulk_update.")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Extraction processes (1 extracts in-process, without a pool).",
+        )
+        parser.add_argument("--doc-type", choices=[c[0] for c in Document.DOC_TYPE_CHOICES], help="Only this doc_type.")
+        parser.add_argument(
+            "--checkpoint",
+            help="JSON file recording the last processed id; progress is resumed from it if it exists.",
+        )
+        parser.add_argument("--start-after", type=int, default=0, help="Only process ids greater than this.")
+        parser.add_argument("--limit", type=int, help="Stop after this many rows.")
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Print a per-field diff of what would change, without writing.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        workers = max(1, options["workers"])
+        dry_run = options["dry_run"]
+        checkpoint = options["checkpoint"]
+
+        start_after = options["start_after"]
+        if checkpoint and os.path.exists(checkpoint):
+            start_after = max(start_after, self._read_checkpoint(checkpoint))
+            self.stdout.write(f"Resuming after document id {start_after}.")
+
+        queryset = (
+            DocumentText.objects.filter(document_id__gt=start_after)
+            .exclude(content="")
+            .order_by("document_id")
+            .values_list("document_id", "document__doc_type", "content")
+        )
+        if options["doc_type"]:
+            queryset = queryset.filter(document__doc_type=options["doc_type"])
+        if options["limit"]:
+            queryset = queryset[: options["limit"]]
+
+        totals = {"scanned": 0, "changed": 0}
+
+        batches = self._batches(queryset, batch_size)
+        pool = None
+        if workers > 1:
+            # Fork before streaming so children don't inherit an open connection
+            connections.close_all()
+            pool = multiprocessing.Pool(workers)
+
+        try:
+            results_iter = (
+                self._extract_in_pool(pool, batches, workers) if pool else map(_extract_batch, batches)
+            )
+            for results in results_iter:
+                totals["scanned"] += len(results)
+                totals["changed"] += self._apply(results, dry_run)
+
+                if checkpoint and not dry_run:
+                    self._write_checkpoint(checkpoint, results[-1][0])
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+
+        verb = "would change" if dry_run else "updated"
+        self.stdout.write(
+            self.style.SUCCESS(f"Scanned {totals['scanned']} document(s), {verb} {totals['changed']}.")
+        )
+
+    def _batches(self, queryset, batch_size: int) -> Iterator[List[Row]]:
+        batch: List[Row] = []
+        for row in queryset.iterator(chunk_size=batch_size):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _extract_in_pool(self, pool, batches: Iterator[List[Row]], workers: int):
+        """
+        Like pool.imap, but keeps at most 2 * workers batches in flight so
+        memory stays bounded (imap would drain the whole queryset up front).
+        Results come back in id order, which keeps checkpoints monotonic.
+        """
+        pending = deque()
+        for batch in batches:
+            pending.append(pool.apply_async(_extract_batch, (batch,)))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+    def _apply(self, results: List[Tuple[int, Dict[str, Any]]], dry_run: bool) -> int:
+        """
+        Compare new extractions with what is stored; write (or print) only changes.
+        """
+        current = dict(
+            Document.objects.filter(pk__in=[pk for pk, _ in results]).values_list("pk", "extracted_data")
+        )
+
+        changed = []
+        for pk, extracted in results:
+            old = current.get(pk) or {}
+            if old == extracted:
+                continue
+            if dry_run:
+                self._print_diff(pk, old, extracted)
+            document = Document(pk=pk, extracted_data=extracted)
+            document.sync_extracted_columns()
+            changed.append(document)
+
+        if changed and not dry_run:
+            Document.objects.bulk_update(changed, ["extracted_data", *EXTRACTED_COLUMNS], batch_size=len(changed))
+        return len(changed)
+
+    def _print_diff(self, pk: int, old: Dict[str, Any], new: Dict[str, Any]) -> None:
+        self.stdout.write(f"Document {pk}:")
+        for key in sorted(set(old) | set(new)):
+            if key == "raw_text_snippet" or old.get(key) == new.get(key):
+                continue
+            self.stdout.write(f"  {key}: {old.get(key)!r} -> {new.get(key)!r}")
+
+    def _read_checkpoint(self, path: str) -> int:
+        try:
+            with open(path) as f:
+                return int(json.load(f)["last_id"])
+        except (ValueError, KeyError, OSError) as e:
+            raise CommandError(f"Unreadable checkpoint {path}: {e}")
+
+    def _write_checkpoint(self, path: str, last_id: Optional[int]) -> None:
+        # Write-then-rename so a crash never leaves a half-written checkpoint
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"last_id": last_id}, f)
+        os.replace(tmp, path)
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.26 on 2026-10-17 02:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0004_document_ocr_pages'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='ocrjob',
+            name='cache_hit',
+            field=models.BooleanField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='OCRCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64)),
+                ('engine_version', models.CharField(max_length=100)),
+                ('dpi', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='documents.document')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='ocrcacheentry',
+            constraint=models.UniqueConstraint(fields=('content_hash', 'engine_version', 'dpi'), name='ocr_cache_key_uniq'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.26 on 2026-10-17 02:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0005_ocr_result_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='field_confidence',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.26 on 2026-10-17 02:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+BATCH_SIZE = 500
+
+
+def move_ocr_text(apps, schema_editor):
+    Document = apps.get_model("documents", "Document")
+    DocumentText = apps.get_model("documents", "DocumentText")
+    rows = Document.objects.exclude(ocr_text="").values_list("pk", "ocr_text").iterator(chunk_size=BATCH_SIZE)
+    batch = []
+    for pk, text in rows:
+        batch.append(DocumentText(document_id=pk, content=text))
+        if len(batch) >= BATCH_SIZE:
+            DocumentText.objects.bulk_create(batch)
+            batch = []
+    DocumentText.objects.bulk_create(batch)
+
+
+def restore_ocr_text(apps, schema_editor):
+    Document = apps.get_model("documents", "Document")
+    DocumentText = apps.get_model("documents", "DocumentText")
+    rows = DocumentText.objects.values_list("document_id", "content").iterator(chunk_size=BATCH_SIZE)
+    batch = []
+    for pk, text in rows:
+        batch.append(Document(pk=pk, ocr_text=text))
+        if len(batch) >= BATCH_SIZE:
+            Document.objects.bulk_update(batch, ["ocr_text"])
+            batch = []
+    Document.objects.bulk_update(batch, ["ocr_text"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0007_uploadsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentText',
+            fields=[
+                ('document', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='text', serialize=False, to='documents.document')),
+                ('content', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.RunPython(move_ocr_text, restore_ocr_text),
+        migrations.RemoveField(
+            model_name='document',
+            name='ocr_text',
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.26 on 2026-10-17 02:34
+
+from django.db import migrations, models
+
+# icontains is UPPER(col) LIKE UPPER('%...%') on Postgres, so the trigram
+# index is on that expression. Admin search on document__original_filename
+# (eligibility checks) uses it too.
+TRGM_INDEX = "document_filename_trgm_idx"
+
+
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS {TRGM_INDEX} ON documents_document "
+        "USING gin (UPPER(original_filename) gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"DROP INDEX IF EXISTS {TRGM_INDEX}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0008_document_text'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['uploaded_at', 'id'], name='document_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['doc_type', 'uploaded_at', 'id'], name='document_type_uploaded_idx'),
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
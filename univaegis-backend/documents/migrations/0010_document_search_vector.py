@@ -0,0 +1,110 @@
+# Generated by Django 4.2.26 on 2026-10-17 02:35
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Postgres only: search_vector is kept up to date by triggers, so every
+# write path (workers, PATCH, reextract's bulk_update, admin, raw SQL)
+# is covered without application code. Keep the config and the weighted
+# extracted_data keys in sync with documents/search.py.
+CREATE_SQL = """
+CREATE FUNCTION documents_search_vector(content text, extracted jsonb) RETURNS tsvector AS $$
+    SELECT setweight(to_tsvector('english', concat_ws(' ',
+               extracted->>'student_name', extracted->>'university', extracted->>'course',
+               extracted->>'bank_name', extracted->>'account_holder')), 'A')
+        || setweight(to_tsvector('english', coalesce(content, '')), 'B')
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE FUNCTION documents_text_search_trigger() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := documents_search_vector(
+        NEW.content,
+        (SELECT extracted_data FROM documents_document WHERE id = NEW.document_id)
+    );
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER documents_text_search
+    BEFORE INSERT OR UPDATE OF content ON documents_documenttext
+    FOR EACH ROW EXECUTE FUNCTION documents_text_search_trigger();
+
+CREATE FUNCTION documents_extracted_search_trigger() RETURNS trigger AS $$
+BEGIN
+    UPDATE documents_documenttext
+       SET search_vector = documents_search_vector(content, NEW.extracted_data)
+     WHERE document_id = NEW.id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER documents_extracted_search
+    AFTER UPDATE OF extracted_data ON documents_document
+    FOR EACH ROW WHEN (OLD.extracted_data IS DISTINCT FROM NEW.extracted_data)
+    EXECUTE FUNCTION documents_extracted_search_trigger();
+"""
+
+DROP_SQL = """
+DROP TRIGGER IF EXISTS documents_extracted_search ON documents_document;
+DROP FUNCTION IF EXISTS documents_extracted_search_trigger();
+DROP TRIGGER IF EXISTS documents_text_search ON documents_documenttext;
+DROP FUNCTION IF EXISTS documents_text_search_trigger();
+DROP FUNCTION IF EXISTS documents_search_vector(text, jsonb);
+DROP INDEX IF EXISTS documenttext_search_gin_idx;
+"""
+
+BACKFILL_BATCH = 5000
+
+
+def create_search(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(CREATE_SQL)
+
+    # Backfill in id ranges, walked by keyset; the migration is not atomic,
+    # so each batch commits and no transaction holds the whole table
+    DocumentText = apps.get_model("documents", "DocumentText")
+    last = 0
+    while True:
+        batch = list(
+            DocumentText.objects.filter(document_id__gt=last)
+            .order_by("document_id")
+            .values_list("document_id", flat=True)[:BACKFILL_BATCH]
+        )
+        if not batch:
+            break
+        last = batch[-1]
+        schema_editor.execute(
+            "UPDATE documents_documenttext t "
+            "SET search_vector = documents_search_vector(t.content, d.extracted_data) "
+            "FROM documents_document d "
+            "WHERE d.id = t.document_id AND t.document_id BETWEEN %s AND %s",
+            [batch[0], batch[-1]],
+        )
+
+    schema_editor.execute(
+        "CREATE INDEX documenttext_search_gin_idx ON documents_documenttext USING gin (search_vector)"
+    )
+
+
+def drop_search(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(DROP_SQL)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('documents', '0009_document_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documenttext',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search, drop_search),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 4.2.26 on 2026-10-17 02:37
+
+from django.db import migrations, models
+
+COLUMNS = ("percentage", "gpa", "available_balance")
+BATCH_SIZE = 1000
+
+
+def _as_float(value):
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def backfill(apps, schema_editor):
+    # Before the indexes are built, so the batches don't pay for index maintenance.
+    # The migration is not atomic: each batch (keyset on pk) commits on its own.
+    Document = apps.get_model("documents", "Document")
+    rows = Document.objects.filter(extracted_data__isnull=False).order_by("pk").values_list("pk", "extracted_data")
+    last = 0
+    while True:
+        batch = [
+            Document(pk=pk, **{name: _as_float(data.get(name) if isinstance(data, dict) else None) for name in COLUMNS})
+            for pk, data in rows.filter(pk__gt=last)[:BATCH_SIZE]
+        ]
+        if not batch:
+            break
+        last = batch[-1].pk
+        Document.objects.bulk_update(batch, COLUMNS)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('documents', '0010_document_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='available_balance',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='gpa',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='percentage',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(condition=models.Q(('percentage__isnull', False)), fields=['percentage'], name='document_percentage_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(condition=models.Q(('gpa__isnull', False)), fields=['gpa'], name='document_gpa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(condition=models.Q(('available_balance__isnull', False)), fields=['available_balance'], name='document_balance_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.26 on 2026-10-17 03:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0012_ocrjob_heartbeat_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='uploadsession',
+            name='lease_token',
+            field=models.CharField(blank=True, max_length=32),
+        ),
+    ]
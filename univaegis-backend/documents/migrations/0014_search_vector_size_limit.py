@@ -0,0 +1,50 @@
+from django.db import migrations
+
+# Postgres rejects a tsvector over 1 MB, which failed the whole write (and
+# with it the OCR job) for very long OCR texts. Only the first
+# SEARCH_MAX_CHARS characters of the text are indexed (documents/search.py),
+# and if that is still too big, only the extracted names.
+CREATE_SQL = """
+CREATE OR REPLACE FUNCTION documents_search_vector(content text, extracted jsonb) RETURNS tsvector AS $$
+DECLARE
+    names tsvector := setweight(to_tsvector('english', concat_ws(' ',
+        extracted->>'student_name', extracted->>'university', extracted->>'course',
+        extracted->>'bank_name', extracted->>'account_holder')), 'A');
+BEGIN
+    RETURN names || setweight(to_tsvector('english', left(coalesce(content, ''), 250000)), 'B');
+EXCEPTION WHEN program_limit_exceeded THEN
+    RETURN names;
+END
+$$ LANGUAGE plpgsql IMMUTABLE;
+"""
+
+# As created by 0010
+REVERSE_SQL = """
+CREATE OR REPLACE FUNCTION documents_search_vector(content text, extracted jsonb) RETURNS tsvector AS $$
+    SELECT setweight(to_tsvector('english', concat_ws(' ',
+               extracted->>'student_name', extracted->>'university', extracted->>'course',
+               extracted->>'bank_name', extracted->>'account_holder')), 'A')
+        || setweight(to_tsvector('english', coalesce(content, '')), 'B')
+$$ LANGUAGE sql IMMUTABLE;
+"""
+
+
+def limit_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(CREATE_SQL)
+
+
+def unlimit_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(REVERSE_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0013_uploadsession_lease'),
+    ]
+
+    operations = [
+        migrations.RunPython(limit_search_vector, unlimit_search_vector),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.26 on 2026-10-17 03:31
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+BATCH_SIZE = 1000
+
+
+def backfill(apps, schema_editor):
+    # Before the index is built; not atomic, so each batch (keyset on pk) commits on its own
+    Document = apps.get_model("documents", "Document")
+    EligibilityCheck = apps.get_model("eligibility", "EligibilityCheck")
+    latest = EligibilityCheck.objects.filter(document=OuterRef("pk")).order_by("-id").values("is_eligible")[:1]
+    checked = EligibilityCheck.objects.order_by("document_id").values_list("document_id", flat=True).distinct()
+    last = 0
+    while True:
+        batch = list(checked.filter(document_id__gt=last)[:BATCH_SIZE])
+        if not batch:
+            break
+        last = batch[-1]
+        Document.objects.filter(pk__in=batch).update(latest_eligible=Subquery(latest))
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('documents', '0014_search_vector_size_limit'),
+        ('eligibility', '0004_check_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='latest_eligible',
+            field=models.BooleanField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['latest_eligible', 'uploaded_at', 'id'], name='document_eligible_uploaded_idx'),
+        ),
+    ]
@@ -1,4 +1,32 @@
+from typing import Any, Iterable, Optional
+
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import Q
+
+# extracted_data keys copied into typed, indexed Document columns
+EXTRACTED_COLUMNS = ("percentage", "gpa", "available_balance")
+
+
+def _as_float(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class DocumentQuerySet(models.QuerySet):
+    def for_fields(self, fields: Iterable[str]) -> "DocumentQuerySet":
+        """
+        Load only the columns behind these (serializer) field names.
+        ocr_text lives in DocumentText and is joined in only when asked for.
+        """
+        fields = set(fields)
+        columns = {f.name for f in Document._meta.concrete_fields} & fields
+        queryset = self.only("id", *columns)
+        if "ocr_text" in fields:
+            queryset = queryset.select_related("text").defer("text__search_vector")
+        return queryset
 
 
 class Document(models.Model):
@@ -15,10 +43,222 @@ class Document(models.Model):
     )
     original_filename = models.CharField(max_length=255, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
-    ocr_text = models.TextField(blank=True)
+    # Raw OCR text is in DocumentText, see the ocr_text property
     extracted_data = models.JSONField(null=True, blank=True)
+    # Character-weighted mean Tesseract word confidence, 0..1
     ocr_confidence = models.FloatField(null=True, blank=True)
+    # Per page: [{"page": 1, "source": "text_layer" | "ocr", "confidence": 0.93}, ...]
+    ocr_pages = models.JSONField(null=True, blank=True)
+    # Per extracted field: lowest word confidence (0..1) in the matched text
+    field_confidence = models.JSONField(null=True, blank=True)
+    # SHA-256 of the uploaded file, computed while it is written to storage
+    content_hash = models.CharField(max_length=64, blank=True)
+    # Typed copies of EXTRACTED_COLUMNS from extracted_data, kept in sync by
+    # save(), so structured queries ("gpa >= 8") can use an index
+    percentage = models.FloatField(null=True, blank=True, editable=False)
+    gpa = models.FloatField(null=True, blank=True, editable=False)
+    available_balance = models.FloatField(null=True, blank=True, editable=False)
+    # Outcome of the newest EligibilityCheck, null before the first one;
+    # kept current by eligibility/latest.py
+    latest_eligible = models.BooleanField(null=True, blank=True, editable=False)
 
+    objects = DocumentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of GET /api/documents/, newest first, optionally per doc_type.
+            # Filename search uses a trigram index on UPPER(original_filename), see migration 0009.
+            models.Index(fields=["uploaded_at", "id"], name="document_uploaded_idx"),
+            models.Index(fields=["doc_type", "uploaded_at", "id"], name="document_type_uploaded_idx"),
+            # ?eligible= filter, in keyset order
+            models.Index(fields=["latest_eligible", "uploaded_at", "id"], name="document_eligible_uploaded_idx"),
+            # Partial: most documents only have one of these
+            models.Index(fields=["percentage"], name="document_percentage_idx", condition=Q(percentage__isnull=False)),
+            models.Index(fields=["gpa"], name="document_gpa_idx", condition=Q(gpa__isnull=False)),
+            models.Index(
+                fields=["available_balance"],
+                name="document_balance_idx",
+                condition=Q(available_balance__isnull=False),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.original_filename or self.file.name} ({self.doc_type})"
+
+    def sync_extracted_columns(self) -> None:
+        data = self.extracted_data or {}
+        for name in EXTRACTED_COLUMNS:
+            setattr(self, name, _as_float(data.get(name)))
+
+    def save(self, *args, **kwargs):
+        # Bulk writes (bulk_update, update()) must call sync_extracted_columns() themselves
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "extracted_data" in update_fields:
+            self.sync_extracted_columns()
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, *EXTRACTED_COLUMNS}
+        super().save(*args, **kwargs)
+
+    @property
+    def ocr_text(self) -> str:
+        """
+        Raw OCR output, loaded on first access (one query, unless the
+        queryset used select_related("text")). "" before OCR has run.
+        """
+        try:
+            return self.text.content
+        except DocumentText.DoesNotExist:
+            return ""
+
+    def save_ocr_text(self, content: str) -> None:
+        text, _ = DocumentText.objects.update_or_create(document=self, defaults={"content": content})
+        self.text = text
+
+
+class DocumentText(models.Model):
+    """
+    Raw OCR text of a Document, kept out of the documents table.
+
+    It can be hundreds of KB per document but is only read by
+    re-extraction and on explicit request (?include=ocr_text), so keeping
+    it in its own table keeps Document rows narrow for every list, lookup
+    and eligibility query. Postgres compresses it (TOAST) on its own.
+    """
+    document = models.OneToOneField(
+        Document,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="text",
+    )
+    content = models.TextField(blank=True)
+    # Full-text index of content + names from extracted_data, maintained by
+    # Postgres triggers and GIN-indexed (migration 0010, documents/search.py)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    def __str__(self):
+        return f"DocumentText(document_id={self.document_id}, {len(self.content)} chars)"
+
+
+class OCRJob(models.Model):
+    """
+    A queued OCR run for a Document.
+
+    Upload only creates the row; `manage.py ocr_worker` claims queued jobs
+    with SELECT ... FOR UPDATE SKIP LOCKED, so Postgres itself is the queue
+    and no external broker is needed.
+    """
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = (
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    )
+
+    document = models.ForeignKey(
+        Document,
+        on_delete=models.CASCADE,
+        related_name="ocr_jobs",
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_QUEUED,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    # Whether the result came from the OCR cache (None until the job finishes)
+    cache_hit = models.BooleanField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Refreshed by whoever runs the job; a running job whose heartbeat
+    # stopped is abandoned (see jobs.requeue_stale_jobs)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers always look for the oldest queued job
+            models.Index(fields=["status", "created_at"], name="ocrjob_status_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"OCRJob(document_id={self.document_id}, status={self.status})"
+
+
+class OCRCacheEntry(models.Model):
+    """
+    Points an OCR cache key (content hash + engine version + DPI) at the
+    Document whose OCR results can be reused for identical uploads.
+    """
+    content_hash = models.CharField(max_length=64)
+    engine_version = models.CharField(max_length=100)
+    dpi = models.PositiveIntegerField()
+    document = models.ForeignKey(
+        Document,
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["content_hash", "engine_version", "dpi"],
+                name="ocr_cache_key_uniq",
+            ),
+        ]
+
+    def __str__(self):
+        return f"OCRCacheEntry({self.content_hash[:12]}, document_id={self.document_id})"
+
+
+class UploadSession(models.Model):
+    """
+    A resumable chunked upload of one large file.
+
+    Chunks are appended straight into `part_name` in the Document file
+    storage at the offset the client sends, so a dropped connection only
+    loses the chunk in flight. Finalizing checks the SHA-256, moves the
+    part file into place and creates the Document + OCRJob.
+
+    The request writing to the part file holds a lease (lease_token,
+    lease_expires_at) instead of a row lock, so no transaction stays open
+    while a slow client streams its chunk.
+    """
+    STATUS_OPEN = "open"
+    STATUS_COMPLETE = "complete"
+    STATUS_CHOICES = (
+        (STATUS_OPEN, "Open"),
+        (STATUS_COMPLETE, "Complete"),
+    )
+
+    doc_type = models.CharField(max_length=20, choices=Document.DOC_TYPE_CHOICES)
+    original_filename = models.CharField(max_length=255)
+    # Declared total size in bytes, and how many have been written so far
+    size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    # Expected SHA-256, if the client sent it at init (it may also send it at finalize)
+    sha256 = models.CharField(max_length=64, blank=True)
+    part_name = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_OPEN)
+    document = models.ForeignKey(
+        Document,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    lease_token = models.CharField(max_length=32, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"UploadSession({self.original_filename}, {self.received}/{self.size})"
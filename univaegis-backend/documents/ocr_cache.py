@@ -0,0 +1,82 @@
+from typing import Dict, Any, Optional
+
+from django.conf import settings
+from django.db.models import Count, Q
+
+from .models import Document, OCRJob, OCRCacheEntry
+from .utils import get_ocr_engine_version, get_pdf_dpi
+
+
+def is_enabled() -> bool:
+    return getattr(settings, "OCR_CACHE_ENABLED", True)
+
+
+def cache_key(document: Document) -> Optional[Dict[str, Any]]:
+    """
+    Cache key for a document's OCR result, or None if it can't be cached
+    (cache disabled, or uploaded before content hashing existed).
+    """
+    if not is_enabled() or not document.content_hash:
+        return None
+    return {
+        "content_hash": document.content_hash,
+        "engine_version": get_ocr_engine_version(),
+        "dpi": get_pdf_dpi(),
+    }
+
+
+def lookup(document: Document) -> Optional[Document]:
+    """
+    Return an earlier Document with identical content whose OCR results
+    can be reused, or None on a cache miss.
+    """
+    key = cache_key(document)
+    if key is None:
+        return None
+
+    entry = (
+        OCRCacheEntry.objects.filter(**key)
+        .exclude(document=document)
+        .select_related("document", "document__text")
+        .defer("document__text__search_vector")
+        .first()
+    )
+    return entry.document if entry else None
+
+
+def store(document: Document) -> None:
+    """
+    Register a processed document as the cached result for its content.
+    Empty OCR output is not cached, so a failed run can be retried later.
+    """
+    key = cache_key(document)
+    if key is None or not document.ocr_text:
+        return
+
+    # Two workers may finish the same content at once; first one wins
+    OCRCacheEntry.objects.bulk_create(
+        [OCRCacheEntry(document=document, **key)],
+        ignore_conflicts=True,
+    )
+
+
+def stats() -> Dict[str, Any]:
+    """
+    Hit/miss counters for monitoring, derived from finished OCR jobs:
+    documents whose OCR was reused vs. run. Failed and retried runs don't
+    count, and a document re-run later counts once.
+    """
+    done = Q(status=OCRJob.STATUS_DONE)
+    counts = OCRJob.objects.aggregate(
+        hits=Count("document", distinct=True, filter=done & Q(cache_hit=True)),
+        misses=Count("document", distinct=True, filter=done & Q(cache_hit=False)),
+    )
+    total = counts["hits"] + counts["misses"]
+    return {
+        "enabled": is_enabled(),
+        "engine_version": get_ocr_engine_version(),
+        "entries": OCRCacheEntry.objects.count(),
+        "hits": counts["hits"],
+        "misses": counts["misses"],
+        "hit_ratio": round(counts["hits"] / total, 4) if total else None,
+    }
@@ -0,0 +1,205 @@
+"""
+Image preprocessing before Tesseract.
+
+Tesseract's runtime grows with pixel count and it reads best when text
+is roughly 20-40 px tall, so phone photos (12+ MP) are mostly wasted
+work. preprocess_for_ocr() normalizes every image (uploads and
+rasterized PDF pages) by:
+
+  1. resizing so the median text line is OCR_TARGET_TEXT_HEIGHT px,
+  2. deskewing (projection-profile search),
+  3. cropping dark background and empty margins around the text,
+  4. binarizing with an Otsu threshold.
+
+All measurements run on a small thumbnail with NumPy; the full-size
+image only goes through one resize, one rotate, one crop and one LUT.
+"""
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from PIL import Image
+
+# Thumbnail used for all measurements
+_ANALYSIS_MAX_SIDE = 1200
+# Skew search range (degrees), coarse pass then a fine pass around the best angle
+_SKEW_RANGE = 5.0
+_SKEW_COARSE_STEP = 1.0
+_SKEW_FINE_STEP = 0.2
+# Rows/cols with less ink than this are treated as empty (specks, noise)
+_EMPTY_INK_FRACTION = 0.002
+# Scale limits: never blow small images up or shrink big ones beyond these
+_MIN_SCALE = 0.2
+_MAX_SCALE = 2.0
+
+
+def is_enabled() -> bool:
+    return getattr(settings, "OCR_PREPROCESS_ENABLED", True)
+
+
+def get_target_text_height() -> int:
+    return getattr(settings, "OCR_TARGET_TEXT_HEIGHT", 32)
+
+
+def otsu_threshold(gray: np.ndarray) -> int:
+    """
+    Otsu's threshold for a uint8 grayscale array (vectorized over the histogram).
+    Pixels `< threshold` are ink.
+    """
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    omega = np.cumsum(hist) / gray.size
+    mu = np.cumsum(hist * np.arange(256)) / gray.size
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = (mu[-1] * omega - mu) ** 2 / (omega * (1.0 - omega))
+    between[~np.isfinite(between)] = 0.0
+    # between[k] splits into [0, k] and [k + 1, 255]
+    return int(np.argmax(between)) + 1
+
+
+def _profile_score(ink_image: Image.Image, angle: float) -> float:
+    """
+    Sharpness of the horizontal projection profile after rotating by `angle`.
+    Text lines aligned with rows give tall peaks and deep gaps.
+    """
+    rotated = np.asarray(ink_image.rotate(angle, resample=Image.NEAREST, expand=True, fillcolor=0))
+    rows = rotated.sum(axis=1, dtype=np.float64)
+    return float(np.square(np.diff(rows)).sum())
+
+
+def strip_border(ink: np.ndarray) -> np.ndarray:
+    """
+    Remove dark background around the page (scanner lid, table under a
+    phone photo). Any dark run that reaches an image edge in a straight
+    line is background; for a convex page, even a rotated one, that is
+    exactly the region outside the page. Text never reaches the edge
+    because of the page margins.
+    """
+    from_left = np.logical_and.accumulate(ink, axis=1)
+    from_right = np.logical_and.accumulate(ink[:, ::-1], axis=1)[:, ::-1]
+    from_top = np.logical_and.accumulate(ink, axis=0)
+    from_bottom = np.logical_and.accumulate(ink[::-1], axis=0)[::-1]
+    return ink & ~(from_left | from_right | from_top | from_bottom)
+
+
+def estimate_skew(ink: np.ndarray) -> float:
+    """
+    Angle (degrees, PIL rotate convention) that best straightens the text.
+    """
+    if not ink.any():
+        return 0.0
+    ink_image = Image.fromarray((ink * 255).astype(np.uint8))
+
+    def best(angles: np.ndarray) -> float:
+        scores = [_profile_score(ink_image, a) for a in angles]
+        return float(angles[int(np.argmax(scores))])
+
+    coarse = best(np.arange(-_SKEW_RANGE, _SKEW_RANGE + 1e-9, _SKEW_COARSE_STEP))
+    return best(np.arange(coarse - _SKEW_COARSE_STEP, coarse + _SKEW_COARSE_STEP + 1e-9, _SKEW_FINE_STEP))
+
+
+def _ink_rows(ink: np.ndarray) -> np.ndarray:
+    return ink.mean(axis=1) > _EMPTY_INK_FRACTION
+
+
+def content_box(ink: np.ndarray) -> Optional[Tuple[float, float, float, float]]:
+    """
+    Bounding box of the text plus a small margin, as fractions
+    (left, top, right, bottom). None when the image has no ink.
+    """
+    rows = np.flatnonzero(_ink_rows(ink))
+    cols = np.flatnonzero(ink.mean(axis=0) > _EMPTY_INK_FRACTION)
+    if not len(rows) or not len(cols):
+        return None
+
+    h, w = ink.shape
+    pad_y, pad_x = max(2, h // 50), max(2, w // 50)
+    return (
+        max(cols[0] - pad_x, 0) / w,
+        max(rows[0] - pad_y, 0) / h,
+        min(cols[-1] + 1 + pad_x, w) / w,
+        min(rows[-1] + 1 + pad_y, h) / h,
+    )
+
+
+def estimate_text_height(ink: np.ndarray) -> Optional[float]:
+    """
+    Median height (px) of runs of consecutive rows containing ink,
+    i.e. the typical text line height. None if there are too few lines.
+    """
+    edges = np.diff(np.concatenate(([0], _ink_rows(ink).astype(np.int8), [0])))
+    runs = np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+    runs = runs[runs >= 2]
+    if len(runs) < 3:
+        return None
+    return float(np.median(runs))
+
+
+def preprocess_for_ocr(image: Image.Image, max_pixels: Optional[int] = None) -> Image.Image:
+    """
+    Return a resized, deskewed, cropped, binarized grayscale copy of `image`.
+    Each step can be switched off in settings (OCR_DESKEW, OCR_CROP_BORDER,
+    OCR_BINARIZE); the whole stage with OCR_PREPROCESS_ENABLED.
+
+    The input already passed the pixel guard (OCR_MAX_IMAGE_PIXELS);
+    `max_pixels` caps upscaling so the resized image stays within it too.
+    """
+    gray = image.convert("L")
+
+    thumb = gray.copy()
+    thumb.thumbnail((_ANALYSIS_MAX_SIDE, _ANALYSIS_MAX_SIDE))
+    ratio = thumb.width / gray.width
+
+    threshold = otsu_threshold(np.asarray(thumb))
+    ink = np.asarray(thumb) < threshold
+    if getattr(settings, "OCR_CROP_BORDER", True):
+        ink = strip_border(ink)
+
+    angle = 0.0
+    if getattr(settings, "OCR_DESKEW", True):
+        angle = estimate_skew(ink)
+        if abs(angle) >= 0.2:
+            rotated = Image.fromarray((ink * 255).astype(np.uint8)).rotate(angle, expand=True, fillcolor=0)
+            ink = np.asarray(rotated) > 127
+        else:
+            angle = 0.0
+
+    box = content_box(ink) if getattr(settings, "OCR_CROP_BORDER", True) else None
+
+    # Scale so text lines end up at the target height
+    scale = 1.0
+    text_height = estimate_text_height(ink)
+    if text_height:
+        scale = get_target_text_height() / (text_height / ratio)
+        scale = min(max(scale, _MIN_SCALE), _MAX_SCALE)
+        if max_pixels and scale > 1.0:
+            # rotate(expand=True) grows the canvas too, rounding its sides up;
+            # 1% headroom covers that rounding
+            cos, sin = abs(math.cos(math.radians(angle))), abs(math.sin(math.radians(angle)))
+            w, h = gray.size
+            grown = (w * cos + h * sin) * (h * cos + w * sin)
+            scale = min(scale, max(1.0, 0.99 * math.sqrt(max_pixels / grown)))
+        if 0.9 <= scale <= 1.1:
+            scale = 1.0
+
+    # Resize first so rotate/crop/LUT touch as few pixels as possible
+    if scale != 1.0:
+        gray = gray.resize(
+            (max(1, int(gray.width * scale)), max(1, int(gray.height * scale))),
+            resample=Image.LANCZOS if scale < 1.0 else Image.BICUBIC,
+        )
+    if angle:
+        gray = gray.rotate(angle, resample=Image.BILINEAR, expand=True, fillcolor=255)
+    if box:
+        gray = gray.crop(
+            (
+                int(box[0] * gray.width),
+                int(box[1] * gray.height),
+                int(np.ceil(box[2] * gray.width)),
+                int(np.ceil(box[3] * gray.height)),
+            )
+        )
+    if getattr(settings, "OCR_BINARIZE", True):
+        gray = gray.point([0 if v < threshold else 255 for v in range(256)])
+
+    return gray
@@ -0,0 +1,72 @@
+"""
+Full-text search over OCR text (Postgres only).
+
+DocumentText.search_vector is maintained by triggers (migration 0010):
+names from extracted_data (student_name, university, course, bank_name,
+account_holder) with weight A, the OCR text with weight B, all in the
+"english" configuration. A GIN index on it makes matching an index
+lookup; only the matches are ranked, and only the returned page is
+highlighted, since ts_headline re-parses the whole text.
+
+Only the first SEARCH_MAX_CHARS characters of a text are indexed
+(migration 0014), keeping the tsvector under Postgres' 1 MB limit.
+"""
+from typing import Any, Dict, List, Optional
+
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F
+
+from .models import DocumentText
+
+# Must match the configuration and length used by documents_search_vector() in the migrations
+SEARCH_CONFIG = "english"
+SEARCH_MAX_CHARS = 250000
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+
+
+def search_available() -> bool:
+    """
+    The search_vector triggers and index only exist on Postgres.
+    """
+    return connection.vendor == "postgresql"
+
+
+def search_documents(text: str, doc_type: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Best `limit` matches for a web-search style query ("state bank" -loan),
+    as [{"document_id", "rank", "highlight"}], best first.
+    """
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type="websearch")
+
+    matches = DocumentText.objects.filter(search_vector=query)
+    if doc_type:
+        matches = matches.filter(document__doc_type=doc_type)
+    top = list(
+        matches.annotate(rank=SearchRank(F("search_vector"), query, cover_density=True))
+        .order_by("-rank", "-document_id")
+        .values_list("document_id", "rank")[:limit]
+    )
+    if not top:
+        return []
+
+    headlines = dict(
+        DocumentText.objects.filter(document_id__in=[pk for pk, _ in top])
+        .annotate(
+            highlight=SearchHeadline(
+                "content",
+                query,
+                config=SEARCH_CONFIG,
+                start_sel=HIGHLIGHT_START,
+                stop_sel=HIGHLIGHT_STOP,
+                max_fragments=3,
+            )
+        )
+        .values_list("document_id", "highlight")
+    )
+    return [
+        {"document_id": pk, "rank": round(rank, 6), "highlight": headlines.get(pk, "")}
+        for pk, rank in top
+    ]
@@ -1,8 +1,50 @@
+from typing import Dict, List
+
+from django.conf import settings
 from rest_framework import serializers
-from .models import Document
+from .models import Document, OCRJob, UploadSession
+from .utils import HashingFile
+
+
+def get_batch_max_files() -> int:
+    return getattr(settings, "DOCUMENT_BATCH_MAX_FILES", 20)
+
+
+def build_document(validated_data) -> Document:
+    """
+    Unsaved Document with its file already written to storage.
+    The file is written through HashingFile so the content hash is
+    known before INSERT, unless the upload handler already hashed it
+    (HashingTemporaryFileUploadHandler), in which case storage just
+    moves the temp file.
+    """
+    validated_data = dict(validated_data)
+    file_obj = validated_data.pop("file", None)
+    if file_obj and not validated_data.get("original_filename"):
+        validated_data["original_filename"] = file_obj.name
+
+    document = Document(**validated_data)
+    if file_obj and getattr(file_obj, "sha256", None):
+        document.file.save(file_obj.name, file_obj, save=False)
+        document.content_hash = file_obj.sha256
+    elif file_obj:
+        hashed = HashingFile(file_obj)
+        document.file.save(file_obj.name, hashed, save=False)
+        document.content_hash = hashed.hexdigest()
+    return document
 
 
 class DocumentSerializer(serializers.ModelSerializer):
+    """
+    Document responses are sparse: ocr_text (OPTIONAL_FIELDS) is only
+    returned when asked for, and `fields` narrows the output further.
+    Views take both from ?fields= and ?include=, see sparse_fields().
+    """
+
+    OPTIONAL_FIELDS = ("ocr_text",)
+
+    ocr_text = serializers.CharField(read_only=True)
+
     class Meta:
         model = Document
         fields = [
@@ -14,21 +56,153 @@ class DocumentSerializer(serializers.ModelSerializer):
             "ocr_text",
             "extracted_data",
             "ocr_confidence",
+            "ocr_pages",
+            "field_confidence",
+            "content_hash",
         ]
         read_only_fields = [
             "id",
             "uploaded_at",
             "original_filename",
-            "ocr_text",
             "extracted_data",
             "ocr_confidence",
+            "ocr_pages",
+            "field_confidence",
+            "content_hash",
         ]
 
+    def __init__(self, *args, fields=None, include=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        keep = set(fields) if fields else set(self.fields) - set(self.OPTIONAL_FIELDS)
+        keep |= set(include)
+        for name in set(self.fields) - keep:
+            self.fields.pop(name)
+
+    @classmethod
+    def sparse_fields(cls, query_params) -> Dict[str, List[str]]:
+        """
+        ?fields=id,extracted_data&include=ocr_text as __init__ kwargs
+        (also usable with Document.objects.for_fields()).
+        """
+        known = cls.Meta.fields
+        kwargs = {}
+        for param in ("fields", "include"):
+            names = [n.strip() for n in query_params.get(param, "").split(",") if n.strip()]
+            unknown = [n for n in names if n not in known]
+            if unknown:
+                raise serializers.ValidationError({param: [f"Unknown field(s): {', '.join(unknown)}."]})
+            if names:
+                kwargs[param] = names
+        return kwargs
+
+    @classmethod
+    def field_names(cls, fields=None, include=()) -> List[str]:
+        return list(cls(fields=fields, include=include).fields)
+
     def create(self, validated_data):
-        file_obj = validated_data.get("file")
-        if file_obj and not validated_data.get("original_filename"):
-            validated_data["original_filename"] = file_obj.name
-        return super().create(validated_data)
+        document = build_document(validated_data)
+        document.save()
+        return document
+
+
+class DocumentListQuerySerializer(serializers.Serializer):
+    """
+    Filters for GET /api/documents/ (query params; all optional).
+    """
+
+    doc_type = serializers.ChoiceField(choices=Document.DOC_TYPE_CHOICES, required=False)
+    min_confidence = serializers.FloatField(required=False, min_value=0.0, max_value=1.0)
+    max_confidence = serializers.FloatField(required=False, min_value=0.0, max_value=1.0)
+    # Outcome of the document's latest eligibility check
+    eligible = serializers.BooleanField(required=False, allow_null=True)
+    # Case-insensitive substring of the original filename (trigram-indexed)
+    q = serializers.CharField(required=False, max_length=255)
+    # Lower bounds on the typed extracted columns
+    min_percentage = serializers.FloatField(required=False)
+    min_gpa = serializers.FloatField(required=False)
+    min_balance = serializers.FloatField(required=False)
+
+
+def get_search_max_results() -> int:
+    return getattr(settings, "DOCUMENT_SEARCH_MAX_RESULTS", 100)
+
+
+class DocumentSearchQuerySerializer(serializers.Serializer):
+    """
+    GET /api/documents/search/ query params.
+    """
+
+    q = serializers.CharField(max_length=500)
+    doc_type = serializers.ChoiceField(choices=Document.DOC_TYPE_CHOICES, required=False)
+    limit = serializers.IntegerField(required=False, min_value=1, default=20)
+
+    def validate_limit(self, value):
+        return min(value, get_search_max_results())
+
+
+class BatchUploadSerializer(serializers.Serializer):
+    """
+    Multipart batch upload: repeated `files` parts and either one
+    `doc_type` for all of them or one `doc_type` per file, in order.
+    """
+
+    files = serializers.ListField(child=serializers.FileField(), allow_empty=False)
+    doc_type = serializers.ListField(
+        child=serializers.ChoiceField(choices=Document.DOC_TYPE_CHOICES), allow_empty=False
+    )
+
+    def validate_files(self, value):
+        max_files = get_batch_max_files()
+        if len(value) > max_files:
+            raise serializers.ValidationError(f"At most {max_files} files per batch.")
+        return value
+
+    def validate(self, attrs):
+        files, doc_types = attrs["files"], attrs["doc_type"]
+        if len(doc_types) == 1:
+            doc_types = doc_types * len(files)
+        elif len(doc_types) != len(files):
+            raise serializers.ValidationError(
+                {"doc_type": [f"Expected 1 or {len(files)} values, got {len(doc_types)}."]}
+            )
+        attrs["doc_type"] = doc_types
+        return attrs
+
+
+class OCRJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = OCRJob
+        fields = [
+            "id",
+            "document",
+            "status",
+            "attempts",
+            "cache_hit",
+            "error",
+            "created_at",
+            "started_at",
+            "finished_at",
+        ]
+        read_only_fields = fields
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """
+    Init of a resumable upload: doc_type, filename, total size and,
+    optionally, the expected SHA-256 (otherwise sent at finalize).
+    """
+
+    filename = serializers.CharField(source="original_filename", max_length=255)
+    sha256 = serializers.RegexField(r"^[0-9a-fA-F]{64}$", required=False, allow_blank=True)
+
+    class Meta:
+        model = UploadSession
+        fields = ["id", "doc_type", "filename", "size", "received", "sha256", "status", "document", "created_at"]
+        read_only_fields = ["id", "received", "status", "document", "created_at"]
+
+
+class UploadFinalizeSerializer(serializers.Serializer):
+    sha256 = serializers.RegexField(r"^[0-9a-fA-F]{64}$", required=False, allow_blank=True)
 
 
 class ExtractedDataUpdateSerializer(serializers.Serializer):
@@ -1,3 +1,1072 @@
-from django.test import TestCase
+import hashlib
+import json
+import re
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+from io import StringIO
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock, skipIf, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, LiveServerTestCase, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+import numpy as np
+from PIL import Image
+
+from core.throttling import TokenBucket, get_throttle_cache
+from eligibility import rule_cache
+from eligibility.fingerprints import recent_checks, save_checks
+from eligibility.models import EligibilityCheck
+
+from .benchmarking import apply_variant, document_lines, render_page, ACADEMIC_SAMPLES
+from .extraction import ACADEMIC_FIELD_RULES, FINANCIAL_FIELD_RULES, extract_fields
+from .admission import try_acquire_ocr_slot
+from .executor import OCRExecutor
+from .jobs import claim_next_job, heartbeat, requeue_stale_jobs, work
+from .loadtest import recommend
+from .preprocessing import estimate_skew, estimate_text_height, otsu_threshold, preprocess_for_ocr, strip_border
+from .models import Document, DocumentText, OCRJob, UploadSession
+from . import uploads, utils
+from .utils import (
+    OCRLimitExceeded,
+    _ocr_pdf,
+    _parse_tsv,
+    _text_from_ocr_data,
+    compute_confidence,
+    field_confidences,
+    get_ocr_backend,
+    get_ocr_engine_version,
+    page_latency_stats,
+    shutdown_pdf_pool,
+)
+
+MEDIA_ROOT = tempfile.mkdtemp()
+TESTDATA = Path(__file__).resolve().parent / "testdata"
+
+ACADEMIC_TEXT = "Name: Jane Doe\nUniversity: Test University\nPercentage: 85%\nYear of Passing: 2020"
+# Every word 90% confident except "85%", which Tesseract was unsure about
+ACADEMIC_OCR = {
+    "text": ACADEMIC_TEXT,
+    "pages": [{"page": 1, "source": "ocr", "confidence": 0.8}],
+    "words": [
+        (m.start(), m.end(), 40.0 if m.group() == "85%" else 90.0)
+        for m in re.finditer(r"\S+", ACADEMIC_TEXT)
+    ],
+    "confidence": 0.8,
+}
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class OCRJobQueueTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        # Upload rate-limit buckets live in the (database) throttle cache
+        get_throttle_cache().clear()
+
+    def upload(self, content=b"not really a png", doc_type="academic"):
+        return self.client.post(
+            reverse("document-upload"),
+            {
+                "file": SimpleUploadedFile("marks.png", content, content_type="image/png"),
+                "doc_type": doc_type,
+            },
+        )
+
+    def test_upload_enqueues_job_and_returns_202(self):
+        response = self.upload()
+
+        self.assertEqual(response.status_code, 202)
+        job = OCRJob.objects.get(pk=response.data["job"]["id"])
+        self.assertEqual(job.status, OCRJob.STATUS_QUEUED)
+        self.assertEqual(response.data["status_url"], reverse("document-job-status", args=[job.pk]))
+
+    @mock.patch("documents.jobs.ocr_document", return_value=ACADEMIC_OCR)
+    def test_worker_processes_job_and_status_reports_result(self, _ocr):
+        job_id = self.upload().data["job"]["id"]
+
+        self.assertEqual(work(worker_name="test", once=True), 1)
+
+        response = self.client.get(reverse("document-job-status", args=[job_id]))
+        self.assertEqual(response.data["job"]["status"], OCRJob.STATUS_DONE)
+        self.assertEqual(response.data["document"]["extracted_data"]["percentage"], 85.0)
+        self.assertEqual(Document.objects.get().ocr_text, ACADEMIC_TEXT)
+        self.assertEqual(response.data["document"]["ocr_confidence"], 0.8)
+        self.assertEqual(response.data["document"]["ocr_pages"], ACADEMIC_OCR["pages"])
+        field_confidence = response.data["document"]["field_confidence"]
+        self.assertEqual(field_confidence["percentage"], 0.4)
+        self.assertEqual(field_confidence["student_name"], 0.9)
+        self.assertNotIn("gpa", field_confidence)
+
+    @mock.patch("documents.jobs.ocr_document", return_value=ACADEMIC_OCR)
+    def test_document_responses_are_sparse(self, _ocr):
+        job_id = self.upload().data["job"]["id"]
+        work(worker_name="test", once=True)
+        url = reverse("document-job-status", args=[job_id])
+
+        # ocr_text is opt-in, and stored outside the documents table
+        self.assertNotIn("ocr_text", self.client.get(url).data["document"])
+        self.assertEqual(self.client.get(url, {"include": "ocr_text"}).data["document"]["ocr_text"], ACADEMIC_TEXT)
+        self.assertEqual(DocumentText.objects.get().content, ACADEMIC_TEXT)
+
+        response = self.client.get(url, {"fields": "id,extracted_data"})
+        self.assertEqual(set(response.data["document"]), {"id", "extracted_data"})
+
+        response = self.client.get(url, {"fields": "id,nope"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("fields", response.data["errors"])
+
+        response = self.client.patch(
+            reverse("document-update-extracted", args=[Document.objects.get().pk]) + "?fields=extracted_data",
+            {"gpa": 9.1},
+            content_type="application/json",
+        )
+        self.assertEqual(list(response.data["document"]), ["extracted_data"])
+        self.assertEqual(response.data["document"]["extracted_data"]["gpa"], 9.1)
+
+    @mock.patch("documents.jobs.ocr_document", return_value=ACADEMIC_OCR)
+    def test_duplicate_upload_reuses_cached_ocr(self, ocr):
+        first = self.upload()
+        self.assertEqual(first.data["document"]["content_hash"], hashlib.sha256(b"not really a png").hexdigest())
+        work(worker_name="test", once=True)
+
+        second = self.upload()
+        work(worker_name="test", once=True)
+
+        ocr.assert_called_once()
+        job = OCRJob.objects.get(pk=second.data["job"]["id"])
+        self.assertTrue(job.cache_hit)
+        self.assertEqual(job.document.extracted_data["percentage"], 85.0)
+
+        stats = self.client.get(reverse("document-ocr-cache-stats")).data["stats"]
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (1, 1, 1))
+
+        # A failed run and a second finished run of the same document aren't extra misses
+        first_document = Document.objects.get(pk=first.data["document"]["id"])
+        OCRJob.objects.create(document=first_document, status=OCRJob.STATUS_FAILED, cache_hit=False)
+        OCRJob.objects.create(document=first_document, status=OCRJob.STATUS_DONE, cache_hit=False)
+        stats = self.client.get(reverse("document-ocr-cache-stats")).data["stats"]
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    @mock.patch.dict(utils._tesseract_versions, clear=True)
+    def test_engine_version_follows_settings_and_backend(self):
+        with mock.patch.object(utils.PytesseractBackend, "tesseract_version", return_value="5.3.0"):
+            with override_settings(OCR_BACKEND="pytesseract", OCR_PDF_TEXT_LAYER=True):
+                with_text_layer = get_ocr_engine_version()
+            with override_settings(OCR_BACKEND="pytesseract", OCR_PDF_TEXT_LAYER=False):
+                without_text_layer = get_ocr_engine_version()
+
+        self.assertIn("tesseract-5.3.0", with_text_layer)
+        self.assertIn("+textlayer", with_text_layer)
+        self.assertNotIn("+textlayer", without_text_layer)
+
+    def batch_upload(self, names, doc_types):
+        return self.client.post(
+            reverse("document-batch-upload"),
+            {
+                "files": [SimpleUploadedFile(n, n.encode(), content_type="image/png") for n in names],
+                "doc_type": doc_types,
+            },
+        )
+
+    @mock.patch("documents.jobs.ocr_document", return_value=ACADEMIC_OCR)
+    def test_batch_upload_queues_one_job_per_file(self, _ocr):
+        response = self.batch_upload(["marks.png", "statement.png"], ["academic", "financial"])
+
+        self.assertEqual(response.status_code, 202)
+        results = response.data["results"]
+        self.assertEqual([r["document"]["doc_type"] for r in results], ["academic", "financial"])
+        self.assertEqual(
+            [r["document"]["content_hash"] for r in results],
+            [hashlib.sha256(n).hexdigest() for n in (b"marks.png", b"statement.png")],
+        )
+        self.assertEqual(OCRJob.objects.filter(status=OCRJob.STATUS_QUEUED).count(), 2)
+
+        self.assertEqual(work(worker_name="test", once=True), 2)
+        status_response = self.client.get(results[0]["status_url"])
+        self.assertEqual(status_response.data["document"]["extracted_data"]["percentage"], 85.0)
+
+    def test_batch_upload_hashes_while_spooling_and_moves_temp_files(self):
+        with mock.patch("documents.serializers.HashingFile") as hashing_file:
+            response = self.batch_upload(["a.png", "b.png"], ["academic"])
+
+        self.assertEqual(response.status_code, 202)
+        hashing_file.assert_not_called()
+        for result, name in zip(response.data["results"], (b"a.png", b"b.png")):
+            self.assertEqual(result["document"]["content_hash"], hashlib.sha256(name).hexdigest())
+            with Document.objects.get(pk=result["document"]["id"]).file.open("rb") as f:
+                self.assertEqual(f.read(), name)
+
+    def test_batch_upload_single_doc_type_applies_to_all(self):
+        response = self.batch_upload(["a.png", "b.png", "c.png"], ["financial"])
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(set(Document.objects.values_list("doc_type", flat=True)), {"financial"})
+
+    def test_batch_upload_rejects_mismatched_doc_types(self):
+        response = self.batch_upload(["a.png", "b.png", "c.png"], ["academic", "financial"])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("doc_type", response.data["errors"])
+        self.assertFalse(Document.objects.exists())
+
+    @override_settings(OCR_UPLOAD_RATE=0.01, OCR_UPLOAD_BURST=3)
+    def test_uploads_are_rate_limited_per_client(self):
+        # A batch spends a token per file
+        self.assertEqual(self.batch_upload(["a.png", "b.png"], ["academic"]).status_code, 202)
+        self.assertEqual(self.upload().status_code, 202)
+
+        response = self.upload()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "100")
+
+        # Another client has its own bucket
+        response = self.client.post(
+            reverse("document-upload"),
+            {"file": SimpleUploadedFile("m.png", b"png", content_type="image/png"), "doc_type": "academic"},
+            REMOTE_ADDR="10.0.0.2",
+        )
+        self.assertEqual(response.status_code, 202)
+
+    @override_settings(OCR_UPLOAD_RATE=0.01, OCR_UPLOAD_BURST=4, DOCUMENT_BATCH_MAX_FILES=5)
+    def test_batch_is_charged_one_token_per_file(self):
+        # A full-bucket batch empties it
+        self.assertEqual(self.batch_upload([f"{n}.png" for n in range(4)], ["academic"]).status_code, 202)
+        self.assertEqual(self.upload().status_code, 429)
+        self.assertEqual(Document.objects.count(), 4)
+
+        # Refused before the body is parsed, so nothing is spooled to disk
+        with mock.patch("documents.views.HashingTemporaryFileUploadHandler") as handler:
+            self.assertEqual(self.batch_upload(["a.png", "b.png"], ["academic"]).status_code, 429)
+        handler.return_value.handle_raw_input.assert_not_called()
+
+        # More files than the bucket holds: refused, however long the client waits
+        response = self.client.post(
+            reverse("document-batch-upload"),
+            {
+                "files": [SimpleUploadedFile(f"{n}.png", b"png", content_type="image/png") for n in range(5)],
+                "doc_type": ["academic"],
+            },
+            REMOTE_ADDR="10.0.0.2",
+        )
+        self.assertEqual(response.status_code, 429)
+        self.assertNotIn("Retry-After", response)
+        self.assertEqual(Document.objects.count(), 4)
+
+    @override_settings(OCR_MAX_QUEUED_JOBS=1)
+    def test_uploads_refused_while_queue_is_full(self):
+        self.assertEqual(self.upload().status_code, 202)
+
+        response = self.upload()
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+        self.assertEqual(OCRJob.objects.count(), 1)
+
+    @override_settings(OCR_MAX_CONCURRENT=1)
+    @mock.patch("documents.jobs.ocr_document", return_value=ACADEMIC_OCR)
+    def test_worker_waits_for_a_global_ocr_slot(self, _ocr):
+        job_id = self.upload().data["job"]["id"]
+        slot = try_acquire_ocr_slot()  # as if another process were OCRing
+        self.assertIsNone(try_acquire_ocr_slot())
+
+        self.assertEqual(work(worker_name="test", once=True), 0)
+        job = OCRJob.objects.get(pk=job_id)
+        self.assertEqual((job.status, job.attempts), (OCRJob.STATUS_QUEUED, 0))
+
+        slot.release()
+        self.assertEqual(work(worker_name="test", once=True), 1)
+        # and the worker gave its slot back
+        slot = try_acquire_ocr_slot()
+        self.assertIsNotNone(slot)
+        slot.release()
+
+    def test_token_bucket_update_waits_for_the_lock(self):
+        bucket = TokenBucket(rate=1, capacity=2, prefix="test")
+        self.assertEqual(bucket.take("client", now=100.0), (True, 0.0))
+
+        # Another request of the client is mid-update
+        bucket.cache.add("test:client:lock", 1, timeout=bucket.LOCK_TIMEOUT)
+        with mock.patch.object(TokenBucket, "LOCK_WAIT", 0):
+            self.assertEqual(bucket.take("client", now=100.0), (False, float(bucket.LOCK_TIMEOUT)))
+        bucket.cache.delete("test:client:lock")
+
+        self.assertEqual(bucket.take("client", now=100.0), (True, 0.0))
+        self.assertEqual(bucket.take("client", now=100.0), (False, 1.0))
+
+    def start_upload(self, content, **extra):
+        response = self.client.post(
+            reverse("document-upload-session-create"),
+            {"doc_type": "academic", "filename": "scan.pdf", "size": len(content), **extra},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.data["upload_url"], response.data["upload"]["id"]
+
+    def put_chunk(self, url, chunk, offset):
+        return self.client.put(url, chunk, content_type="application/octet-stream", HTTP_UPLOAD_OFFSET=str(offset))
+
+    def test_resumable_upload_appends_chunks_and_enqueues_ocr(self):
+        content = b"%PDF-1.4 " + b"x" * 1000
+        url, pk = self.start_upload(content)
+
+        self.assertEqual(self.put_chunk(url, content[:400], 0).data["upload"]["received"], 400)
+        # a retried / out-of-order chunk is refused with the offset to resume from
+        conflict = self.put_chunk(url, content[600:], 600)
+        self.assertEqual((conflict.status_code, conflict.data["offset"]), (409, 400))
+        self.assertEqual(self.client.get(url)["Upload-Offset"], "400")
+        self.put_chunk(url, content[400:], 400)
+
+        response = self.client.post(
+            reverse("document-upload-session-finalize", args=[pk]),
+            {"sha256": hashlib.sha256(content).hexdigest()},
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 202)
+        document = Document.objects.get(pk=response.data["document"]["id"])
+        self.assertEqual(document.original_filename, "scan.pdf")
+        with document.file.open("rb") as f:
+            self.assertEqual(f.read(), content)
+        self.assertEqual(document.content_hash, hashlib.sha256(content).hexdigest())
+        self.assertTrue(OCRJob.objects.filter(document=document, status=OCRJob.STATUS_QUEUED).exists())
+
+    def test_resumable_upload_checksum_mismatch_resets(self):
+        content = b"0123456789"
+        url, pk = self.start_upload(content, sha256=hashlib.sha256(b"something else").hexdigest())
+        self.put_chunk(url, content, 0)
+
+        response = self.client.post(
+            reverse("document-upload-session-finalize", args=[pk]), {}, content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(url).data["upload"]["received"], 0)
+        self.assertFalse(Document.objects.exists())
+
+    def test_resumable_upload_writes_chunks_outside_a_transaction(self):
+        content = b"0123456789"
+        url, pk = self.start_upload(content)
+        depth = []
+
+        class Stream:
+            def read(self, size):
+                depth.append(len(connection.atomic_blocks))
+                return content[:size]
+
+        session = uploads.append_chunk(pk, 0, Stream(), len(content))
+
+        # Only the TestCase's own atomic blocks are open while streaming
+        self.assertEqual(depth, [len(connection.atomic_blocks)])
+        self.assertEqual((session.received, session.lease_token), (10, ""))
+
+    def test_resumable_upload_refuses_a_second_writer_while_leased(self):
+        content = b"0123456789"
+        url, pk = self.start_upload(content)
+        UploadSession.objects.filter(pk=pk).update(
+            lease_token="other", lease_expires_at=timezone.now() + timedelta(minutes=1)
+        )
+        response = self.put_chunk(url, content, 0)
+        self.assertEqual((response.status_code, response.data["offset"]), (409, 0))
+
+        # An expired lease (its request died) is taken over
+        UploadSession.objects.filter(pk=pk).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.put_chunk(url, content, 0).data["upload"]["received"], 10)
+
+    def test_failed_finalize_leaves_the_upload_resumable(self):
+        content = b"0123456789"
+        url, pk = self.start_upload(content, sha256=hashlib.sha256(content).hexdigest())
+        self.put_chunk(url, content, 0)
+        part_path = Path(MEDIA_ROOT) / UploadSession.objects.get(pk=pk).part_name
+
+        with mock.patch("documents.uploads.enqueue_ocr", side_effect=RuntimeError("db down")):
+            with self.assertRaises(RuntimeError):
+                uploads.finalize(pk)
+
+        # Rolled back: the part file is back in place and the upload still open
+        self.assertEqual(part_path.read_bytes(), content)
+        self.assertEqual(UploadSession.objects.get(pk=pk).status, UploadSession.STATUS_OPEN)
+        self.assertFalse(Document.objects.exists())
+        document, _job = uploads.finalize(pk)
+        self.assertEqual(document.content_hash, hashlib.sha256(content).hexdigest())
+
+    @override_settings(DOCUMENT_UPLOAD_SESSION_TTL=60)
+    def test_expired_uploads_are_refused_and_cleaned_up(self):
+        url, pk = self.start_upload(b"0123456789")
+        fresh_url, fresh_pk = self.start_upload(b"0123456789")
+        part_path = Path(MEDIA_ROOT) / UploadSession.objects.get(pk=pk).part_name
+        UploadSession.objects.filter(pk=pk).update(updated_at=timezone.now() - timedelta(minutes=5))
+
+        self.assertEqual(self.put_chunk(url, b"0123456789", 0).status_code, 400)
+
+        out = StringIO()
+        call_command("cleanup_uploads", stdout=out)
+        self.assertIn("Deleted 1 expired upload(s).", out.getvalue())
+        self.assertFalse(part_path.exists())
+        self.assertEqual(list(UploadSession.objects.values_list("pk", flat=True)), [fresh_pk])
+
+    @override_settings(OCR_JOB_MAX_ATTEMPTS=2)
+    @mock.patch("documents.jobs.process_document", side_effect=RuntimeError("boom"))
+    def test_failed_job_is_retried_then_marked_failed(self, _process):
+        job_id = self.upload().data["job"]["id"]
+
+        work(worker_name="test", once=True)
+
+        job = OCRJob.objects.get(pk=job_id)
+        self.assertEqual(job.status, OCRJob.STATUS_FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(job.error, "boom")
+        self.assertIsNone(claim_next_job("test"))
+
+    @override_settings(OCR_JOB_MAX_ATTEMPTS=2)
+    def test_ocr_error_is_retried_then_marked_failed(self):
+        # Not an image: PIL raises inside the real OCR path
+        job_id = self.upload().data["job"]["id"]
+
+        work(worker_name="test", once=True)
+
+        job = OCRJob.objects.select_related("document").get(pk=job_id)
+        self.assertEqual((job.status, job.attempts), (OCRJob.STATUS_FAILED, 2))
+        self.assertIn("cannot identify image file", job.error)
+        self.assertIsNone(job.document.extracted_data)
+
+    @override_settings(OCR_JOB_STALE_AFTER=60)
+    def test_only_jobs_without_a_recent_heartbeat_are_requeued(self):
+        self.upload()
+        self.upload()
+        long_running, abandoned = claim_next_job("a"), claim_next_job("b")
+        long_ago = timezone.now() - timedelta(hours=1)
+        # Started long ago, but its worker is still beating
+        OCRJob.objects.filter(pk=long_running.pk).update(started_at=long_ago)
+        OCRJob.objects.filter(pk=abandoned.pk).update(started_at=long_ago, heartbeat_at=long_ago)
+
+        self.assertEqual(requeue_stale_jobs(), 1)
+        self.assertEqual(OCRJob.objects.get(pk=long_running.pk).status, OCRJob.STATUS_RUNNING)
+        self.assertEqual(OCRJob.objects.get(pk=abandoned.pk).status, OCRJob.STATUS_QUEUED)
+
+
+class OCRJobHeartbeatTests(TransactionTestCase):
+    # The heartbeat thread has its own connection, so it needs committed rows
+    @override_settings(OCR_JOB_HEARTBEAT_INTERVAL=0.05)
+    def test_heartbeat_refreshes_running_job_until_block_ends(self):
+        document = Document.objects.create(file="documents/x.png", doc_type="academic")
+        OCRJob.objects.create(document=document)
+        job = claim_next_job("test")
+        long_ago = timezone.now() - timedelta(hours=1)
+        OCRJob.objects.filter(pk=job.pk).update(heartbeat_at=long_ago)
+
+        with heartbeat(job):
+            deadline = time.monotonic() + 5
+            while OCRJob.objects.get(pk=job.pk).heartbeat_at == long_ago and time.monotonic() < deadline:
+                time.sleep(0.02)
+
+        self.assertGreater(OCRJob.objects.get(pk=job.pk).heartbeat_at, long_ago)
+
+
+class DocumentListTests(TestCase):
+    def setUp(self):
+        self.documents = [
+            Document.objects.create(
+                file=f"documents/{i}.png",
+                original_filename=f"marks_{i}.png" if i % 2 else f"statement_{i}.png",
+                doc_type="academic" if i % 2 else "financial",
+                ocr_confidence=i / 10,
+            )
+            for i in range(1, 8)
+        ]
+        # Same timestamp for a few rows: the id breaks the tie
+        Document.objects.filter(pk__in=[d.pk for d in self.documents[2:5]]).update(
+            uploaded_at=self.documents[2].uploaded_at
+        )
+
+    def walk(self, params):
+        ids, cursor = [], None
+        while True:
+            with self.assertNumQueries(1):
+                response = self.client.get(reverse("document-list"), {**params, "cursor": cursor or ""})
+            self.assertEqual(response.status_code, 200, response.data)
+            ids += [d["id"] for d in response.data["results"]]
+            cursor = response.data["next_cursor"]
+            if cursor is None:
+                return ids
+
+    def test_pages_cover_every_document_once_newest_first(self):
+        ordered = sorted(Document.objects.values_list("uploaded_at", "id"), reverse=True)
+        self.assertEqual(self.walk({"page_size": 2}), [pk for _, pk in ordered])
+
+    def test_filters(self):
+        expected = [d.pk for d in self.documents if d.doc_type == "academic" and 0.3 <= d.ocr_confidence <= 0.6]
+        ids = self.walk({"doc_type": "academic", "min_confidence": 0.3, "max_confidence": 0.6, "page_size": 1})
+        self.assertEqual(sorted(ids), expected)
+
+        self.assertEqual(len(self.walk({"q": "MARKS"})), 4)
+
+        first, second = self.documents[:2]
+        EligibilityCheck.objects.create(document=first, ielts_scores={}, is_eligible=True)
+        EligibilityCheck.objects.create(document=first, ielts_scores={}, is_eligible=False)
+        EligibilityCheck.objects.create(document=second, ielts_scores={}, is_eligible=True)
+        # Only the latest check counts
+        self.assertEqual(self.walk({"eligible": "true"}), [second.pk])
+        self.assertEqual(self.walk({"eligible": "false"}), [first.pk])
+
+        # Deleting the latest check falls back to the one before; bulk inserts count too
+        EligibilityCheck.objects.filter(document=first, is_eligible=False).delete()
+        third = self.documents[2]
+        save_checks([EligibilityCheck(document=third, ielts_scores={}, is_eligible=False, fingerprint="bulk")])
+        self.assertEqual(sorted(self.walk({"eligible": "true"})), sorted([first.pk, second.pk]))
+        self.assertEqual(self.walk({"eligible": "false"}), [third.pk])
+
+    def test_extracted_columns_follow_extracted_data(self):
+        academic, financial = self.documents[:2]
+        academic.extracted_data = {"gpa": "8.4", "percentage": None}
+        academic.save()
+        Document.objects.filter(pk=financial.pk).update(extracted_data={"available_balance": 250000.0})
+        self.assertIsNone(Document.objects.get(pk=financial.pk).available_balance)
+
+        response = self.client.patch(
+            reverse("document-update-extracted", args=[financial.pk]),
+            {"available_balance": 300000.0},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+
+        columns = Document.objects.filter(pk__in=[academic.pk, financial.pk]).order_by("pk")
+        self.assertEqual(list(columns.values_list("gpa", "available_balance")), [(8.4, None), (None, 300000.0)])
+        self.assertEqual(self.walk({"min_gpa": 8}), [academic.pk])
+        self.assertEqual(self.walk({"min_balance": 300000}), [financial.pk])
+
+    def test_bad_params_are_rejected(self):
+        for params in ({"cursor": "nope"}, {"doc_type": "passport"}, {"min_confidence": 2}, {"fields": "secret"}):
+            with self.subTest(params):
+                response = self.client.get(reverse("document-list"), params)
+                self.assertEqual(response.status_code, 400)
+                self.assertFalse(response.data["success"])
+
+
+class DocumentSearchTests(TestCase):
+    def test_query_is_required(self):
+        response = self.client.get(reverse("document-search"))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("q", response.data["errors"])
+
+    @skipIf(connection.vendor == "postgresql", "search is available on Postgres")
+    def test_not_implemented_without_postgres(self):
+        response = self.client.get(reverse("document-search"), {"q": "state bank"})
+        self.assertEqual(response.status_code, 501)
+        self.assertIn("detail", response.data["errors"])
+
+    @skipUnless(connection.vendor == "postgresql", "full-text search needs Postgres")
+    def test_ranked_and_highlighted_matches(self):
+        statement = Document.objects.create(
+            file="documents/s.png", doc_type="financial", extracted_data={"bank_name": "State Bank of India"}
+        )
+        statement.save_ocr_text("Account statement\nClosing balance 1,20,000")
+        marks = Document.objects.create(file="documents/m.png", doc_type="academic")
+        marks.save_ocr_text("Marks statement issued by the State Board")
+
+        results = self.client.get(reverse("document-search"), {"q": "state bank"}).data["results"]
+        self.assertEqual([r["document"]["id"] for r in results], [statement.pk])
+
+        # The trigger re-indexes when extracted_data changes
+        Document.objects.filter(pk=statement.pk).update(extracted_data={"bank_name": "Union Bank"})
+        self.assertEqual(self.client.get(reverse("document-search"), {"q": "state bank"}).data["results"], [])
+
+        results = self.client.get(reverse("document-search"), {"q": "statement"}).data["results"]
+        self.assertEqual(len(results), 2)
+        self.assertIn("<mark>statement</mark>", results[0]["highlight"])
+
+    @skipUnless(connection.vendor == "postgresql", "full-text search needs Postgres")
+    def test_text_past_the_index_limit_is_saved(self):
+        document = Document.objects.create(file="documents/long.png", doc_type="academic")
+        # Far more distinct words than fit a 1 MB tsvector
+        words = " ".join(f"w{i:07d}" for i in range(300000))
+        document.save_ocr_text(f"Marks statement {words}")
+
+        self.assertEqual(DocumentText.objects.get(document=document).content[:15], "Marks statement")
+        results = self.client.get(reverse("document-search"), {"q": "statement"}).data["results"]
+        self.assertEqual([r["document"]["id"] for r in results], [document.pk])
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, HEALTH_CACHE_SECONDS=0)
+class InstrumentationTests(TestCase):
+    @mock.patch("documents.jobs.ocr_document", return_value=ACADEMIC_OCR)
+    def test_requests_and_spans_are_exported(self, _ocr):
+        response = self.client.post(
+            reverse("document-upload"),
+            {"file": SimpleUploadedFile("marks.png", b"png", content_type="image/png"), "doc_type": "academic"},
+        )
+        self.assertRegex(response["Server-Timing"], r"^total;dur=[\d.]+, db;dur=[\d.]+$")
+        work(worker_name="test", once=True)
+
+        metrics = self.client.get("/metrics").content.decode()
+        self.assertIn(
+            'http_request_duration_seconds_count{method="POST",route="api/documents/upload/",status="202"}', metrics
+        )
+        self.assertIn('span_duration_seconds_count{span="extract"}', metrics)
+        self.assertIn('db_query_duration_seconds_count{alias="default"}', metrics)
+
+    def test_health_reports_each_dependency(self):
+        tesseract = mock.Mock(side_effect=RuntimeError("tesseract is not installed"))
+        with mock.patch.dict("core.views.HEALTH_CHECKS", tesseract=tesseract, poppler=lambda: "ok"):
+            response = self.client.get("/health/")
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.json()["checks"]["tesseract"], "error: tesseract is not installed")
+            self.assertEqual(response.json()["checks"]["database"], "ok")
+
+            tesseract.side_effect, tesseract.return_value = None, "ok"
+            self.assertEqual(self.client.get("/health/").status_code, 200)
+
+
+def _fake_convert(file_path, dpi, first_page=None, last_page=None, poppler_path=None):
+    # Encode the page number in the pixel value so the fake OCR can read it back
+    return [Image.new("L", (10, 10), color=n) for n in range(first_page, last_page + 1)]
+
+
+def _fake_ocr(page):
+    text = f"page-{page.getpixel((0, 0))}"
+    return text, [(0, len(text), 50.0)]
+
+
+@mock.patch("documents.utils.pdfinfo_from_path", return_value={"Pages": 4, "Page size": "612 x 792 pts (letter)"})
+@mock.patch("documents.utils.convert_from_path", side_effect=_fake_convert)
+@mock.patch("documents.utils.run_ocr_on_image", side_effect=_fake_ocr)
+@override_settings(OCR_PDF_TEXT_LAYER=False)
+class PdfOCRTests(SimpleTestCase):
+    def setUp(self):
+        # Pool processes are forked with this test's mocks in place
+        self.addCleanup(shutdown_pdf_pool)
+
+    def test_serial_mode_joins_pages_in_order(self, *_mocks):
+        with override_settings(OCR_PDF_WORKERS=1):
+            self.assertEqual(_ocr_pdf("x.pdf")["text"], "page-1\n\npage-2\n\npage-3\n\npage-4")
+
+    def test_process_pool_mode_preserves_page_order(self, *_mocks):
+        with override_settings(OCR_PDF_WORKERS=3):
+            self.assertEqual(_ocr_pdf("x.pdf")["text"], "page-1\n\npage-2\n\npage-3\n\npage-4")
+
+    @override_settings(OCR_PDF_WORKERS=2)
+    def test_process_pool_is_reused_across_documents(self, *_mocks):
+        with mock.patch("documents.utils.ProcessPoolExecutor", wraps=ProcessPoolExecutor) as pool_class:
+            for _ in range(3):
+                self.assertEqual(_ocr_pdf("x.pdf")["text"], "page-1\n\npage-2\n\npage-3\n\npage-4")
+
+        self.assertEqual(pool_class.call_count, 1)
+
+    @override_settings(OCR_PDF_WORKERS=2)
+    def test_broken_pool_fails_the_attempt_and_is_replaced(self, *_mocks):
+        broken = mock.Mock(**{"map.side_effect": BrokenProcessPool("a page process died")})
+        # A thread pool stands in for the fresh process pool, so the mocks apply
+        with mock.patch("documents.utils.ProcessPoolExecutor", side_effect=[broken, ThreadPoolExecutor(2)]):
+            with self.assertRaises(BrokenProcessPool):
+                _ocr_pdf("x.pdf")
+            broken.shutdown.assert_called_once()
+
+            self.assertEqual(_ocr_pdf("x.pdf")["text"], "page-1\n\npage-2\n\npage-3\n\npage-4")
+
+    @override_settings(OCR_PDF_WORKERS=1, OCR_PDF_PAGE_WINDOW=3)
+    def test_pages_are_rasterized_in_windows(self, _ocr, convert, _info):
+        _ocr_pdf("x.pdf")
+
+        windows = [(c.kwargs["first_page"], c.kwargs["last_page"]) for c in convert.call_args_list]
+        self.assertEqual(windows, [(1, 3), (4, 4)])
+
+    @override_settings(OCR_MAX_PDF_PAGES=3)
+    def test_page_limit(self, _ocr, convert, _info):
+        with self.assertRaises(OCRLimitExceeded):
+            _ocr_pdf("x.pdf")
+        convert.assert_not_called()
+
+    @override_settings(OCR_MAX_IMAGE_PIXELS=1_000_000)
+    def test_pixel_limit_checked_before_rasterizing(self, _ocr, convert, _info):
+        # letter at 200 DPI is 1700x2200 pixels
+        with self.assertRaises(OCRLimitExceeded):
+            _ocr_pdf("x.pdf")
+        convert.assert_not_called()
+
+    @override_settings(OCR_PDF_TEXT_LAYER=True)
+    @mock.patch("documents.utils.PdfReader")
+    def test_text_layer_pages_skip_ocr(self, reader, _ocr, convert, _info):
+        digital = "Statement of account for Jane Doe, balance 1,000.00"
+        layers = [digital, "", "(cid:12)(cid:7)(cid:44)(cid:9)(cid:3)(cid:19)", digital]
+        reader.return_value.pages = [mock.Mock(**{"extract_text.return_value": t}) for t in layers]
+
+        for workers in (1, 2):
+            with self.subTest(workers=workers), override_settings(OCR_PDF_WORKERS=workers):
+                result = _ocr_pdf("x.pdf")
+
+                self.assertEqual(result["text"], f"{digital}\n\npage-2\n\npage-3\n\n{digital}")
+                self.assertEqual(
+                    [(p["source"], p["confidence"]) for p in result["pages"]],
+                    [("text_layer", 1.0), ("ocr", 0.5), ("ocr", 0.5), ("text_layer", 1.0)],
+                )
+                # OCR'd pages carry their latency, text-layer pages don't
+                self.assertEqual([("ocr_ms" in p) for p in result["pages"]], [False, True, True, False])
+                # word offsets are shifted into the joined text
+                start, end, _ = result["words"][1]
+                self.assertEqual(result["text"][start:end], "page-2")
+
+        # text-layer pages are never rasterized, in either mode
+        rasterized = {c.kwargs["first_page"] for c in convert.call_args_list}
+        self.assertEqual(rasterized, {2, 3})
+
+
+class ExtractionGoldenTests(SimpleTestCase):
+    """
+    extraction_golden.json was recorded from the original inline-regex
+    implementation; the rule engine must reproduce it exactly.
+    """
+
+    def test_matches_golden_corpus(self):
+        with open(TESTDATA / "extraction_golden.json", encoding="utf-8") as f:
+            cases = json.load(f)["cases"]
+
+        for case in cases:
+            with self.subTest(case["name"]):
+                self.assertEqual(extract_fields(case["doc_type"], case["text"]), case["expected"])
+
+    def test_every_match_contains_a_hint(self):
+        # A hint missing from a real match would make its pattern skip that document
+        with open(TESTDATA / "extraction_golden.json", encoding="utf-8") as f:
+            texts = [case["text"].replace("\r", "\n") for case in json.load(f)["cases"]]
+
+        for rule in ACADEMIC_FIELD_RULES + FINANCIAL_FIELD_RULES:
+            for regex, _group, hints in rule.patterns:
+                for m in (m for text in texts if hints for m in regex.finditer(text)):
+                    with self.subTest(rule.name, match=m.group()):
+                        self.assertTrue(any(hint in m.group().casefold() for hint in hints))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class AsyncUploadTests(TransactionTestCase):
+    def setUp(self):
+        get_throttle_cache().clear()
+
+    def upload(self, client):
+        return client.post(
+            reverse("document-async-upload"),
+            {
+                "file": SimpleUploadedFile("marks.png", b"not really a png", content_type="image/png"),
+                "doc_type": "academic",
+            },
+        )
+
+    @mock.patch("documents.executor.ocr_document", return_value=ACADEMIC_OCR)
+    async def test_upload_is_ocred_in_process(self, _ocr):
+        # A thread pool stands in for the process pool, so the mock applies
+        executor = OCRExecutor(workers=1, max_pending=2, pool=ThreadPoolExecutor(1))
+        with mock.patch("documents.views.get_ocr_executor", return_value=executor):
+            response = await self.upload(self.async_client)
+        self.assertEqual(response.status_code, 202)
+
+        await executor.wait()
+        self.assertEqual(executor.pending, 0)
+        status_response = await self.async_client.get(response.json()["status_url"])
+        data = status_response.json()
+        self.assertEqual(data["job"]["status"], OCRJob.STATUS_DONE)
+        job = await OCRJob.objects.aget(pk=data["job"]["id"])
+        self.assertTrue(job.worker.startswith("asgi:"))
+        self.assertEqual(data["document"]["extracted_data"]["percentage"], 85.0)
+
+    @override_settings(OCR_MAX_CONCURRENT=1)
+    def test_no_global_ocr_slot_returns_429(self):
+        slot = try_acquire_ocr_slot()
+        self.addCleanup(slot.release)
+        executor = OCRExecutor(workers=1, max_pending=2)
+        with mock.patch("documents.views.get_ocr_executor", return_value=executor):
+            response = self.upload(self.client)
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(executor.pending, 0)
+        self.assertFalse(Document.objects.exists())
+
+    async def test_broken_pool_is_replaced_and_job_requeued(self):
+        class BrokenPool(ThreadPoolExecutor):
+            def submit(self, *args, **kwargs):
+                raise BrokenProcessPool("A child process terminated abruptly")
+
+        pool = BrokenPool(1)
+        executor = OCRExecutor(workers=1, max_pending=2, pool=pool)
+        with mock.patch("documents.views.get_ocr_executor", return_value=executor):
+            response = await self.upload(self.async_client)
+        await executor.wait()
+
+        job = await OCRJob.objects.aget(pk=response.json()["job"]["id"])
+        # Back on the queue for the ocr_worker, with a fresh pool for later uploads
+        self.assertEqual(job.status, OCRJob.STATUS_QUEUED)
+        self.assertIn("terminated abruptly", job.error)
+        self.assertIsNot(executor._pool, pool)
+        self.assertEqual(executor.pending, 0)
+
+    def test_csrf_is_enforced_for_session_users_only(self):
+        client = Client(enforce_csrf_checks=True)
+        executor = OCRExecutor(workers=1, max_pending=0)
+        with mock.patch("documents.views.get_ocr_executor", return_value=executor):
+            # Anonymous: exempt, like the DRF views (429: the pool is full)
+            self.assertEqual(self.upload(client).status_code, 429)
+
+            client.force_login(User.objects.create_user("staff"))
+            response = self.upload(client)
+        self.assertEqual(response.status_code, 403)
+        self.assertIn("CSRF Failed", response.json()["detail"])
+
+    def test_full_pool_returns_429_before_storing_anything(self):
+        executor = OCRExecutor(workers=2, max_pending=0)
+        with mock.patch("documents.views.get_ocr_executor", return_value=executor):
+            response = self.upload(self.client)
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "5")
+        self.assertFalse(Document.objects.exists())
+
+
+class ReextractCommandTests(TestCase):
+    def setUp(self):
+        self.stale = Document.objects.create(
+            doc_type="academic", file="documents/a.png", extracted_data={"percentage": 10.0}
+        )
+        self.current = Document.objects.create(
+            doc_type="academic", file="documents/b.png", extracted_data=extract_fields("academic", ACADEMIC_TEXT),
+        )
+        for document in (self.stale, self.current):
+            document.save_ocr_text(ACADEMIC_TEXT)
+
+    def test_dry_run_prints_diff_without_writing(self):
+        out = StringIO()
+        call_command("reextract", "--dry-run", "--workers=1", stdout=out)
+
+        self.assertIn("percentage: 10.0 -> 85.0", out.getvalue())
+        self.stale.refresh_from_db()
+        self.assertEqual(self.stale.extracted_data, {"percentage": 10.0})
+
+    def test_updates_changed_rows_and_checkpoints(self):
+        checkpoint = Path(tempfile.mkdtemp()) / "reextract.json"
+
+        call_command("reextract", "--workers=1", "--batch-size=1", f"--checkpoint={checkpoint}", stdout=StringIO())
+
+        self.stale.refresh_from_db()
+        self.assertEqual(self.stale.extracted_data, extract_fields("academic", ACADEMIC_TEXT))
+        self.assertEqual(self.stale.percentage, 85.0)
+        self.assertEqual(json.loads(checkpoint.read_text())["last_id"], self.current.pk)
+
+        # Resuming from the checkpoint finds nothing left to do
+        out = StringIO()
+        call_command("reextract", "--workers=1", f"--checkpoint={checkpoint}", stdout=out)
+        self.assertIn("Scanned 0 document(s)", out.getvalue())
+        shutil.rmtree(checkpoint.parent)
+
+
+class BenchmarkCommandTests(TestCase):
+    def setUp(self):
+        get_throttle_cache().clear()
+
+    def test_reports_latency_and_rolls_back(self):
+        output = Path(tempfile.mkdtemp()) / "bench.json"
+        checks_before = EligibilityCheck.objects.count()
+
+        call_command(
+            "benchmark", "--suite=extract", "--suite=eligibility", "--iterations=1", "--variant=small_scan",
+            "--pdf-pages=1", f"--output={output}", stdout=StringIO(), stderr=StringIO(),
+        )
+
+        report = json.loads(output.read_text())
+        self.assertEqual(report["schema"], 1)
+        self.assertEqual(set(report["results"]), {"extract", "eligibility"})
+        stats = report["results"]["eligibility"]["check/new"]
+        self.assertEqual(stats["count"], 20 * len(ACADEMIC_SAMPLES))
+        for key in ("throughput_per_s", "p50_ms", "p95_ms", "peak_rss_mb"):
+            self.assertIn(key, stats)
+        self.assertEqual(EligibilityCheck.objects.count(), checks_before)
+        shutil.rmtree(output.parent)
+
+    @override_settings(OCR_UPLOAD_RATE=0.001, OCR_UPLOAD_BURST=1, OCR_MAX_QUEUED_JOBS=1)
+    def test_upload_suite_is_not_throttled(self):
+        output = Path(tempfile.mkdtemp()) / "bench.json"
+
+        call_command(
+            "benchmark", "--suite=upload", "--iterations=2", "--variant=small_scan", "--pdf-pages=1",
+            f"--output={output}", stdout=StringIO(), stderr=StringIO(),
+        )
+
+        report = json.loads(output.read_text())
+        self.assertEqual(report["results"]["upload"]["upload"]["count"], 2 * len(report["parameters"]["corpus"]))
+        self.assertFalse(Document.objects.exists())
+        shutil.rmtree(output.parent)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, OCR_UPLOAD_RATE=0)
+class LoadTestCommandTests(LiveServerTestCase):
+    def setUp(self):
+        # Rule sets and checks cached by earlier tests point at rows that are gone
+        rule_cache.invalidate()
+        recent_checks.clear()
+        self.addCleanup(rule_cache.invalidate)
+        self.addCleanup(recent_checks.clear)
+
+    def test_sweeps_both_endpoints(self):
+        document = Document.objects.create(
+            doc_type="academic", file="documents/a.png", extracted_data=extract_fields("academic", ACADEMIC_TEXT),
+        )
+        output = Path(tempfile.mkdtemp()) / "loadtest.json"
+
+        call_command(
+            "loadtest", f"--base-url={self.live_server_url}", "--concurrency=1,2", "--requests=4",
+            f"--output={output}", stdout=StringIO(),
+        )
+
+        report = json.loads(output.read_text())
+        self.assertEqual([p["concurrency"] for p in report["curves"]["upload"]], [1, 2])
+        for name, expected in (("upload", "202"), ("eligibility", "200")):
+            for point in report["curves"][name]:
+                self.assertEqual(point["statuses"], {expected: 4})
+                self.assertEqual(point["error_rate"], 0.0)
+        self.assertIn("--workers=", report["recommendation"]["gunicorn_args"])
+        # Warm-up plus 2 levels x 4 requests; checks used the only usable document
+        self.assertEqual(OCRJob.objects.count(), 9)
+        self.assertEqual(EligibilityCheck.objects.filter(document=document).count(), 9)
+        shutil.rmtree(output.parent)
+
+    def test_recommendation_tells_slot_limit_from_resource_limit(self):
+        def curve(*points):
+            return [
+                {"concurrency": c, "throughput_per_s": x, "mean_ms": ms, "p95_ms": ms * 1.5, "max_ms": ms * 2,
+                 "error_rate": 0.0}
+                for c, x, ms in points
+            ]
+
+        # 20 ms per request, and 2 workers deliver 100 req/s: both busy all the time
+        slot_bound = recommend(
+            {"upload": curve((1, 50, 20), (2, 100, 20), (4, 100, 40))},
+            server_workers=2, server_threads=1, server_cpus=2, slo_ms=1000, max_error_rate=0.01,
+        )
+        self.assertEqual(slot_bound["scenarios"]["upload"]["bottleneck"], "worker slots")
+        # Up to 2 * CPUs + 1 workers, plus headroom as threads
+        self.assertEqual((slot_bound["workers"], slot_bound["threads"]), (5, 2))
+
+        # 8 workers, but throughput stops at 2 in parallel: more slots won't help
+        resource_bound = recommend(
+            {"upload": curve((1, 50, 20), (4, 100, 40), (8, 100, 80))},
+            server_workers=8, server_threads=1, server_cpus=2, slo_ms=1000, max_error_rate=0.01,
+        )
+        self.assertIn("resources", resource_bound["scenarios"]["upload"]["bottleneck"])
+        self.assertEqual(resource_bound["workers"], 3)
+
+
+class OCRConfidenceTests(SimpleTestCase):
+    def test_text_rebuilt_from_image_to_data(self):
+        # level 5 rows are words; conf -1 marks non-word rows
+        data = {
+            "level": [1, 5, 5, 5, 5, 5],
+            "block_num": [0, 1, 1, 1, 1, 2],
+            "par_num": [0, 1, 1, 1, 1, 1],
+            "line_num": [0, 1, 1, 2, 2, 1],
+            "conf": [-1, 96, 91.5, 80, 0, 70],
+            "text": ["", "Name:", "Jane", "GPA", " ", "8.5"],
+        }
+
+        text, words = _text_from_ocr_data(data)
+
+        self.assertEqual(text, "Name: Jane\nGPA\n\n8.5")
+        self.assertEqual([text[s:e] for s, e, _ in words], ["Name:", "Jane", "GPA", "8.5"])
+        self.assertEqual([c for _, _, c in words], [96.0, 91.5, 80.0, 70.0])
+
+    def test_document_confidence_is_character_weighted(self):
+        self.assertEqual(compute_confidence([(0, 9, 100.0), (10, 11, 0.0)]), 0.9)
+        self.assertEqual(compute_confidence([]), 0.0)
+
+    def test_field_confidence_is_weakest_word_in_match(self):
+        words = [(0, 5, 95.0), (6, 10, 60.0), (11, 16, 85.0)]
+        self.assertEqual(
+            field_confidences({"a": (6, 16), "b": (0, 3), "c": (20, 25)}, words),
+            {"a": 0.6, "b": 0.95},
+        )
+
+
+class OCRBackendTests(SimpleTestCase):
+    def setUp(self):
+        utils._ocr_backends.clear()
+        self.addCleanup(utils._ocr_backends.clear)
+
+    def test_tsv_parses_like_image_to_data(self):
+        tsv = "\n".join(
+            [
+                "1\t1\t0\t0\t0\t0\t0\t0\t600\t400\t-1\t",
+                "5\t1\t1\t1\t1\t1\t10\t10\t50\t20\t96.5\tName:",
+                "5\t1\t1\t1\t1\t2\t70\t10\t40\t20\t91\tJane",
+                "5\t1\t2\t1\t1\t1\t10\t60\t30\t20\t70\t8.5",
+            ]
+        )
+        text, words = _text_from_ocr_data(_parse_tsv(tsv))
+
+        self.assertEqual(text, "Name: Jane\n\n8.5")
+        self.assertEqual([c for _, _, c in words], [96.5, 91.0, 70.0])
+
+    @override_settings(OCR_BACKEND="tesserocr")
+    def test_falls_back_to_pytesseract_without_tesserocr(self):
+        with mock.patch.dict("sys.modules", {"tesserocr": None}):
+            backend = get_ocr_backend()
+
+        self.assertEqual(backend.name, "pytesseract")
+        # created once per process and reused
+        self.assertIs(get_ocr_backend(), backend)
+
+    def test_page_latency_stats_by_backend(self):
+        pages = [
+            [{"page": 1, "source": "text_layer", "confidence": 1.0}],
+            [{"page": 1, "source": "ocr", "backend": "tesserocr", "ocr_ms": ms} for ms in (10.0, 30.0, 20.0)],
+            [{"page": 1, "source": "ocr", "backend": "pytesseract", "ocr_ms": 200.0}],
+            None,
+        ]
+        stats = page_latency_stats(iter(pages))
+
+        self.assertEqual(stats["tesserocr"], {"pages": 3, "mean_ms": 20.0, "p50_ms": 20.0, "p95_ms": 20.0, "max_ms": 30.0})
+        self.assertEqual(stats["pytesseract"]["pages"], 1)
+
+
+class PreprocessingTests(SimpleTestCase):
+    def setUp(self):
+        self.page = render_page(document_lines("academic", ACADEMIC_SAMPLES[0]))
+
+    def ink(self, image):
+        arr = np.asarray(image)
+        return arr < otsu_threshold(arr)
+
+    def test_phone_photo_is_downscaled_deskewed_and_cropped(self):
+        photo = apply_variant(self.page, "phone_photo")
+        self.assertAlmostEqual(estimate_skew(strip_border(self.ink(photo))), -2.5, delta=0.3)
+
+        with override_settings(OCR_TARGET_TEXT_HEIGHT=32):
+            out = preprocess_for_ocr(photo)
+
+        ink = self.ink(out)
+        self.assertLess(out.width * out.height, photo.width * photo.height / 8)
+        self.assertAlmostEqual(estimate_skew(ink), 0.0, delta=0.3)
+        self.assertAlmostEqual(estimate_text_height(ink), 32, delta=4)
+        # dark border is gone: no edge row/column is mostly ink
+        self.assertLess(max(ink[0].mean(), ink[-1].mean(), ink[:, 0].mean(), ink[:, -1].mean()), 0.5)
+        self.assertEqual(set(np.unique(np.asarray(out))), {0, 255})
+
+    def test_steps_can_be_disabled(self):
+        with override_settings(OCR_DESKEW=False, OCR_CROP_BORDER=False, OCR_BINARIZE=False, OCR_TARGET_TEXT_HEIGHT=10_000):
+            out = preprocess_for_ocr(self.page)
+        # upscaling is capped at 2x, nothing else changes the geometry
+        self.assertEqual(out.size, (self.page.width * 2, self.page.height * 2))
+
+    def test_upscaling_stays_within_the_pixel_budget(self):
+        tilted = self.page.rotate(3, expand=True, fillcolor=255)
+        budget = round(tilted.width * tilted.height * 1.5)
+        for image in (self.page, tilted):
+            with self.subTest(size=image.size), override_settings(OCR_CROP_BORDER=False, OCR_TARGET_TEXT_HEIGHT=10_000):
+                out = preprocess_for_ocr(image, max_pixels=budget)
+
+            self.assertLessEqual(out.width * out.height, budget)
+            self.assertGreater(out.width * out.height, budget * 0.9)
@@ -0,0 +1,309 @@
+"""
+Resumable chunked uploads.
+
+Protocol:
+  1. init      POST  uploads/                 {doc_type, filename, size, sha256?}
+  2. append    PUT   uploads/<id>/            raw bytes, "Upload-Offset: <n>" header
+               GET   uploads/<id>/            current offset, to resume after a drop
+  3. finalize  POST  uploads/<id>/finalize/   {sha256?} -> Document + OCRJob
+
+Chunks go straight into a part file in the Document file storage, so
+large scans never pass through Django's multipart upload handlers and a
+retry only resends the chunk that was in flight.
+
+Writing the part file happens outside any transaction: a short one takes
+the session's lease and checks the offset, the bytes are streamed, and a
+second short one records the new offset and drops the lease. A request
+that dies mid-chunk holds the lease for at most DOCUMENT_UPLOAD_LEASE
+seconds. Uploads left open for DOCUMENT_UPLOAD_SESSION_TTL seconds expire;
+`manage.py cleanup_uploads` deletes them and their part files.
+"""
+import os
+import uuid
+import hashlib
+from contextlib import contextmanager, suppress
+from datetime import timedelta
+from typing import IO, Callable, Optional, Tuple
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from .jobs import enqueue_ocr
+from .models import Document, OCRJob, UploadSession
+
+_COPY_CHUNK = 64 * 1024
+
+
+def get_max_upload_size() -> int:
+    return getattr(settings, "DOCUMENT_UPLOAD_MAX_SIZE", 200 * 1024 * 1024)
+
+
+def get_max_chunk_size() -> int:
+    return getattr(settings, "DOCUMENT_UPLOAD_MAX_CHUNK", 16 * 1024 * 1024)
+
+
+def get_lease_seconds() -> int:
+    """
+    How long one request may write a chunk (or verify the file) before
+    another request for the same upload may take over.
+    """
+    return getattr(settings, "DOCUMENT_UPLOAD_LEASE", 300)
+
+
+def get_session_ttl() -> int:
+    """
+    Seconds an open upload may go without a request before it expires.
+    """
+    return getattr(settings, "DOCUMENT_UPLOAD_SESSION_TTL", 24 * 60 * 60)
+
+
+class UploadError(ValueError):
+    """
+    The request can't be applied to the upload (bad size, already
+    finalized, checksum mismatch...). Reported to the client as a 400.
+    """
+
+
+class UploadConflict(UploadError):
+    """
+    The client's offset doesn't match what the server has, or another
+    request is appending to the same upload. `offset` is where to resume.
+    """
+
+    def __init__(self, message: str, offset: int):
+        super().__init__(message)
+        self.offset = offset
+
+
+def _storage():
+    return Document._meta.get_field("file").storage
+
+
+def _lock(pk: int) -> UploadSession:
+    """
+    Lock the session row for the rest of the (short) transaction. NOWAIT:
+    a second request for the same upload fails fast instead of queueing.
+    """
+    try:
+        # Savepoint, so the transaction is still usable if NOWAIT fails
+        with transaction.atomic():
+            return UploadSession.objects.select_for_update(nowait=True).get(pk=pk)
+    except DatabaseError:
+        session = UploadSession.objects.get(pk=pk)
+        raise UploadConflict("Another request is writing to this upload.", session.received)
+
+
+def create_session(doc_type: str, filename: str, size: int, sha256: str = "") -> UploadSession:
+    max_size = get_max_upload_size()
+    if size > max_size:
+        raise UploadError(f"File is {size} bytes, above the {max_size} byte limit.")
+
+    session = UploadSession.objects.create(
+        doc_type=doc_type,
+        original_filename=os.path.basename(filename),
+        size=size,
+        sha256=sha256.lower(),
+    )
+    session.part_name = f"documents/uploads/{session.pk}.part"
+    path = _storage().path(session.part_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "wb").close()
+    session.save(update_fields=["part_name"])
+    return session
+
+
+def _take_lease(pk: int, check: Callable[[UploadSession], None]) -> UploadSession:
+    """
+    In a short transaction: check that the upload is open, unexpired and
+    not being written by another request, run `check`, and take the lease.
+    The caller then works on the part file and ends with _lease_held().
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        session = _lock(pk)
+        if session.status != UploadSession.STATUS_OPEN:
+            raise UploadError("Upload is already finalized.")
+        if session.updated_at < now - timedelta(seconds=get_session_ttl()):
+            raise UploadError("Upload has expired; start a new one.")
+        if session.lease_token and session.lease_expires_at > now:
+            raise UploadConflict("Another request is writing to this upload.", session.received)
+        check(session)
+
+        session.lease_token = uuid.uuid4().hex
+        session.lease_expires_at = now + timedelta(seconds=get_lease_seconds())
+        session.save(update_fields=["lease_token", "lease_expires_at", "updated_at"])
+    return session
+
+
+@contextmanager
+def _lease_held(session: UploadSession):
+    """
+    The closing transaction: yields the locked row for the caller to
+    update, then saves it with the lease dropped. Raises a conflict if
+    our lease ran out and another request took the upload over.
+    """
+    with transaction.atomic():
+        current = UploadSession.objects.select_for_update().get(pk=session.pk)
+        if current.lease_token != session.lease_token:
+            raise UploadConflict("Upload was taken over by another request.", current.received)
+        yield current
+        current.lease_token = ""
+        current.lease_expires_at = None
+        current.save()
+
+
+def _drop_lease(session: UploadSession) -> None:
+    """
+    Give the lease back after a failure, so the client can retry at once
+    instead of waiting for it to expire.
+    """
+    with suppress(DatabaseError):
+        UploadSession.objects.filter(pk=session.pk, lease_token=session.lease_token).update(
+            lease_token="", lease_expires_at=None
+        )
+
+
+def append_chunk(pk: int, offset: int, stream: IO[bytes], length: int) -> UploadSession:
+    """
+    Write `length` bytes from `stream` at `offset`. Bytes that arrive
+    before a dropped connection are kept, so the client resumes from
+    the returned `received`.
+    """
+
+    def check(session: UploadSession) -> None:
+        if offset != session.received:
+            raise UploadConflict(f"Expected offset {session.received}, got {offset}.", session.received)
+        if length > get_max_chunk_size():
+            raise UploadError(f"Chunks may be at most {get_max_chunk_size()} bytes.")
+        if offset + length > session.size:
+            raise UploadError(f"Chunk ends at byte {offset + length}, past the declared size {session.size}.")
+
+    session = _take_lease(pk, check)
+    written = 0
+    try:
+        with open(_storage().path(session.part_name), "r+b") as f:
+            # Drop anything a failed earlier request left past the offset
+            f.seek(offset)
+            f.truncate()
+            while written < length:
+                data = stream.read(min(_COPY_CHUNK, length - written))
+                if not data:
+                    break
+                f.write(data)
+                written += len(data)
+    finally:
+        with _lease_held(session) as session:
+            session.received = offset + written
+    return session
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_COPY_CHUNK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def finalize(pk: int, sha256: str = "") -> Tuple[Document, OCRJob]:
+    """
+    Verify the assembled file, move it to its final name in storage and
+    hand it to the OCR queue like a normal upload.
+
+    A checksum mismatch restarts the upload from offset 0: the bytes on
+    disk are wrong and we can't tell which chunk is bad.
+    """
+
+    def check(session: UploadSession) -> None:
+        if session.received != session.size:
+            raise UploadConflict(f"Only {session.received} of {session.size} bytes received.", session.received)
+        if not (sha256 or session.sha256):
+            raise UploadError("A sha256 checksum is required to finalize.")
+
+    # Hashing a large file happens under the lease, not in a transaction
+    session = _take_lease(pk, check)
+    try:
+        return _finalize_leased(session, (sha256 or session.sha256).lower())
+    except BaseException:
+        _drop_lease(session)
+        raise
+
+
+def _finalize_leased(session: UploadSession, expected: str) -> Tuple[Document, OCRJob]:
+    storage = _storage()
+    part_path = storage.path(session.part_name)
+    actual = _file_sha256(part_path)
+
+    if actual != expected:
+        open(part_path, "wb").close()
+        with _lease_held(session) as session:
+            session.received = 0
+        raise UploadError("Checksum mismatch; the upload was reset and must be sent again.")
+
+    file_field = Document._meta.get_field("file")
+    name = storage.get_available_name(file_field.generate_filename(None, session.original_filename))
+    final_path = storage.path(name)
+    os.replace(part_path, final_path)
+    try:
+        with _lease_held(session) as session:
+            document = Document.objects.create(
+                file=name,
+                doc_type=session.doc_type,
+                original_filename=session.original_filename,
+                content_hash=actual,
+            )
+            session.status = UploadSession.STATUS_COMPLETE
+            session.document = document
+            job = enqueue_ocr(document)
+    except BaseException:
+        # Nothing was committed: put the part file back, so finalize can be retried
+        os.replace(final_path, part_path)
+        raise
+    return document, job
+
+
+def abort(pk: int) -> None:
+    with transaction.atomic():
+        session = _lock(pk)
+        if session.status == UploadSession.STATUS_OPEN and session.part_name:
+            _storage().delete(session.part_name)
+        session.delete()
+
+
+def expired_sessions() -> QuerySet:
+    """
+    Open uploads nobody has touched for DOCUMENT_UPLOAD_SESSION_TTL seconds.
+    """
+    cutoff = timezone.now() - timedelta(seconds=get_session_ttl())
+    return UploadSession.objects.filter(status=UploadSession.STATUS_OPEN, updated_at__lt=cutoff)
+
+
+def delete_expired_sessions() -> int:
+    """
+    Delete expired uploads and their part files; returns how many.
+    """
+    deleted = 0
+    storage = _storage()
+    for pk in expired_sessions().values_list("pk", flat=True):
+        with transaction.atomic():
+            # Re-checked under the lock: a request may have just used it
+            session = expired_sessions().select_for_update(skip_locked=True).filter(pk=pk).first()
+            if session is None:
+                continue
+            if session.part_name:
+                storage.delete(session.part_name)
+            session.delete()
+        deleted += 1
+    return deleted
+
+
+def parse_offset(value: Optional[str]) -> int:
+    try:
+        offset = int(value)
+    except (TypeError, ValueError):
+        raise UploadError("Upload-Offset header must be a non-negative integer.")
+    if offset < 0:
+        raise UploadError("Upload-Offset header must be a non-negative integer.")
+    return offset
@@ -1,7 +1,32 @@
 from django.urls import path
-from .views import DocumentUploadView, DocumentExtractedUpdateView
+from .views import (
+    AsyncDocumentUploadView,
+    AsyncOCRJobStatusView,
+    DocumentListView,
+    DocumentSearchView,
+    DocumentUploadView,
+    DocumentBatchUploadView,
+    DocumentExtractedUpdateView,
+    OCRJobStatusView,
+    OCRCacheStatsView,
+    OCRBackendStatsView,
+    UploadSessionCreateView,
+    UploadSessionView,
+    UploadSessionFinalizeView,
+)
 
 urlpatterns = [
+    path("", DocumentListView.as_view(), name="document-list"),
+    path("search/", DocumentSearchView.as_view(), name="document-search"),
     path("upload/", DocumentUploadView.as_view(), name="document-upload"),
+    path("batch-upload/", DocumentBatchUploadView.as_view(), name="document-batch-upload"),
+    path("uploads/", UploadSessionCreateView.as_view(), name="document-upload-session-create"),
+    path("uploads/<int:pk>/", UploadSessionView.as_view(), name="document-upload-session"),
+    path("uploads/<int:pk>/finalize/", UploadSessionFinalizeView.as_view(), name="document-upload-session-finalize"),
+    path("jobs/<int:pk>/", OCRJobStatusView.as_view(), name="document-job-status"),
+    path("async/upload/", AsyncDocumentUploadView.as_view(), name="document-async-upload"),
+    path("async/jobs/<int:pk>/", AsyncOCRJobStatusView.as_view(), name="document-async-job-status"),
+    path("ocr-cache/stats/", OCRCacheStatsView.as_view(), name="document-ocr-cache-stats"),
+    path("ocr-backend/stats/", OCRBackendStatsView.as_view(), name="document-ocr-backend-stats"),
     path("<int:pk>/update-extracted/", DocumentExtractedUpdateView.as_view(), name="document-update-extracted",),
 ]
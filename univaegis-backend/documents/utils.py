@@ -1,14 +1,32 @@
 import os
 import re
+import string
+import time
+import hashlib
 import logging
-from typing import Dict, Any
+import threading
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 
 from django.conf import settings
+from django.core.files import File
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
 from pathlib import Path
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
 from PIL import Image
+from PyPDF2 import PdfReader
 import pytesseract
 
+from core.metrics import span, timed
+
+from . import preprocessing
+
+# Field extraction lives in documents.extraction; re-exported for existing callers
+from .extraction import extract_academic_fields, extract_financial_fields, extract_fields  # noqa: F401
+
 logger = logging.getLogger(__name__)
 
 
@@ -20,242 +38,672 @@ def get_poppler_path() -> str:
     return getattr(settings, "POPPLER_PATH", None)
 
 
+def get_pdf_dpi() -> int:
+    return getattr(settings, "OCR_PDF_DPI", 200)
+
+
+def get_pdf_workers() -> int:
+    """
+    Number of processes used to OCR PDF pages in parallel.
+    1 (the default) keeps the old serial behaviour.
+    """
+    return getattr(settings, "OCR_PDF_WORKERS", 1)
+
+
+def get_pdf_page_window() -> int:
+    """
+    How many PDF pages are rasterized per pdftoppm call.
+    Peak memory is roughly window * one page bitmap, whatever the page count.
+    """
+    return max(1, getattr(settings, "OCR_PDF_PAGE_WINDOW", 1))
+
+
+def get_max_pdf_pages() -> int:
+    return getattr(settings, "OCR_MAX_PDF_PAGES", 100)
+
+
+def get_max_image_pixels() -> int:
+    return getattr(settings, "OCR_MAX_IMAGE_PIXELS", 60_000_000)
+
+
+def use_pdf_text_layer() -> bool:
+    return getattr(settings, "OCR_PDF_TEXT_LAYER", True)
+
+
+def get_ocr_backend_name() -> str:
+    """
+    "tesserocr" (in-process libtesseract, one engine kept per worker),
+    "pytesseract" (a tesseract subprocess per page) or "auto" (the first
+    one if it is installed).
+    """
+    return getattr(settings, "OCR_BACKEND", "auto")
+
+
+def get_text_layer_min_chars() -> int:
+    """
+    Pages whose embedded text is shorter than this are OCR'd instead
+    (scanned pages often carry an empty or near-empty text layer).
+    """
+    return getattr(settings, "OCR_TEXT_LAYER_MIN_CHARS", 20)
+
+
+# Per-page text source, recorded in Document.ocr_pages
+PAGE_SOURCE_TEXT_LAYER = "text_layer"
+PAGE_SOURCE_OCR = "ocr"
+
+_TEXT_LAYER_OK_CHARS = set(string.ascii_letters + string.digits + string.punctuation + string.whitespace)
+
+
+# Bump when text extraction changes in a way that should invalidate cached OCR results
+OCR_PIPELINE_VERSION = 3
+
+# An OCR'd word: (start offset, end offset, Tesseract confidence 0-100).
+# Offsets index into the page text, or the document text once pages are joined.
+Word = Tuple[int, int, float]
+
+# Embedded PDF text is exact, so it counts as fully confident
+TEXT_LAYER_CONFIDENCE = 100.0
+
+
+# Tesseract version per OCR_BACKEND value (looking it up shells out to tesseract)
+_tesseract_versions: Dict[str, str] = {}
+
+
+def get_ocr_engine_version() -> str:
+    """
+    Identifies the OCR engine + pipeline that produced a text, for the
+    OCR result cache. The tesseract version is queried once per process
+    and backend; the pipeline settings are read on every call.
+    """
+    name = get_ocr_backend_name()
+    tesseract = _tesseract_versions.get(name)
+    if tesseract is None:
+        try:
+            # Both backends wrap the same engine, so they share cache entries
+            tesseract = get_ocr_backend().tesseract_version()
+        except Exception:
+            tesseract = "unknown"
+        _tesseract_versions[name] = tesseract
+    text_layer = "+textlayer" if use_pdf_text_layer() else ""
+    preprocess = "+preprocess" if preprocessing.is_enabled() else ""
+    return f"tesseract-{tesseract}/pipeline-{OCR_PIPELINE_VERSION}{text_layer}{preprocess}"
+
+
+class HashingFile(File):
+    """
+    Wraps an uploaded file and SHA-256s it while storage reads the chunks,
+    so hashing costs no extra pass over the upload.
+    """
+
+    def __init__(self, file):
+        super().__init__(file, name=file.name)
+        self.sha256 = hashlib.sha256()
+
+    def chunks(self, chunk_size=None):
+        for chunk in super().chunks(chunk_size):
+            self.sha256.update(chunk)
+            yield chunk
+
+    def hexdigest(self) -> str:
+        return self.sha256.hexdigest()
+
+
+class HashingTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """
+    TemporaryFileUploadHandler that SHA-256s each file while it is spooled
+    to disk and sets the hex digest as `file.sha256`. Storage can then
+    move the temp file into place (a rename when FILE_UPLOAD_TEMP_DIR is
+    on the same filesystem as MEDIA_ROOT) instead of HashingFile copying
+    it a second time.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self._sha256 = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self._sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.sha256 = self._sha256.hexdigest()
+        return file
+
+
+class OCRLimitExceeded(ValueError):
+    """
+    Raised when a document is too large (pages or pixels) to OCR safely.
+    This is a property of the file, so retrying will not help.
+    """
+
+
+def check_image_pixels(width: int, height: int) -> None:
+    limit = get_max_image_pixels()
+    if width * height > limit:
+        raise OCRLimitExceeded(
+            f"Image is {width}x{height} pixels, above the {limit} pixel limit."
+        )
+
+
 def is_pdf(file_path: str) -> bool:
     return file_path.lower().endswith(".pdf")
 
 
-def run_ocr_on_image(image: Image.Image) -> str:
+def _text_from_ocr_data(data: Dict[str, List[Any]]) -> Tuple[str, List[Word]]:
+    """
+    Rebuild page text from Tesseract's image_to_data output, the way its
+    plain-text renderer lays it out: words joined by spaces, lines by
+    newlines, paragraphs/blocks by a blank line. Records each word's
+    offsets and confidence as it goes.
+    """
+    parts: List[str] = []
+    words: List[Word] = []
+    pos = 0
+    prev = None
+
+    for i, raw in enumerate(data["text"]):
+        word = (raw or "").strip()
+        if data["level"][i] != 5 or not word:
+            continue
+
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        if prev is not None:
+            if key[:2] != prev[:2]:
+                sep = "\n\n"
+            elif key != prev:
+                sep = "\n"
+            else:
+                sep = " "
+            parts.append(sep)
+            pos += len(sep)
+
+        parts.append(word)
+        words.append((pos, pos + len(word), max(float(data["conf"][i]), 0.0)))
+        pos += len(word)
+        prev = key
+
+    return "".join(parts), words
+
+
+class OCRBackend:
+    """
+    Runs Tesseract on one (already normalized) image and returns its
+    word table in pytesseract's image_to_data(output_type=DICT) shape.
+    """
+
+    name = ""
+
+    def image_to_data(self, image: Image.Image) -> Dict[str, List[Any]]:
+        raise NotImplementedError
+
+    def tesseract_version(self) -> str:
+        raise NotImplementedError
+
+
+class PytesseractBackend(OCRBackend):
+    """
+    Fallback: pytesseract starts a tesseract process per call and passes
+    the image and results through temp files, so every page pays for a
+    process start and a language model load.
+    """
+
+    name = "pytesseract"
+
+    def image_to_data(self, image: Image.Image) -> Dict[str, List[Any]]:
+        return pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+
+    def tesseract_version(self) -> str:
+        return str(pytesseract.get_tesseract_version())
+
+
+# Column order of Tesseract's TSV renderer (what image_to_data parses too)
+_TSV_COLUMNS = (
+    "level", "page_num", "block_num", "par_num", "line_num", "word_num",
+    "left", "top", "width", "height", "conf", "text",
+)
+
+
+def _parse_tsv(tsv: str) -> Dict[str, List[Any]]:
+    data: Dict[str, List[Any]] = {column: [] for column in _TSV_COLUMNS}
+    for line in tsv.splitlines():
+        values = line.split("\t", len(_TSV_COLUMNS) - 1)
+        if len(values) < len(_TSV_COLUMNS) - 1 or not values[0].isdigit():
+            continue  # header row or truncated line
+        values += [""] * (len(_TSV_COLUMNS) - len(values))
+        for column, value in zip(_TSV_COLUMNS, values):
+            if column == "text":
+                data[column].append(value)
+            elif column == "conf":
+                data[column].append(float(value))
+            else:
+                data[column].append(int(value))
+    return data
+
+
+class TesserocrBackend(OCRBackend):
+    """
+    libtesseract through tesserocr, in-process. Each worker process (and
+    thread) keeps one PyTessBaseAPI for its whole life, so the language
+    model is loaded once and pages never touch the disk.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self):
+        import tesserocr  # optional dependency; ImportError means "not installed"
+
+        self._tesserocr = tesserocr
+        self._local = threading.local()
+        # Fail now (missing tessdata etc.) rather than on the first page
+        self._api()
+
+    def _api(self):
+        # A forked child must not share its parent's engine
+        if getattr(self._local, "pid", None) != os.getpid():
+            self._local.api = self._tesserocr.PyTessBaseAPI()
+            self._local.pid = os.getpid()
+        return self._local.api
+
+    def image_to_data(self, image: Image.Image) -> Dict[str, List[Any]]:
+        api = self._api()
+        try:
+            api.SetImage(image)
+            return _parse_tsv(api.GetTSVText(0))
+        finally:
+            # Frees the page image and results; the loaded model stays
+            api.Clear()
+
+    def tesseract_version(self) -> str:
+        # "tesseract 5.3.0\n leptonica-1.82.0 ..."
+        return self._tesserocr.tesseract_version().split()[1]
+
+
+_ocr_backends: Dict[str, OCRBackend] = {}
+
+
+def get_ocr_backend() -> OCRBackend:
+    """
+    The OCR backend for this process, created on first use and reused
+    for every later page. Falls back to pytesseract when tesserocr is
+    not installed or cannot start.
+    """
+    name = get_ocr_backend_name()
+    backend = _ocr_backends.get(name)
+    if backend is None:
+        if name in ("auto", TesserocrBackend.name):
+            try:
+                backend = TesserocrBackend()
+            except Exception as e:
+                log = logger.warning if name == TesserocrBackend.name else logger.debug
+                log("tesserocr unavailable (%s); using pytesseract", e)
+        backend = _ocr_backends[name] = backend or PytesseractBackend()
+    return backend
+
+
+@timed("ocr")
+def run_ocr_on_image(image: Image.Image) -> Tuple[str, List[Word]]:
     """
     Normalize a PIL image and run Tesseract OCR.
-    We convert to grayscale and copy to avoid lazy loaders / fileno errors.
+    We convert to grayscale and copy to avoid lazy loaders / fileno errors,
+    then resize/deskew/crop/binarize (documents.preprocessing).
+
+    A single image_to_data call gives both the text and per-word
+    confidences, so confidence costs no second Tesseract run.
     """
     # Convert to grayscale (less memory) and detach from original file
     image = image.convert("L").copy()
-    return pytesseract.image_to_string(image)
+    if preprocessing.is_enabled():
+        image = preprocessing.preprocess_for_ocr(image, max_pixels=get_max_image_pixels())
+    data = get_ocr_backend().image_to_data(image)
+    return _text_from_ocr_data(data)
 
 
-def _ocr_file(file_path: str) -> str:
+# Per-page OCR latency, recorded in Document.ocr_pages:
+# {"backend": "tesserocr" | "pytesseract", "ocr_ms": wall time incl. preprocessing}
+PageTiming = Dict[str, Any]
+# (text, words, timing); timing is None for text-layer pages
+PageResult = Tuple[str, List[Word], Optional[PageTiming]]
+
+
+def _timed_ocr(image: Image.Image) -> PageResult:
+    start = time.perf_counter()
+    text, words = run_ocr_on_image(image)
+    elapsed = time.perf_counter() - start
+    return text, words, {"backend": get_ocr_backend().name, "ocr_ms": round(elapsed * 1000, 1)}
+
+
+def compute_confidence(words: List[Word]) -> float:
     """
-    Core OCR logic (no try/except).
-    - PDFs -> pdf2image -> OCR each page and join text.
-    - JPG/PNG -> PIL open -> OCR.
+    Character-weighted mean word confidence, scaled to 0..1.
+    0.0 when nothing was recognised.
     """
-    ext = Path(file_path).suffix.lower()
+    total_chars = sum(end - start for start, end, _ in words)
+    if not total_chars:
+        return 0.0
+    weighted = sum((end - start) * conf for start, end, conf in words)
+    return round(weighted / total_chars / 100.0, 4)
 
-    if ext == ".pdf":
-        # PDF -> convert each page to image, OCR all
-        # Use lower DPI to reduce memory usage
-        pages = convert_from_path(file_path, dpi=200)
-        texts = [run_ocr_on_image(page) for page in pages]
-        return "\n\n".join(texts)
-
-    # image types
-    if ext in {".jpg", ".jpeg", ".png"}:
-        with Image.open(file_path) as img:
-            return run_ocr_on_image(img)
-
-    # fallback (if unknown type)
-    with Image.open(file_path) as img:
-        return run_ocr_on_image(img)
 
+def field_confidences(spans: Dict[str, Tuple[int, int]], words: List[Word]) -> Dict[str, float]:
+    """
+    Confidence of each extracted field: the lowest confidence (0..1) of
+    the words its match covers. `words` must be sorted by offset.
+    """
+    starts = [w[0] for w in words]
+    result = {}
+    for name, (start, end) in spans.items():
+        # first word that could overlap: the one starting at/just before `start`
+        i = max(bisect_left(starts, start) - 1, 0)
+        confs = []
+        while i < len(words) and words[i][0] < end:
+            if words[i][1] > start:
+                confs.append(words[i][2])
+            i += 1
+        if confs:
+            result[name] = round(min(confs) / 100.0, 4)
+    return result
+
+
+def page_latency_stats(documents_pages: Iterator[Optional[List[Dict[str, Any]]]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Per-backend OCR page latency (count, mean, p50, p95, max in ms)
+    over the ocr_pages of some documents, to compare backends.
+    """
+    samples: Dict[str, List[float]] = {}
+    for pages in documents_pages:
+        for page in pages or []:
+            if page.get("ocr_ms") is not None:
+                samples.setdefault(page.get("backend") or "unknown", []).append(page["ocr_ms"])
+
+    stats = {}
+    for backend, values in samples.items():
+        values.sort()
+        stats[backend] = {
+            "pages": len(values),
+            "mean_ms": round(sum(values) / len(values), 1),
+            "p50_ms": values[int(0.50 * (len(values) - 1))],
+            "p95_ms": values[int(0.95 * (len(values) - 1))],
+            "max_ms": values[-1],
+        }
+    return stats
+
+
+def _init_pdf_worker() -> None:
+    # Tesseract is OpenMP-threaded; with one page per process, extra
+    # threads only oversubscribe the cores we are already using.
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+    # Load the engine once per pool process, not on its first page
+    get_ocr_backend()
+
+
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+_pdf_pool_key: Optional[Tuple[int, int]] = None  # (owner pid, workers)
+_pdf_pool_lock = threading.Lock()
+
+
+def _get_pdf_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Process pool for PDF pages, created on first use and kept for the
+    life of the process, so documents don't pay for process start-up and
+    engine loading. A forked child or a changed OCR_PDF_WORKERS gets a new one.
+    """
+    global _pdf_pool, _pdf_pool_key
+    key = (os.getpid(), workers)
+    with _pdf_pool_lock:
+        if _pdf_pool is None or _pdf_pool_key != key:
+            # A pool inherited through fork belongs to the parent; just drop it
+            if _pdf_pool is not None and _pdf_pool_key[0] == key[0]:
+                _pdf_pool.shutdown(wait=False)
+            _pdf_pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_pdf_worker)
+            _pdf_pool_key = key
+        return _pdf_pool
+
+
+def _discard_pdf_pool(pool: ProcessPoolExecutor) -> None:
+    # Only if another document hasn't replaced it already
+    global _pdf_pool, _pdf_pool_key
+    with _pdf_pool_lock:
+        if _pdf_pool is pool:
+            _pdf_pool = _pdf_pool_key = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_pdf_pool() -> None:
+    """Stop the PDF page pool, if this process started one."""
+    pool = _pdf_pool
+    if pool is not None and _pdf_pool_key[0] == os.getpid():
+        _discard_pdf_pool(pool)
+
+
+def _pdf_info(file_path: str, poppler_path: Optional[str]) -> Tuple[int, Optional[Tuple[float, float]]]:
+    """
+    Return (page_count, page size in points) via pdfinfo, without rasterizing.
+    pdfinfo only reports the first page's size, which is enough for a pre-check.
+    """
+    info = pdfinfo_from_path(file_path, poppler_path=poppler_path)
+    page_count = int(info["Pages"])
+
+    page_size = None
+    m = re.match(r"\s*([0-9.]+) x ([0-9.]+) pts", str(info.get("Page size", "")))
+    if m:
+        page_size = (float(m.group(1)), float(m.group(2)))
+    return page_count, page_size
 
-def ocr_file(file_path: str) -> str:
+
+def _check_pdf_page_count(page_count: int) -> None:
+    max_pages = get_max_pdf_pages()
+    if page_count > max_pages:
+        raise OCRLimitExceeded(f"PDF has {page_count} pages, above the {max_pages} page limit.")
+
+
+def _check_pdf_page_pixels(page_size: Optional[Tuple[float, float]], dpi: int) -> None:
+    if page_size:
+        # 72 PDF points per inch
+        check_image_pixels(int(page_size[0] * dpi / 72), int(page_size[1] * dpi / 72))
+
+
+def iter_pdf_pages(
+    file_path: str,
+    first_page: int,
+    last_page: int,
+    dpi: int,
+    poppler_path: Optional[str],
+    window: int = 1,
+) -> Iterator[Image.Image]:
     """
-    Safe wrapper for OCR: logs errors and returns empty string on failure.
-    This prevents gunicorn worker crash.
+    Yield rasterized pages first_page..last_page (1-based, inclusive),
+    converting `window` pages at a time and closing each page after the
+    consumer is done with it. Only one window of bitmaps is ever alive.
     """
-    try:
-        return _ocr_file(file_path)
-    except Exception as e:
-        logger.exception("OCR failed for %s: %s", file_path, e)
-        return ""
+    for start in range(first_page, last_page + 1, window):
+        with span("rasterize"):
+            pages = convert_from_path(
+                file_path,
+                dpi=dpi,
+                first_page=start,
+                last_page=min(start + window - 1, last_page),
+                poppler_path=poppler_path,
+            )
+        while pages:
+            page = pages.pop(0)
+            try:
+                # pdfinfo only sized page 1; later pages can differ
+                check_image_pixels(*page.size)
+                yield page
+            finally:
+                page.close()
+
+
+def _ocr_pdf_page(file_path: str, page_number: int, dpi: int, poppler_path: Optional[str]) -> PageResult:
+    """
+    Rasterize and OCR a single PDF page (1-based).
+    Runs inside a pool process, so it only takes picklable arguments.
+    """
+    results = [_timed_ocr(page) for page in iter_pdf_pages(file_path, page_number, page_number, dpi, poppler_path)]
+    return results[0] if results else ("", [], None)
 
 
-def compute_confidence_placeholder(text: str) -> float:
+def is_usable_text_layer(text: str) -> bool:
+    """
+    Decide whether a page's embedded text is real text or garbage.
+    Broken font encodings show up as (cid:NN) runs, replacement chars
+    or control bytes, so we require mostly plain characters.
     """
-    Placeholder confidence function.
+    stripped = text.strip()
+    if len(stripped) < get_text_layer_min_chars() or "(cid:" in stripped:
+        return False
+    plain = sum(1 for c in stripped if c in _TEXT_LAYER_OK_CHARS or c.isalnum())
+    return plain / len(stripped) >= 0.85
 
-    For now, return a dummy value based on length of text.
-    Later, you could integrate real confidence scores
-    from Tesseract or a ML model.
+
+def _pdf_text_layer(file_path: str, page_count: int) -> List[str]:
     """
-    if not text:
-        return 0.0
-    # simple heuristic: more text => higher confidence, between 0.3 and 0.9
-    length = len(text)
-    if length < 100:
-        return 0.3
-    elif length < 500:
-        return 0.6
-    else:
-        return 0.8
-
-
-def extract_academic_fields(text: str) -> Dict[str, Any]:
-    """
-    Extract fields from academic documents:
-    - Student Name
-    - University/School
-    - Course Name
-    - Percentage or GPA
-    - Year of Passing
-    """
-    t = text.replace("\r", "\n")
-
-    # Percentage like "85%" or "85.5 %"
-    percentage = None
-    m = re.search(r"(\d{1,3}(?:\.\d+)?)[\s]*%+", t)
-    if m:
-        percentage = float(m.group(1))
-    else:
-        m = re.search(r"(percentage|marks|scored)[\s:\-]*([0-9]{1,3}(?:\.\d+)?)", t, re.IGNORECASE)
-        if m:
-            percentage = float(m.group(2))
-
-    # GPA like "GPA: 8.5"
-    gpa = None
-    m = re.search(r"\bGPA[:\s]*([0-9]\.?[0-9]?)\b", t, re.IGNORECASE)
-    if m:
-        try:
-            gpa = float(m.group(1))
-        except ValueError:
-            gpa = None
-
-    # Year of Passing (4 digits, prefer patterns with labels)
-    year_of_passing = None
-    m = re.search(
-        r"(Year of Passing|Passed in|Passing Year|Class of)[\s:\-]*([12][0-9]{3})",
-        t,
-        re.IGNORECASE,
-    )
-    if m:
-        year_of_passing = int(m.group(2))
-    else:
-        # fallback: look for a reasonable year (1990-2099)
-        m = re.search(r"\b(19[9][0-9]|20[0-9]{2})\b", t)
-        if m:
-            year_of_passing = int(m.group(1))
-
-    # Student Name: "Name: John Doe" or similar
-    student_name = None
-    m = re.search(
-        r"(Student Name|Name of Student|Name)[:\s\-]{1,10}([A-Z][A-Za-z ,.'-]{1,80})",
-        t,
-    )
-    if m:
-        student_name = m.group(2).strip()
-    else:
-        for line in t.splitlines():
-            if "name" in line.lower() and len(line.split()) <= 7:
-                parts = re.split(r":|-", line)
-                if len(parts) >= 2:
-                    candidate = parts[1].strip()
-                    if len(candidate) > 2:
-                        student_name = candidate
-                        break
-
-    # University / College / School
-    university = None
-    m = re.search(
-        r"(University|College|Institute|School)[:\s\-]{1,10}(.{3,120})",
-        t,
-        re.IGNORECASE,
-    )
-    if m:
-        university = m.group(2).strip().split("\n")[0]
-
-    # Course / Program / Degree
-    course = None
-    m = re.search(
-        r"(Course|Program|Programme|Degree)[:\s\-]{1,10}(.{2,80})",
-        t,
-        re.IGNORECASE,
-    )
-    if m:
-        course = m.group(2).strip().split("\n")[0]
+    Return the usable embedded text of each page ("" where the page needs OCR).
+    Any PyPDF2 failure just means every page is OCR'd as before.
+    """
+    if not use_pdf_text_layer():
+        return [""] * page_count
 
-    return {
-        "doc_type": "academic",
-        "student_name": student_name,
-        "university": university,
-        "course": course,
-        "percentage": percentage,
-        "gpa": gpa,
-        "year_of_passing": year_of_passing,
-    }
+    try:
+        reader = PdfReader(file_path)
+        texts = [page.extract_text() or "" for page in reader.pages]
+    except Exception as e:
+        logger.warning("Text layer extraction failed for %s: %s", file_path, e)
+        return [""] * page_count
+
+    if len(texts) != page_count:
+        # PyPDF2 and poppler disagree about the document; trust neither text layer
+        return [""] * page_count
+    return [t if is_usable_text_layer(t) else "" for t in texts]
 
 
-def extract_financial_fields(text: str) -> Dict[str, Any]:
+def _page_runs(page_numbers: List[int]) -> List[Tuple[int, int]]:
     """
-    Extract fields from financial documents like bank statement / FD:
-    - Bank Name
-    - Account Holder Name
-    - Available Balance or FD Amount
-    - Date (one main date)
+    Group sorted page numbers into contiguous (first, last) runs,
+    so each run can be rasterized with a single first_page/last_page range.
     """
-    t = text.replace("\r", "\n")
+    runs: List[Tuple[int, int]] = []
+    for n in page_numbers:
+        if runs and runs[-1][1] == n - 1:
+            runs[-1] = (runs[-1][0], n)
+        else:
+            runs.append((n, n))
+    return runs
 
-    # Bank name (very heuristic)
-    bank_name = None
-    m = re.search(r"(Bank of [A-Za-z ]+|[A-Za-z ]+ Bank)", t)
-    if m:
-        bank_name = m.group(0).strip()
-
-    # Account holder: "Account Holder: John Doe" or "A/c Name: ..."
-    account_holder = None
-    m = re.search(
-        r"(Account Holder|Account Name|A/c Name|A/c Holder)[:\s\-]{1,10}(.{2,80})",
-        t,
-        re.IGNORECASE,
-    )
-    if m:
-        account_holder = m.group(2).strip().split("\n")[0]
-
-    # Balance or FD amount: look for "Available Balance" or "Balance" or "Amount"
-    available_balance = None
-    m = re.search(
-        r"(Available Balance|Balance|FD Amount|Deposit Amount)[:\s\-]*([0-9,]+\.\d{2}|[0-9,]+)",
-        t,
-        re.IGNORECASE,
-    )
-    if m:
-        amount_str = m.group(2).replace(",", "")
-        try:
-            available_balance = float(amount_str)
-        except ValueError:
-            available_balance = None
 
-    # Date: simple pattern DD/MM/YYYY or YYYY-MM-DD
-    date = None
-    m = re.search(r"\b(\d{2}/\d{2}/\d{4})\b", t)
-    if m:
-        date = m.group(1)
-    else:
-        m = re.search(r"\b(20[0-9]{2}-\d{2}-\d{2})\b", t)
-        if m:
-            date = m.group(1)
+def _join_pages(page_results: List[PageResult], sources: List[str]) -> Dict[str, Any]:
+    """
+    Join per-page (text, words, timing) results into the document result,
+    shifting word offsets into the joined text.
+    """
+    texts = []
+    words: List[Word] = []
+    pages = []
+    pos = 0
+    for n, ((text, page_words, timing), source) in enumerate(zip(page_results, sources), start=1):
+        if n > 1:
+            pos += 2  # "\n\n" page separator
+        words.extend((pos + start, pos + end, conf) for start, end, conf in page_words)
+        pages.append({"page": n, "source": source, "confidence": compute_confidence(page_words), **(timing or {})})
+        texts.append(text)
+        pos += len(text)
 
     return {
-        "doc_type": "financial",
-        "bank_name": bank_name,
-        "account_holder": account_holder,
-        "available_balance": available_balance,
-        "date": date,
+        "text": "\n\n".join(texts),
+        "pages": pages,
+        "words": words,
+        "confidence": compute_confidence(words),
     }
 
 
-def extract_fields(doc_type: str, text: str) -> Dict[str, Any]:
+def _ocr_pdf(file_path: str) -> Dict[str, Any]:
+    """
+    Extract text from every page of a PDF, joined in page order.
+
+    Born-digital pages use the embedded text layer (milliseconds);
+    only pages without a usable text layer are rasterized and OCR'd.
+    Rasterized pages are streamed through iter_pdf_pages, so memory does
+    not grow with page count. With OCR_PDF_WORKERS > 1 those pages are
+    OCR'd concurrently, one page per task on a pool shared by every
+    document this process handles.
+    """
+    dpi = get_pdf_dpi()
+    poppler_path = get_poppler_path()
+    workers = get_pdf_workers()
+
+    page_count, page_size = _pdf_info(file_path, poppler_path)
+    _check_pdf_page_count(page_count)
+
+    layer = _pdf_text_layer(file_path, page_count)
+    page_results: List[PageResult] = [(t, [(0, len(t), TEXT_LAYER_CONFIDENCE)], None) for t in layer]
+    to_ocr = [n for n in range(1, page_count + 1) if not layer[n - 1]]
+
+    if to_ocr:
+        # Only rasterization needs the pixel guard
+        _check_pdf_page_pixels(page_size, dpi)
+
+    if to_ocr and (workers <= 1 or len(to_ocr) <= 1):
+        window = get_pdf_page_window()
+        for first, last in _page_runs(to_ocr):
+            pages = iter_pdf_pages(file_path, first, last, dpi, poppler_path, window=window)
+            for n, page in zip(range(first, last + 1), pages):
+                page_results[n - 1] = _timed_ocr(page)
+    elif to_ocr:
+        pool = _get_pdf_pool(workers)
+        try:
+            # map() yields results in submission order, so page order is kept
+            results = pool.map(
+                _ocr_pdf_page,
+                repeat(file_path),
+                to_ocr,
+                repeat(dpi),
+                repeat(poppler_path),
+            )
+            for n, result in zip(to_ocr, results):
+                page_results[n - 1] = result
+        except BrokenProcessPool:
+            # A page killed its process (OOM etc.); the next document gets a fresh pool
+            _discard_pdf_pool(pool)
+            raise
+
+    ocr_set = set(to_ocr)
+    sources = [PAGE_SOURCE_OCR if n in ocr_set else PAGE_SOURCE_TEXT_LAYER for n in range(1, page_count + 1)]
+    return _join_pages(page_results, sources)
+
+
+def ocr_document(file_path: str) -> Dict[str, Any]:
     """
-    Entry point: choose correct extraction based on doc_type.
-    Add a small raw_text_snippet for debugging.
+    OCR a stored document.
+    Errors propagate: run_job() retries the job and fails it after
+    OCR_JOB_MAX_ATTEMPTS, instead of saving an empty result as done.
+    - PDFs -> text layer where usable, else pdf2image -> OCR, per page.
+    - JPG/PNG -> PIL open -> OCR.
+
+    Returns:
+      {
+        "text": joined text,
+        "pages": [{"page": n, "source": ..., "confidence": 0..1,
+                   "backend": ..., "ocr_ms": ...}, ...],  # timing on OCR'd pages only
+        "words": [(start, end, confidence 0-100), ...] over "text",
+        "confidence": document confidence 0..1,
+      }
     """
-    if not text:
-        return {"error": "No text extracted from document."}
+    ext = Path(file_path).suffix.lower()
+
+    if ext == ".pdf":
+        return _ocr_pdf(file_path)
+
+    # image types (and fallback for unknown types).
+    # Image.open is lazy, so the size check runs before pixels are decoded.
+    with Image.open(file_path) as img:
+        check_image_pixels(*img.size)
+        result = _timed_ocr(img)
+    return _join_pages([result], [PAGE_SOURCE_OCR])
 
-    if doc_type == "academic":
-        base = extract_academic_fields(text)
-    else:
-        base = extract_financial_fields(text)
 
-    base["raw_text_snippet"] = text[:300]
-    return base
+def ocr_file(file_path: str) -> str:
+    """
+    Text-only variant of ocr_document.
+    """
+    return ocr_document(file_path)["text"]
@@ -1,13 +1,133 @@
+import math
+
+from rest_framework.authentication import CSRFCheck
 from rest_framework.views import APIView
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.response import Response
-from rest_framework import status
+from rest_framework import serializers, status
 
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views import View
+
+from core.pagination import KeysetPagination
+from core.throttling import OCRUploadRateThrottle
+
+from .serializers import (
+    BatchUploadSerializer,
+    DocumentListQuerySerializer,
+    DocumentSearchQuerySerializer,
+    DocumentSerializer,
+    ExtractedDataUpdateSerializer,
+    OCRJobSerializer,
+    UploadFinalizeSerializer,
+    UploadSessionSerializer,
+    build_document,
+)
+from .models import Document, OCRJob, UploadSession
+from .executor import get_ocr_executor
+from .jobs import enqueue_ocr, enqueue_ocr_many
+from . import ocr_cache, uploads
+from .admission import OCRQueueThrottle
+from .search import search_available, search_documents
+from .utils import HashingTemporaryFileUploadHandler, get_ocr_backend, page_latency_stats
+
+# Endpoints that queue OCR: per-client token bucket, then the queue depth
+OCR_THROTTLES = (OCRUploadRateThrottle, OCRQueueThrottle)
+
+
+class DocumentListView(APIView):
+    """
+    GET /api/documents/?doc_type=academic&min_confidence=0.8&eligible=true&q=marks&cursor=...
+
+    Newest documents first, keyset-paginated on (uploaded_at, id): follow
+    "next" (or pass "next_cursor" as ?cursor=) for the next page; every
+    page costs the same, however deep. Filters:
+      - doc_type
+      - min_confidence / max_confidence: OCR confidence range (0..1)
+      - eligible: outcome of the document's latest eligibility check
+      - q: filename contains (case-insensitive)
+      - min_percentage / min_gpa / min_balance: extracted values (indexed columns)
+    ?fields= / ?include= and ?page_size= work as on the other document responses.
+    """
+
+    def get(self, request, format=None):
+        query = DocumentListQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response({"success": False, "errors": query.errors}, status=status.HTTP_400_BAD_REQUEST)
+        filters = query.validated_data
+
+        paginator = KeysetPagination("uploaded_at")
+        try:
+            sparse = DocumentSerializer.sparse_fields(request.query_params)
+            documents = Document.objects.for_fields(DocumentSerializer.field_names(**sparse) + ["uploaded_at"])
+            if filters.get("doc_type"):
+                documents = documents.filter(doc_type=filters["doc_type"])
+            if "min_confidence" in filters:
+                documents = documents.filter(ocr_confidence__gte=filters["min_confidence"])
+            if "max_confidence" in filters:
+                documents = documents.filter(ocr_confidence__lte=filters["max_confidence"])
+            for param, column in (
+                ("min_percentage", "percentage"),
+                ("min_gpa", "gpa"),
+                ("min_balance", "available_balance"),
+            ):
+                if param in filters:
+                    documents = documents.filter(**{f"{column}__gte": filters[param]})
+            if filters.get("q"):
+                documents = documents.filter(original_filename__icontains=filters["q"])
+            if filters.get("eligible") is not None:
+                documents = documents.filter(latest_eligible=filters["eligible"])
+            page = paginator.paginate_queryset(documents, request)
+        except serializers.ValidationError as e:
+            return Response({"success": False, "errors": e.detail}, status=status.HTTP_400_BAD_REQUEST)
 
-from .serializers import DocumentSerializer, ExtractedDataUpdateSerializer
-from .models import Document
-from .utils import ocr_file, extract_fields, compute_confidence_placeholder
+        return paginator.get_paginated_response(DocumentSerializer(page, many=True, **sparse).data)
+
+
+class DocumentSearchView(APIView):
+    """
+    GET /api/documents/search/?q="state bank" -loan&doc_type=financial&limit=20
+
+    Full-text search over OCR text and extracted names (documents/search.py).
+    Returns the best matches first, each with its rank, a highlighted
+    excerpt (<mark>...</mark>) and the document (?fields= / ?include= apply).
+    501 on databases other than Postgres.
+    """
+
+    def get(self, request, format=None):
+        query = DocumentSearchQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response({"success": False, "errors": query.errors}, status=status.HTTP_400_BAD_REQUEST)
+        if not search_available():
+            return Response(
+                {"success": False, "errors": {"detail": ["Full-text search needs a PostgreSQL database."]}},
+                status=status.HTTP_501_NOT_IMPLEMENTED,
+            )
+        try:
+            sparse = DocumentSerializer.sparse_fields(request.query_params)
+        except serializers.ValidationError as e:
+            return Response({"success": False, "errors": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+
+        data = query.validated_data
+        matches = search_documents(data["q"], data.get("doc_type"), data["limit"])
+        documents = Document.objects.for_fields(DocumentSerializer.field_names(**sparse)).in_bulk(
+            [match["document_id"] for match in matches]
+        )
+
+        results = [
+            {
+                "document": DocumentSerializer(documents[match["document_id"]], **sparse).data,
+                "rank": match["rank"],
+                "highlight": match["highlight"],
+            }
+            for match in matches
+            if match["document_id"] in documents
+        ]
+        return Response({"success": True, "results": results}, status=status.HTTP_200_OK)
 
 
 class DocumentUploadView(APIView):
@@ -20,51 +140,30 @@ class DocumentUploadView(APIView):
 
     Steps:
       1. Save Document record + file
-      2. Run OCR on the saved file
-      3. Extract structured fields based on doc_type
-      4. Save OCR text, extracted data, and confidence to the Document
-      5. Return structured data in response
+      2. Enqueue an OCRJob (processed by `manage.py ocr_worker`)
+      3. Return 202 with the job id; poll GET /api/documents/jobs/<id>/
+         for OCR text, extracted data and confidence
     """
     parser_classes = (MultiPartParser, FormParser,)
     serializer_class = DocumentSerializer 
+    throttle_classes = OCR_THROTTLES
 
     def post(self, request, format=None):
-        # The rest of your post method remains the same
         serializer = self.serializer_class(data=request.data)
         if serializer.is_valid():
             # 1) Save Document
             document: Document = serializer.save()
 
-            # 2) Run OCR
-            file_path = document.file.path  # local path in media/documents/
-            try:
-                ocr_text = ocr_file(file_path)
-            except Exception as e:
-                # In production you'd log this
-                ocr_text = ""
-                extracted = {"error": f"OCR failed: {str(e)}"}
-                confidence = 0.0
-            else:
-                # 3) Extract fields from OCR text
-                extracted = extract_fields(document.doc_type, ocr_text)
-                confidence = compute_confidence_placeholder(ocr_text)
-
-            # 4) Save OCR + extracted data to DB
-            document.ocr_text = ocr_text
-            document.extracted_data = extracted
-            document.ocr_confidence = confidence
-            document.save(update_fields=["ocr_text", "extracted_data", "ocr_confidence"])
-
-            # Re-serialize with updated fields
-            updated_serializer = DocumentSerializer(document)
+            # 2) Enqueue OCR; the worker pool does the heavy lifting
+            job = enqueue_ocr(document)
 
             response_data = {
                 "success": True,
-                "document": updated_serializer.data,
-                "extracted": extracted,
-                "confidence": confidence,
+                "document": DocumentSerializer(document).data,
+                "job": OCRJobSerializer(job).data,
+                "status_url": reverse("document-job-status", args=[job.pk]),
             }
-            return Response(response_data, status=status.HTTP_201_CREATED)
+            return Response(response_data, status=status.HTTP_202_ACCEPTED)
 
         return Response(
             {"success": False, "errors": serializer.errors},
@@ -72,17 +171,374 @@ class DocumentUploadView(APIView):
         )
 
 
+class DocumentBatchUploadView(APIView):
+    """
+    POST /api/documents/batch-upload/
+
+    Accepts (multipart):
+      - files: repeated, PDF/JPG/PNG
+      - doc_type: one value for every file, or one per file in the same order
+
+    All documents are inserted with one bulk_create and their OCR jobs
+    with another, so the ocr_worker pool OCRs the whole set concurrently.
+    Returns 202 with, per file (in upload order), the document, its job
+    and the job status URL. Invalid batches are rejected as a whole.
+    """
+    parser_classes = (MultiPartParser, FormParser,)
+    serializer_class = BatchUploadSerializer
+    throttle_classes = OCR_THROTTLES
+
+    def initialize_request(self, request, *args, **kwargs):
+        # Spool every file part straight to a temp file instead of holding
+        # small files in memory, hashing it on the way so storage can move
+        # it into place; must happen before the body is read.
+        request.upload_handlers = [HashingTemporaryFileUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
+    def post(self, request, format=None):
+        serializer = self.serializer_class(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                {"success": False, "errors": serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        files = serializer.validated_data["files"]
+        doc_types = serializer.validated_data["doc_type"]
+
+        # The throttle charged one token before the body was parsed; now the
+        # rest, one per document, or a batch would dodge the rate limit
+        throttle = OCRUploadRateThrottle()
+        if not throttle.settle(request, len(files)):
+            self.throttled(request, throttle.wait())
+
+        documents = []
+        try:
+            for file_obj, doc_type in zip(files, doc_types):
+                documents.append(build_document({"file": file_obj, "doc_type": doc_type}))
+            with transaction.atomic():
+                documents = Document.objects.bulk_create(documents)
+                jobs = enqueue_ocr_many(documents)
+        except Exception:
+            # Don't leave orphaned files behind when the batch fails
+            for document in documents:
+                document.file.delete(save=False)
+            raise
+
+        results = [
+            {
+                "document": DocumentSerializer(document).data,
+                "job": OCRJobSerializer(job).data,
+                "status_url": reverse("document-job-status", args=[job.pk]),
+            }
+            for document, job in zip(documents, jobs)
+        ]
+        return Response({"success": True, "results": results}, status=status.HTTP_202_ACCEPTED)
+
+
+def _too_many_requests(detail: str, retry_after: float) -> JsonResponse:
+    retry_after = max(1, math.ceil(retry_after))
+    response = JsonResponse(
+        {"success": False, "errors": {"detail": detail}, "retry_after": retry_after},
+        status=status.HTTP_429_TOO_MANY_REQUESTS,
+    )
+    response["Retry-After"] = str(retry_after)
+    return response
+
+
+def _upload_error_response(error: uploads.UploadError) -> Response:
+    if isinstance(error, uploads.UploadConflict):
+        return Response(
+            {"success": False, "errors": {"detail": [str(error)]}, "offset": error.offset},
+            status=status.HTTP_409_CONFLICT,
+            headers={"Upload-Offset": str(error.offset)},
+        )
+    return Response(
+        {"success": False, "errors": {"detail": [str(error)]}},
+        status=status.HTTP_400_BAD_REQUEST,
+    )
+
+
+class UploadSessionCreateView(APIView):
+    """
+    POST /api/documents/uploads/
+
+    Starts a resumable upload (see documents/uploads.py for the protocol).
+    Accepts JSON: doc_type, filename, size (bytes), optional sha256.
+    Returns 201 with the upload and the URL to PUT chunks to.
+    """
+    # Admission happens here, not at finalize, so nobody uploads 200 MB to be refused
+    throttle_classes = OCR_THROTTLES
+
+    def post(self, request, format=None):
+        serializer = UploadSessionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                {"success": False, "errors": serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        data = serializer.validated_data
+        try:
+            session = uploads.create_session(
+                data["doc_type"], data["original_filename"], data["size"], data.get("sha256", "")
+            )
+        except uploads.UploadError as e:
+            return _upload_error_response(e)
+
+        return Response(
+            {
+                "success": True,
+                "upload": UploadSessionSerializer(session).data,
+                "upload_url": reverse("document-upload-session", args=[session.pk]),
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class UploadSessionView(APIView):
+    """
+    GET    /api/documents/uploads/<id>/  -> upload state; "received" is the offset to resume from
+    PUT    /api/documents/uploads/<id>/  -> append the raw request body at the "Upload-Offset" header
+    DELETE /api/documents/uploads/<id>/  -> abort and delete the partial file
+
+    A PUT whose offset doesn't match the server's returns 409 with the
+    correct offset. The body is read from the request stream, never parsed.
+    """
+
+    def get(self, request, pk, format=None):
+        session = get_object_or_404(UploadSession, pk=pk)
+        return Response(
+            {"success": True, "upload": UploadSessionSerializer(session).data},
+            status=status.HTTP_200_OK,
+            headers={"Upload-Offset": str(session.received)},
+        )
+
+    def put(self, request, pk, format=None):
+        try:
+            offset = uploads.parse_offset(request.headers.get("Upload-Offset"))
+            length = int(request.META.get("CONTENT_LENGTH") or 0)
+            session = uploads.append_chunk(pk, offset, request.stream, length) if length else None
+        except UploadSession.DoesNotExist:
+            raise Http404
+        except uploads.UploadError as e:
+            return _upload_error_response(e)
+
+        if session is None:
+            session = get_object_or_404(UploadSession, pk=pk)
+        return Response(
+            {"success": True, "upload": UploadSessionSerializer(session).data},
+            status=status.HTTP_200_OK,
+            headers={"Upload-Offset": str(session.received)},
+        )
+
+    def delete(self, request, pk, format=None):
+        try:
+            uploads.abort(pk)
+        except UploadSession.DoesNotExist:
+            raise Http404
+        except uploads.UploadError as e:
+            return _upload_error_response(e)
+        return Response({"success": True}, status=status.HTTP_200_OK)
+
+
+class UploadSessionFinalizeView(APIView):
+    """
+    POST /api/documents/uploads/<id>/finalize/
+
+    Checks the SHA-256 (from this request or the init request), creates the
+    Document and enqueues OCR. Same 202 response shape as a normal upload.
+    """
+
+    def post(self, request, pk, format=None):
+        serializer = UploadFinalizeSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                {"success": False, "errors": serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            document, job = uploads.finalize(pk, serializer.validated_data.get("sha256", ""))
+        except UploadSession.DoesNotExist:
+            raise Http404
+        except uploads.UploadError as e:
+            return _upload_error_response(e)
+
+        return Response(
+            {
+                "success": True,
+                "document": DocumentSerializer(document).data,
+                "job": OCRJobSerializer(job).data,
+                "status_url": reverse("document-job-status", args=[job.pk]),
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class OCRJobStatusView(APIView):
+    """
+    GET /api/documents/jobs/<id>/?fields=...&include=ocr_text
+
+    Returns the job status. Once the job is "done" the response also
+    carries the processed document (extracted_data, ocr_confidence, ...).
+    ocr_text is left out unless requested with ?include=ocr_text;
+    ?fields= limits the document to the listed fields.
+    """
+
+    def get(self, request, pk, format=None):
+        try:
+            sparse = DocumentSerializer.sparse_fields(request.query_params)
+        except serializers.ValidationError as e:
+            return Response({"success": False, "errors": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+
+        job = get_object_or_404(OCRJob, pk=pk)
+        return Response(job_status_data(job, sparse), status=status.HTTP_200_OK)
+
+
+def job_status_data(job: OCRJob, sparse) -> dict:
+    response_data = {
+        "success": True,
+        "job": OCRJobSerializer(job).data,
+    }
+    if job.status == OCRJob.STATUS_DONE:
+        # Only load what is returned; pollers mostly see queued/running jobs
+        document = Document.objects.for_fields(DocumentSerializer.field_names(**sparse)).get(pk=job.document_id)
+        response_data["document"] = DocumentSerializer(document, **sparse).data
+    return response_data
+
+
+class AsyncAPIView(View):
+    """
+    Base for the async (ASGI) endpoints. DRF's APIView is sync-only, so
+    these are plain Django views answering in the same JSON shapes.
+
+    CSRF is handled the way APIView with SessionAuthentication does it:
+    the view is exempt from CsrfViewMiddleware, and the check is only
+    enforced on unsafe requests from a logged-in session user, since
+    anonymous requests carry no credentials a forged request could use.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        view.csrf_exempt = True
+        return view
+
+    def dispatch(self, request, *args, **kwargs):
+        return self._dispatch(request, *args, **kwargs)
+
+    async def _dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD", "OPTIONS", "TRACE"):
+            # request.user may need a session lookup
+            reason = await sync_to_async(self._csrf_failure)(request)
+            if reason:
+                return JsonResponse({"detail": f"CSRF Failed: {reason}"}, status=status.HTTP_403_FORBIDDEN)
+        return await super().dispatch(request, *args, **kwargs)
+
+    @staticmethod
+    def _csrf_failure(request):
+        user = getattr(request, "user", None)
+        if not user or not user.is_active:
+            return None
+        check = CSRFCheck(lambda request: None)
+        check.process_request(request)
+        return check.process_view(request, None, (), {})
+
+
+class AsyncDocumentUploadView(AsyncAPIView):
+    """
+    POST /api/documents/async/upload/   (same form as upload/)
+
+    For ASGI deployments: OCR runs in this process's bounded pool
+    (documents/executor.py) instead of waiting for the ocr_worker, while
+    the event loop keeps serving other requests. When the client is over
+    its rate, the pool's queue is full or every global OCR slot is taken
+    (documents/admission.py), the upload is refused straight away with
+    429 and a Retry-After header, before anything is stored. Poll the
+    returned status_url (async/jobs/<id>/) for the result.
+    """
+
+    async def post(self, request):
+        throttle = OCRUploadRateThrottle()
+        # request.user may need a session lookup
+        if not await sync_to_async(throttle.allow_request)(request, self):
+            return _too_many_requests("Request was throttled.", throttle.wait())
+
+        executor = get_ocr_executor()
+        slot = await executor.admit()
+        if slot is None:
+            return _too_many_requests("OCR is at capacity, retry later.", executor.retry_after())
+
+        try:
+            # Parsing the form, writing the file and the rows are blocking
+            response_data, job = await sync_to_async(self._accept)(request, executor)
+        except BaseException:
+            await executor.release(slot)
+            raise
+        if job is None:
+            await executor.release(slot)
+            return JsonResponse(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+        executor.submit(job, slot)
+        return JsonResponse(response_data, status=status.HTTP_202_ACCEPTED)
+
+    def _accept(self, request, executor):
+        data = request.POST.copy()
+        data.update(request.FILES)
+        serializer = DocumentSerializer(data=data)
+        if not serializer.is_valid():
+            return {"success": False, "errors": serializer.errors}, None
+
+        with transaction.atomic():
+            document: Document = serializer.save()
+            job = executor.start(document)
+        return {
+            "success": True,
+            "document": DocumentSerializer(document).data,
+            "job": OCRJobSerializer(job).data,
+            "status_url": reverse("document-async-job-status", args=[job.pk]),
+        }, job
+
+
+class AsyncOCRJobStatusView(AsyncAPIView):
+    """
+    GET /api/documents/async/jobs/<id>/?fields=...&include=ocr_text
+
+    jobs/<id>/ for ASGI deployments: same response, without tying up a thread.
+    """
+
+    async def get(self, request, pk):
+        try:
+            sparse = DocumentSerializer.sparse_fields(request.GET)
+        except serializers.ValidationError as e:
+            return JsonResponse({"success": False, "errors": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            job = await OCRJob.objects.aget(pk=pk)
+        except OCRJob.DoesNotExist:
+            return JsonResponse({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        return JsonResponse(await sync_to_async(job_status_data)(job, sparse), status=status.HTTP_200_OK)
+
+
 class DocumentExtractedUpdateView(APIView):
     """
-    PATCH /api/documents/<id>/update-extracted/
+    PATCH /api/documents/<id>/update-extracted/?fields=...&include=ocr_text
 
     Allows updating the extracted_data JSON for a Document.
     We accept only a subset of allowed fields, and merge them into existing extracted_data.
+    The returned document honours ?fields= / ?include= like the job status.
     """
 
     def patch(self, request, pk, format=None):
+        try:
+            sparse = DocumentSerializer.sparse_fields(request.query_params)
+        except serializers.ValidationError as e:
+            return Response({"success": False, "errors": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+
         # 1) Find document
-        document = get_object_or_404(Document, pk=pk)
+        columns = DocumentSerializer.field_names(**sparse) + ["extracted_data"]
+        document = get_object_or_404(Document.objects.for_fields(columns), pk=pk)
 
         # 2) Validate incoming fields
         serializer = ExtractedDataUpdateSerializer(data=request.data, partial=True)
@@ -104,7 +560,7 @@ class DocumentExtractedUpdateView(APIView):
         document.save(update_fields=["extracted_data"])
 
         # 4) Return updated document
-        doc_serializer = DocumentSerializer(document)
+        doc_serializer = DocumentSerializer(document, **sparse)
         return Response(
             {
                 "success": True,
@@ -113,3 +569,45 @@ class DocumentExtractedUpdateView(APIView):
             },
             status=status.HTTP_200_OK,
         )
+
+
+class OCRCacheStatsView(APIView):
+    """
+    GET /api/documents/ocr-cache/stats/
+
+    Hit/miss counters of the content-hash OCR cache, for monitoring.
+    """
+
+    def get(self, request, format=None):
+        return Response(
+            {"success": True, "stats": ocr_cache.stats()},
+            status=status.HTTP_200_OK,
+        )
+
+
+class OCRBackendStatsView(APIView):
+    """
+    GET /api/documents/ocr-backend/stats/?limit=500
+
+    Which OCR backend this process uses, and per-page OCR latency by
+    backend over the most recent `limit` documents (from ocr_pages).
+    """
+
+    def get(self, request, format=None):
+        try:
+            limit = min(max(int(request.query_params.get("limit", 500)), 1), 5000)
+        except ValueError:
+            return Response(
+                {"success": False, "errors": {"limit": ["Must be an integer."]}},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        recent = Document.objects.order_by("-id").values_list("ocr_pages", flat=True)[:limit]
+        return Response(
+            {
+                "success": True,
+                "backend": get_ocr_backend().name,
+                "latency": page_latency_stats(recent),
+            },
+            status=status.HTTP_200_OK,
+        )
@@ -1,9 +1,29 @@
 from django.contrib import admin
-from .models import EligibilityCheck
+from .models import EligibilityCheck, EligibilityRuleSet
+from .rule_cache import next_version
 
 
 @admin.register(EligibilityCheck)
 class EligibilityCheckAdmin(admin.ModelAdmin):
-    list_display = ("id", "document", "is_eligible", "created_at")
+    list_display = ("id", "document", "is_eligible", "rule_set", "created_at")
     list_filter = ("is_eligible", "created_at")
     search_fields = ("document__original_filename", "document__id")
+
+
+@admin.register(EligibilityRuleSet)
+class EligibilityRuleSetAdmin(admin.ModelAdmin):
+    """
+    Saving never edits a rule set in place: it adds the next version for
+    the program, so existing checks keep pointing at the rules they used.
+    """
+    list_display = ("program", "version", "min_percentage", "min_gpa", "ielts_writing", "created_at")
+    list_filter = ("program",)
+    readonly_fields = ("version", "created_at")
+
+    def save_model(self, request, obj, form, change):
+        obj.pk = None
+        obj.version = next_version(obj.program)
+        super().save_model(request, obj, form, change)
+
+    def has_delete_permission(self, request, obj=None):
+        return False
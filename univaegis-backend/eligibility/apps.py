@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class EligibilityConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'eligibility'
+
+    def ready(self):
+        # Connects the signals that clear the compiled rule cache / check LRU
+        # and keep Document.latest_eligible current
+        from . import fingerprints, latest, rule_cache  # noqa: F401
@@ -0,0 +1,176 @@
+"""
+Idempotent eligibility checks.
+
+A check is fully determined by the document's extracted_data, the IELTS
+scores and the rule set version, so re-submitting the same inputs (the
+frontend does this as users tweak the UI) returns the existing
+EligibilityCheck instead of writing a new row:
+
+- fingerprint() hashes those inputs; EligibilityCheck.fingerprint is
+  unique, so concurrent repeats can't create duplicates either;
+- recent_checks keeps the hottest fingerprints in memory, so a repeat
+  usually costs only a primary key lookup confirming the row still exists.
+"""
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .latest import refresh_latest_eligible
+from .models import EligibilityCheck
+from .rules import RuleSet
+
+
+def get_lru_size() -> int:
+    return getattr(settings, "ELIGIBILITY_CHECK_LRU_SIZE", 2048)
+
+
+def fingerprint(
+    document_id: int,
+    extracted_data: Optional[Dict[str, Any]],
+    ielts_scores: Dict[str, float],
+    rules: RuleSet,
+) -> str:
+    payload = {
+        "document": document_id,
+        # extracted_data changes (PATCH, reextract) give a new fingerprint
+        "extracted": extracted_data or {},
+        "ielts": {band: float(score) for band, score in ielts_scores.items()},
+        # Built-in defaults have no row; identify them by their thresholds
+        "rules": rules.pk if rules.pk is not None else rules.params(),
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class CheckLRU:
+    """
+    Small thread-safe LRU of fingerprint -> EligibilityCheck.
+    Checks are never modified after creation; deletes (e.g. cascading from
+    a deleted document) are dropped via post_delete in this process, and
+    find_existing() confirms hits for deletes made by other processes.
+    """
+
+    def __init__(self, maxsize: Optional[int] = None):
+        self._maxsize = maxsize
+        self._data: "OrderedDict[str, EligibilityCheck]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def maxsize(self) -> int:
+        return self._maxsize if self._maxsize is not None else get_lru_size()
+
+    def get(self, key: str) -> Optional[EligibilityCheck]:
+        with self._lock:
+            check = self._data.get(key)
+            if check is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return check
+
+    def put(self, check: EligibilityCheck) -> None:
+        with self._lock:
+            self._data[check.fingerprint] = check
+            self._data.move_to_end(check.fingerprint)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def put_many(self, checks: Iterable[EligibilityCheck]) -> None:
+        for check in checks:
+            self.put(check)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+
+recent_checks = CheckLRU()
+
+
+def find_existing(fingerprints: Iterable[str]) -> Dict[str, EligibilityCheck]:
+    """
+    Earlier checks for these fingerprints, in one query at most: the
+    misses are loaded, and LRU hits are confirmed to still exist (another
+    process may have deleted them, and its post_delete doesn't reach this
+    LRU). Found checks are (re)inserted into the LRU, gone ones dropped.
+    """
+    hits: Dict[str, EligibilityCheck] = {}
+    missing: List[str] = []
+    for fp in fingerprints:
+        check = recent_checks.get(fp)
+        if check is not None:
+            hits[fp] = check
+        else:
+            missing.append(fp)
+
+    if missing:
+        # Full rows for the misses; the hits come along in the same query
+        found = EligibilityCheck.objects.in_bulk([*missing, *hits], field_name="fingerprint")
+    elif hits:
+        alive = set(
+            EligibilityCheck.objects.filter(pk__in=[check.pk for check in hits.values()]).values_list("pk", flat=True)
+        )
+        found = {fp: check for fp, check in hits.items() if check.pk in alive}
+    else:
+        return {}
+
+    for fp in hits.keys() - found.keys():
+        recent_checks.discard(fp)
+    recent_checks.put_many(found.values())
+    return found
+
+
+def save_checks(checks: List[EligibilityCheck]) -> Dict[str, EligibilityCheck]:
+    """
+    Insert new (fingerprinted) checks with one bulk_create. If a concurrent
+    request stored some of the same fingerprints first, keep theirs.
+    Every fingerprint in `checks` is in the result.
+    """
+    if not checks:
+        return {}
+    try:
+        with transaction.atomic():
+            saved = EligibilityCheck.objects.bulk_create(checks, batch_size=1000)
+    except IntegrityError:
+        EligibilityCheck.objects.bulk_create(checks, batch_size=1000, ignore_conflicts=True)
+        stored = EligibilityCheck.objects.in_bulk([check.fingerprint for check in checks], field_name="fingerprint")
+        for check in checks:
+            if check.fingerprint not in stored:
+                # The row we conflicted with was deleted in between: store ours after all
+                stored[check.fingerprint], _ = EligibilityCheck.objects.get_or_create(
+                    fingerprint=check.fingerprint,
+                    defaults={
+                        "document_id": check.document_id,
+                        "ielts_scores": check.ielts_scores,
+                        "is_eligible": check.is_eligible,
+                        "reasons": check.reasons,
+                        "rule_set_id": check.rule_set_id,
+                    },
+                )
+        saved = stored.values()
+
+    # bulk_create sends no post_save
+    refresh_latest_eligible(check.document_id for check in saved)
+    recent_checks.put_many(saved)
+    return {check.fingerprint: check for check in saved}
+
+
+@receiver(post_delete, sender=EligibilityCheck)
+def _check_deleted(sender, instance, **kwargs):
+    if instance.fingerprint:
+        recent_checks.discard(instance.fingerprint)
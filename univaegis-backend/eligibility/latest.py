@@ -0,0 +1,38 @@
+"""
+Document.latest_eligible: the outcome of each document's newest
+EligibilityCheck, copied onto the document so GET /api/documents/?eligible=
+filters through an index instead of a per-row subquery.
+
+refresh_latest_eligible() recomputes it for the given documents from the
+(document, id) index. save_checks() calls it after its bulk_create, which
+sends no signals; single saves and deletes are covered by the receivers
+below.
+"""
+from typing import Iterable
+
+from django.db.models import OuterRef, Subquery
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from documents.models import Document
+from .models import EligibilityCheck
+
+
+def refresh_latest_eligible(document_ids: Iterable[int]) -> None:
+    document_ids = set(document_ids)
+    if not document_ids:
+        return
+    latest = EligibilityCheck.objects.filter(document=OuterRef("pk")).order_by("-id").values("is_eligible")[:1]
+    Document.objects.filter(pk__in=document_ids).update(latest_eligible=Subquery(latest))
+
+
+@receiver(post_save, sender=EligibilityCheck)
+def _check_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        refresh_latest_eligible([instance.document_id])
+
+
+@receiver(post_delete, sender=EligibilityCheck)
+def _check_deleted(sender, instance, **kwargs):
+    # A cascade from the document itself updates nothing
+    refresh_latest_eligible([instance.document_id])
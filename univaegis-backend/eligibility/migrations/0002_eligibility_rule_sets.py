@@ -0,0 +1,50 @@
+# Generated by Django 4.2.26 on 2026-10-17 02:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def seed_default_rules(apps, schema_editor):
+    # Version 1 = the thresholds that used to be hardcoded in compute_eligibility
+    EligibilityRuleSet = apps.get_model("eligibility", "EligibilityRuleSet")
+    EligibilityRuleSet.objects.get_or_create(
+        program="default",
+        version=1,
+        defaults={"notes": "Initial rules: >=80% or GPA>=8.0, IELTS >=8.0 in every band."},
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eligibility', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EligibilityRuleSet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('program', models.SlugField(default='default', help_text='Program / university these rules apply to; "default" is used for anything else.', max_length=100)),
+                ('version', models.PositiveIntegerField()),
+                ('min_percentage', models.FloatField(default=80.0)),
+                ('min_gpa', models.FloatField(default=8.0)),
+                ('ielts_listening', models.FloatField(default=8.0)),
+                ('ielts_reading', models.FloatField(default=8.0)),
+                ('ielts_writing', models.FloatField(default=8.0)),
+                ('ielts_speaking', models.FloatField(default=8.0)),
+                ('notes', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='eligibilityruleset',
+            constraint=models.UniqueConstraint(fields=('program', 'version'), name='eligibility_ruleset_version_uniq'),
+        ),
+        migrations.AddField(
+            model_name='eligibilitycheck',
+            name='rule_set',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='checks', to='eligibility.eligibilityruleset'),
+        ),
+        migrations.RunPython(seed_default_rules, migrations.RunPython.noop),
+    ]
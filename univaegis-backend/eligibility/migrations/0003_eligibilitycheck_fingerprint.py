@@ -0,0 +1,18 @@
+# Generated by Django 4.2.26 on 2026-10-17 02:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eligibility', '0002_eligibility_rule_sets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eligibilitycheck',
+            name='fingerprint',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
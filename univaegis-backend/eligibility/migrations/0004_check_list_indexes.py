@@ -0,0 +1,25 @@
+# Generated by Django 4.2.26 on 2026-10-17 02:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eligibility', '0003_eligibilitycheck_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='eligibilitycheck',
+            index=models.Index(fields=['created_at', 'id'], name='eligcheck_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eligibilitycheck',
+            index=models.Index(fields=['is_eligible', 'created_at', 'id'], name='eligcheck_outcome_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eligibilitycheck',
+            index=models.Index(fields=['document', 'id'], name='eligcheck_document_latest_idx'),
+        ),
+    ]
@@ -1,6 +1,42 @@
 from django.db import models
 
 
+class EligibilityRuleSet(models.Model):
+    """
+    One version of a program's eligibility thresholds.
+
+    Rows are never edited in place: a policy change adds the next
+    version (the admin does this on save), and the highest version of
+    each program is the one in force. Checks point at the exact row they
+    were evaluated with.
+    """
+    DEFAULT_PROGRAM = "default"
+
+    program = models.SlugField(
+        max_length=100,
+        default=DEFAULT_PROGRAM,
+        help_text='Program / university these rules apply to; "default" is used for anything else.',
+    )
+    version = models.PositiveIntegerField()
+    min_percentage = models.FloatField(default=80.0)
+    min_gpa = models.FloatField(default=8.0)
+    ielts_listening = models.FloatField(default=8.0)
+    ielts_reading = models.FloatField(default=8.0)
+    ielts_writing = models.FloatField(default=8.0)
+    ielts_speaking = models.FloatField(default=8.0)
+    notes = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["program", "version"], name="eligibility_ruleset_version_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.program} v{self.version}"
+
+
 class EligibilityCheck(models.Model):
     """
     Stores the result of running eligibility rules on a document + IELTS scores.
@@ -18,8 +54,28 @@ class EligibilityCheck(models.Model):
 
     is_eligible = models.BooleanField()
     reasons = models.JSONField(default=list)  # list of strings explaining decision
+    # Rule set version used; null for checks made with the built-in defaults
+    rule_set = models.ForeignKey(
+        EligibilityRuleSet,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="checks",
+    )
+    # SHA-256 of (document, extracted_data, ielts_scores, rule version); repeats
+    # of the same check return the existing row. Null for pre-fingerprint rows.
+    fingerprint = models.CharField(max_length=64, null=True, blank=True, unique=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of GET /api/eligibility/checks/, optionally per outcome
+            models.Index(fields=["created_at", "id"], name="eligcheck_created_idx"),
+            models.Index(fields=["is_eligible", "created_at", "id"], name="eligcheck_outcome_created_idx"),
+            # Latest check per document (ORDER BY id DESC LIMIT 1)
+            models.Index(fields=["document", "id"], name="eligcheck_document_latest_idx"),
+        ]
+
     def __str__(self):
         return f"EligibilityCheck(document_id={self.document_id}, eligible={self.is_eligible})"
@@ -0,0 +1,100 @@
+"""
+Per-process cache of compiled eligibility rule sets.
+
+Rule sets live in the DB (EligibilityRuleSet, one row per version) so
+policy changes don't need a deploy, but evaluating a check must not query
+them. Each process compiles the latest version of every program into a
+RuleSet once and serves checks from memory:
+
+- saving or deleting a rule set clears this process's cache at once
+  (post_save / post_delete);
+- other processes (gunicorn workers, ocr_worker...) reload at most every
+  ELIGIBILITY_RULES_REFRESH_SECONDS, so a version bump is picked up
+  everywhere within that interval.
+"""
+import threading
+import time
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db.models import OuterRef, Subquery
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import EligibilityRuleSet
+from .rules import DEFAULT_RULES, RuleSet
+
+_lock = threading.Lock()
+_compiled: Optional[Dict[str, RuleSet]] = None
+_loaded_at = 0.0
+
+
+def get_refresh_interval() -> float:
+    return getattr(settings, "ELIGIBILITY_RULES_REFRESH_SECONDS", 30)
+
+
+def compile_rule_set(row: EligibilityRuleSet) -> RuleSet:
+    return RuleSet(
+        min_percentage=row.min_percentage,
+        min_gpa=row.min_gpa,
+        ielts_min={
+            "listening": row.ielts_listening,
+            "reading": row.ielts_reading,
+            "writing": row.ielts_writing,
+            "speaking": row.ielts_speaking,
+        },
+        program=row.program,
+        version=row.version,
+        pk=row.pk,
+    )
+
+
+def _load() -> Dict[str, RuleSet]:
+    # Latest version of every program, in one query
+    newest = (
+        EligibilityRuleSet.objects.filter(program=OuterRef("program"))
+        .order_by("-version")
+        .values("version")[:1]
+    )
+    rows = EligibilityRuleSet.objects.filter(version=Subquery(newest))
+    return {row.program: compile_rule_set(row) for row in rows}
+
+
+def get_rules(program: Optional[str] = None) -> RuleSet:
+    """
+    Compiled rules in force for `program`, falling back to the "default"
+    program, then to the built-in thresholds if the table is empty.
+    Only touches the DB when the cache is empty or due for a refresh.
+    """
+    global _compiled, _loaded_at
+
+    compiled = _compiled
+    if compiled is None or time.monotonic() - _loaded_at > get_refresh_interval():
+        with _lock:
+            # Another thread may have reloaded while we waited
+            if _compiled is None or time.monotonic() - _loaded_at > get_refresh_interval():
+                _compiled = _load()
+                _loaded_at = time.monotonic()
+            compiled = _compiled
+
+    return (
+        compiled.get(program or EligibilityRuleSet.DEFAULT_PROGRAM)
+        or compiled.get(EligibilityRuleSet.DEFAULT_PROGRAM)
+        or DEFAULT_RULES
+    )
+
+
+def invalidate() -> None:
+    global _compiled
+    _compiled = None
+
+
+def next_version(program: str) -> int:
+    latest = EligibilityRuleSet.objects.filter(program=program).order_by("-version").values_list("version", flat=True)
+    return (latest.first() or 0) + 1
+
+
+@receiver(post_save, sender=EligibilityRuleSet)
+@receiver(post_delete, sender=EligibilityRuleSet)
+def _rule_set_changed(sender, **kwargs):
+    invalidate()
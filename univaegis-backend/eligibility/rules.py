@@ -0,0 +1,184 @@
+"""
+Eligibility rules engine.
+
+A RuleSet holds the thresholds (academic percentage / GPA and a minimum
+per IELTS band). compute_eligibility() in eligibility.utils applies one
+to a single applicant and explains the decision. For whole cohorts,
+Cohort loads everyone into NumPy arrays once; evaluate() and sweep() then
+work on vectorized masks, so "how many pass if IELTS writing were 7.5?"
+is a couple of array comparisons instead of one Python call per applicant.
+"""
+from itertools import product
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+IELTS_BANDS = ("listening", "reading", "writing", "speaking")
+
+# Sweepable parameters: "min_percentage", "min_gpa" and "ielts.<band>"
+IELTS_PARAM_PREFIX = "ielts."
+
+
+class RuleSet:
+    """
+    Thresholds for eligibility:
+      - academic: percentage >= min_percentage OR gpa >= min_gpa
+      - IELTS: every band >= its minimum
+
+    program / version / pk identify the EligibilityRuleSet row it was
+    compiled from (see eligibility.rule_cache); pk is None for the
+    built-in defaults and what-if copies.
+    """
+
+    def __init__(
+        self,
+        min_percentage: float = 80.0,
+        min_gpa: float = 8.0,
+        ielts_min: Optional[Mapping[str, float]] = None,
+        program: str = "default",
+        version: Optional[int] = None,
+        pk: Optional[int] = None,
+    ):
+        self.min_percentage = float(min_percentage)
+        self.min_gpa = float(min_gpa)
+        self.ielts_min = {band: 8.0 for band in IELTS_BANDS}
+        if ielts_min:
+            self.ielts_min.update({band: float(v) for band, v in ielts_min.items()})
+        # Band thresholds in IELTS_BANDS order, for vectorized evaluation
+        self.ielts_thresholds = np.array([self.ielts_min[band] for band in IELTS_BANDS])
+        self.program = program
+        self.version = version
+        self.pk = pk
+
+    def describe(self) -> Dict[str, Any]:
+        return {"program": self.program, "version": self.version}
+
+    def params(self) -> Dict[str, float]:
+        """
+        Flat {parameter: threshold} view, as used by sweep().
+        """
+        params = {"min_percentage": self.min_percentage, "min_gpa": self.min_gpa}
+        params.update({f"{IELTS_PARAM_PREFIX}{band}": v for band, v in self.ielts_min.items()})
+        return params
+
+    def replace(self, **params: float) -> "RuleSet":
+        """
+        Copy with some parameters (flat names, see params()) changed.
+        """
+        values = {**self.params(), **params}
+        return RuleSet(
+            values["min_percentage"],
+            values["min_gpa"],
+            {band: values[f"{IELTS_PARAM_PREFIX}{band}"] for band in IELTS_BANDS},
+            program=self.program,
+        )
+
+    def __repr__(self):
+        return f"RuleSet({self.program} v{self.version}, {self.params()})"
+
+
+DEFAULT_RULES = RuleSet()
+
+
+def _as_float(value: Any) -> float:
+    # Missing or unparseable values become NaN, which fails every >= test
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class Cohort:
+    """
+    Columnar view of many applicants: document ids, percentage, GPA and
+    an (n, 4) matrix of IELTS bands, with NaN for anything missing.
+    """
+
+    def __init__(self, document_ids: np.ndarray, percentage: np.ndarray, gpa: np.ndarray, ielts: np.ndarray):
+        self.document_ids = document_ids
+        self.percentage = percentage
+        self.gpa = gpa
+        self.ielts = ielts
+
+    def __len__(self):
+        return len(self.document_ids)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[int, Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]) -> "Cohort":
+        """
+        Build from (document_id, extracted_data, ielts_scores) rows.
+        """
+        ids: List[int] = []
+        columns: List[List[float]] = []
+        for document_id, extracted, scores in rows:
+            extracted = extracted or {}
+            scores = scores or {}
+            ids.append(document_id)
+            columns.append(
+                [_as_float(extracted.get("percentage")), _as_float(extracted.get("gpa"))]
+                + [_as_float(scores.get(band)) for band in IELTS_BANDS]
+            )
+
+        matrix = np.array(columns, dtype=np.float64).reshape(len(ids), 2 + len(IELTS_BANDS))
+        return cls(np.array(ids, dtype=np.int64), matrix[:, 0], matrix[:, 1], matrix[:, 2:])
+
+    def column(self, param: str) -> np.ndarray:
+        if param == "min_percentage":
+            return self.percentage
+        if param == "min_gpa":
+            return self.gpa
+        if param.startswith(IELTS_PARAM_PREFIX) and param[len(IELTS_PARAM_PREFIX):] in IELTS_BANDS:
+            return self.ielts[:, IELTS_BANDS.index(param[len(IELTS_PARAM_PREFIX):])]
+        raise ValueError(f"Unknown rule parameter {param!r}.")
+
+
+def evaluate(cohort: Cohort, rules: RuleSet = DEFAULT_RULES) -> np.ndarray:
+    """
+    Boolean mask of eligible applicants; same decision as compute_eligibility.
+    """
+    with np.errstate(invalid="ignore"):
+        academic = (cohort.percentage >= rules.min_percentage) | (cohort.gpa >= rules.min_gpa)
+        ielts = (cohort.ielts >= rules.ielts_thresholds).all(axis=1)
+    return academic & ielts
+
+
+def sweep(
+    cohort: Cohort,
+    grid: Mapping[str, Sequence[float]],
+    base: RuleSet = DEFAULT_RULES,
+) -> List[Dict[str, Any]]:
+    """
+    Count eligible applicants for every combination of the thresholds in
+    `grid` ({parameter: [values]}); parameters not in the grid keep
+    their `base` value.
+
+    Each (parameter, value) pass/fail column is computed once; a
+    combination is then just an OR (academic) and ANDs (IELTS) of
+    precomputed columns.
+    """
+    params = list(base.params())
+    unknown = set(grid) - set(params)
+    if unknown:
+        raise ValueError(f"Unknown rule parameter(s): {', '.join(sorted(unknown))}.")
+
+    values = {p: [float(v) for v in grid.get(p, [base.params()[p]])] for p in params}
+    with np.errstate(invalid="ignore"):
+        # passes[p] is (n, len(values[p])): applicant i passes parameter p at value j
+        passes = {p: cohort.column(p)[:, None] >= np.array(values[p])[None, :] for p in params}
+
+    ielts_params = [p for p in params if p.startswith(IELTS_PARAM_PREFIX)]
+    results = []
+    for combo in product(*(range(len(values[p])) for p in params)):
+        choice = dict(zip(params, combo))
+        mask = passes["min_percentage"][:, choice["min_percentage"]] | passes["min_gpa"][:, choice["min_gpa"]]
+        for p in ielts_params:
+            mask = mask & passes[p][:, choice[p]]
+        eligible = int(np.count_nonzero(mask))
+        results.append(
+            {
+                "thresholds": {p: values[p][choice[p]] for p in params},
+                "eligible": eligible,
+                "eligible_ratio": round(eligible / len(cohort), 4) if len(cohort) else None,
+            }
+        )
+    return results
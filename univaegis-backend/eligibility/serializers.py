@@ -1,12 +1,50 @@
+import math
+
+from django.conf import settings
 from rest_framework import serializers
+from documents.models import Document
 from .models import EligibilityCheck
+from .rules import DEFAULT_RULES, IELTS_BANDS
+
+
+def get_batch_max_checks() -> int:
+    return getattr(settings, "ELIGIBILITY_BATCH_MAX_CHECKS", 5000)
+
+
+IELTS_MIN_BAND = 0.0
+IELTS_MAX_BAND = 9.0
+
+
+def clean_band_score(value) -> float:
+    """
+    An IELTS band as a float in [0, 9]. Booleans, NaN and infinities are
+    rejected: float() accepts them, and NaN passes every threshold check.
+    """
+    if isinstance(value, bool):
+        raise ValueError("not a number")
+    score = float(value)
+    if not math.isfinite(score) or not IELTS_MIN_BAND <= score <= IELTS_MAX_BAND:
+        raise ValueError("out of range")
+    return score
+
+
+class BandScoreField(serializers.FloatField):
+    default_error_messages = {
+        "invalid": f"A number between {IELTS_MIN_BAND:g} and {IELTS_MAX_BAND:g} is required.",
+    }
+
+    def to_internal_value(self, data):
+        try:
+            return clean_band_score(data)
+        except (TypeError, ValueError):
+            self.fail("invalid")
 
 
 class IELTSScoresSerializer(serializers.Serializer):
-    listening = serializers.FloatField()
-    reading = serializers.FloatField()
-    writing = serializers.FloatField()
-    speaking = serializers.FloatField()
+    listening = BandScoreField()
+    reading = BandScoreField()
+    writing = BandScoreField()
+    speaking = BandScoreField()
 
 
 class EligibilityRequestSerializer(serializers.Serializer):
@@ -15,13 +53,112 @@ class EligibilityRequestSerializer(serializers.Serializer):
     We expect:
       - document_id: ID of uploaded Document
       - ielts_scores: IELTS band scores
+      - program: optional, whose rule set to apply ("default" otherwise)
     """
     document_id = serializers.IntegerField()
     ielts_scores = IELTSScoresSerializer()
+    program = serializers.SlugField(required=False)
+
+
+class BatchEligibilityRequestSerializer(serializers.Serializer):
+    """
+    Input serializer for batch eligibility checks:
+      - checks: list of {"document_id": int, "ielts_scores": {band: float}}
+      - program: optional rule set program, for every check
+
+    Items are validated with a plain loop instead of one nested
+    serializer per item; that keeps validating thousands of items cheap.
+    Produces the same data as EligibilityRequestSerializer, per item.
+    """
+    checks = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+    program = serializers.SlugField(required=False)
+
+    def validate_checks(self, value):
+        max_checks = get_batch_max_checks()
+        if len(value) > max_checks:
+            raise serializers.ValidationError(f"At most {max_checks} checks per request.")
+
+        cleaned = []
+        errors = {}
+        for i, item in enumerate(value):
+            try:
+                cleaned.append(self._clean_item(item))
+            except (TypeError, ValueError) as e:
+                errors[i] = [str(e)]
+        if errors:
+            raise serializers.ValidationError(errors)
+        return cleaned
+
+    @staticmethod
+    def _clean_item(item):
+        try:
+            document_id = int(item.get("document_id"))
+        except (TypeError, ValueError):
+            raise ValueError("document_id must be an integer.")
+
+        scores = item.get("ielts_scores")
+        if not isinstance(scores, dict):
+            raise ValueError("ielts_scores must be an object.")
+        ielts_scores = {}
+        for band in IELTS_BANDS:
+            try:
+                ielts_scores[band] = clean_band_score(scores[band])
+            except (KeyError, TypeError, ValueError):
+                raise ValueError(
+                    f"ielts_scores.{band} must be a number between {IELTS_MIN_BAND:g} and {IELTS_MAX_BAND:g}."
+                )
+        return {"document_id": document_id, "ielts_scores": ielts_scores}
 
 
 class EligibilityCheckSerializer(serializers.ModelSerializer):
     class Meta:
         model = EligibilityCheck
-        fields = ["id", "document", "ielts_scores", "is_eligible", "reasons", "created_at"]
+        fields = ["id", "document", "ielts_scores", "is_eligible", "reasons", "rule_set", "created_at"]
         read_only_fields = ["id", "created_at"]
+
+
+class EligibilityCheckListQuerySerializer(serializers.Serializer):
+    """
+    Filters for GET /api/eligibility/checks/ (query params; all optional).
+    """
+
+    eligible = serializers.BooleanField(required=False, allow_null=True)
+    document_id = serializers.IntegerField(required=False, min_value=1)
+    doc_type = serializers.ChoiceField(choices=Document.DOC_TYPE_CHOICES, required=False)
+    program = serializers.SlugField(required=False, max_length=100)
+
+
+def get_sweep_max_combinations() -> int:
+    return getattr(settings, "ELIGIBILITY_SWEEP_MAX_COMBINATIONS", 10000)
+
+
+class EligibilitySweepSerializer(serializers.Serializer):
+    """
+    Input serializer for a what-if threshold sweep:
+      - grid: {parameter: [threshold, ...]}, parameters being
+        "min_percentage", "min_gpa" or "ielts.<band>"
+      - document_ids: optional, restrict the cohort to these documents
+      - program: optional, whose current rule set is the baseline
+    """
+    grid = serializers.DictField(
+        child=serializers.ListField(child=serializers.FloatField(), allow_empty=False),
+        allow_empty=True,
+    )
+    document_ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    program = serializers.SlugField(required=False)
+
+    def validate_grid(self, value):
+        unknown = set(value) - set(DEFAULT_RULES.params())
+        if unknown:
+            raise serializers.ValidationError(
+                f"Unknown parameter(s): {', '.join(sorted(unknown))}. "
+                f"Use: {', '.join(DEFAULT_RULES.params())}."
+            )
+        size = 1
+        for values in value.values():
+            size *= len(values)
+        if size > get_sweep_max_combinations():
+            raise serializers.ValidationError(
+                f"Grid has {size} combinations, above the limit of {get_sweep_max_combinations()}."
+            )
+        return value
@@ -1,3 +1,313 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from documents.models import Document
+from . import rule_cache
+from .fingerprints import recent_checks, save_checks
+from .models import EligibilityCheck, EligibilityRuleSet
+from .rules import DEFAULT_RULES, IELTS_BANDS, Cohort, RuleSet, evaluate, sweep
+from .utils import compute_eligibility
+
+GOOD_SCORES = {"listening": 8.0, "reading": 8.5, "writing": 8.0, "speaking": 8.0}
+
+
+def make_document(doc_type="academic", **extracted):
+    return Document.objects.create(file="documents/x.png", doc_type=doc_type, extracted_data=extracted or None)
+
+
+class EligibilityCheckViewTests(TestCase):
+    def setUp(self):
+        # Both caches are per process; don't leak rows from rolled-back tests
+        rule_cache.invalidate()
+        recent_checks.clear()
+        self.addCleanup(rule_cache.invalidate)
+        self.addCleanup(recent_checks.clear)
+
+    def test_single_check(self):
+        document = make_document(percentage=85.0)
+
+        response = self.client.post(
+            reverse("eligibility-check"),
+            {"document_id": document.pk, "ielts_scores": GOOD_SCORES},
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["eligible"])
+        self.assertEqual(EligibilityCheck.objects.count(), 1)
+
+    def test_batch_check_loads_and_writes_in_bulk(self):
+        good = make_document(percentage=85.0)
+        low = make_document(gpa=7.0)
+        financial = make_document("financial", bank_name="HDFC Bank")
+        checks = [
+            {"document_id": good.pk, "ielts_scores": GOOD_SCORES},
+            {"document_id": low.pk, "ielts_scores": GOOD_SCORES},
+            {"document_id": financial.pk, "ielts_scores": GOOD_SCORES},
+            {"document_id": 999999, "ielts_scores": GOOD_SCORES},
+            {"document_id": good.pk, "ielts_scores": {**GOOD_SCORES, "writing": 7.5}},
+        ]
+
+        rule_cache.get_rules()
+        # documents in_bulk + existing fingerprints + one INSERT (in a savepoint) + one
+        # UPDATE of Document.latest_eligible, whatever the batch size; rules are cached
+        with self.assertNumQueries(6):
+            response = self.client.post(
+                reverse("eligibility-batch-check"), {"checks": checks}, content_type="application/json"
+            )
+
+        self.assertEqual(response.status_code, 200)
+        results = response.data["results"]
+        self.assertEqual([r["success"] for r in results], [True, True, False, False, True])
+        self.assertEqual([r["eligible"] for r in results], [True, False, False, False, False])
+        self.assertEqual(results[3]["reasons"], ["Document not found."])
+        self.assertEqual(response.data["summary"], {"total": 5, "eligible": 1, "ineligible": 2, "errors": 2})
+        self.assertEqual(
+            set(EligibilityCheck.objects.values_list("id", flat=True)),
+            {r["check_id"] for r in results if r["success"]},
+        )
+
+    def test_repeated_check_reuses_existing_row(self):
+        document = make_document(percentage=85.0)
+        payload = {"document_id": document.pk, "ielts_scores": GOOD_SCORES}
+        first = self.client.post(reverse("eligibility-check"), payload, content_type="application/json")
+
+        # the document, and the LRU hit confirmed by primary key
+        with self.assertNumQueries(2):
+            second = self.client.post(reverse("eligibility-check"), payload, content_type="application/json")
+
+        self.assertEqual((first.data["reused"], second.data["reused"]), (False, True))
+        self.assertEqual(second.data["check"]["id"], first.data["check"]["id"])
+
+        # without the LRU, the unique fingerprint still finds it
+        recent_checks.clear()
+        third = self.client.post(reverse("eligibility-check"), payload, content_type="application/json")
+        self.assertEqual(third.data["check"]["id"], first.data["check"]["id"])
+
+        # new extracted data is a new check
+        document.extracted_data = {"percentage": 70.0}
+        document.save()
+        fourth = self.client.post(reverse("eligibility-check"), payload, content_type="application/json")
+        self.assertFalse(fourth.data["reused"])
+        self.assertEqual(EligibilityCheck.objects.count(), 2)
+
+    def test_lru_hit_deleted_by_another_process_is_recomputed(self):
+        document = make_document(percentage=85.0)
+        payload = {"document_id": document.pk, "ielts_scores": GOOD_SCORES}
+        first = self.client.post(reverse("eligibility-check"), payload, content_type="application/json")
+        # Deleted without this process's post_delete seeing it
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {EligibilityCheck._meta.db_table}")
+
+        second = self.client.post(reverse("eligibility-check"), payload, content_type="application/json")
+
+        self.assertFalse(second.data["reused"])
+        self.assertNotEqual(second.data["check"]["id"], first.data["check"]["id"])
+        self.assertTrue(EligibilityCheck.objects.filter(pk=second.data["check"]["id"]).exists())
+
+    def test_save_checks_stores_fingerprints_whose_conflicting_row_vanished(self):
+        document = make_document(percentage=85.0)
+        existing = EligibilityCheck.objects.create(
+            document=document, ielts_scores={}, is_eligible=True, fingerprint="a"
+        )
+        checks = [
+            EligibilityCheck(document=document, ielts_scores={}, is_eligible=False, fingerprint=fp) for fp in "ab"
+        ]
+
+        # "a" conflicts, then isn't found by the re-fetch, as if deleted in between
+        with mock.patch.object(EligibilityCheck.objects, "in_bulk", return_value={}):
+            saved = save_checks(checks)
+
+        self.assertEqual(set(saved), {"a", "b"})
+        self.assertEqual(saved["a"].pk, existing.pk)
+        self.assertEqual(EligibilityCheck.objects.count(), 2)
+
+    def test_batch_check_reuses_and_dedupes(self):
+        document = make_document(percentage=85.0)
+        checks = [{"document_id": document.pk, "ielts_scores": GOOD_SCORES}] * 3
+        url = reverse("eligibility-batch-check")
+
+        first = self.client.post(url, {"checks": checks}, content_type="application/json")
+        second = self.client.post(url, {"checks": checks}, content_type="application/json")
+
+        self.assertEqual(EligibilityCheck.objects.count(), 1)
+        self.assertEqual([r["reused"] for r in first.data["results"]], [False] * 3)
+        self.assertEqual([r["reused"] for r in second.data["results"]], [True] * 3)
+        self.assertEqual(len({r["check_id"] for r in first.data["results"] + second.data["results"]}), 1)
+
+    def test_check_list_is_filtered_and_paginated(self):
+        academic, financial = make_document(percentage=85.0), make_document("financial")
+        checks = [
+            EligibilityCheck.objects.create(document=document, ielts_scores={}, is_eligible=eligible)
+            for document, eligible in [(academic, True), (academic, False), (financial, False), (academic, False)]
+        ]
+
+        url = reverse("eligibility-check-list")
+        first = self.client.get(url, {"eligible": "false", "page_size": 2})
+        second = self.client.get(url, {"eligible": "false", "page_size": 2, "cursor": first.data["next_cursor"]})
+
+        ids = [c["id"] for c in first.data["results"] + second.data["results"]]
+        self.assertEqual(ids, [checks[3].pk, checks[2].pk, checks[1].pk])
+        self.assertIsNone(second.data["next_cursor"])
+
+        response = self.client.get(url, {"doc_type": "academic", "eligible": "true"})
+        self.assertEqual([c["id"] for c in response.data["results"]], [checks[0].pk])
+
+    def test_batch_check_reports_invalid_items_by_index(self):
+        checks = [
+            {"document_id": 1, "ielts_scores": GOOD_SCORES},
+            {"document_id": "x", "ielts_scores": GOOD_SCORES},
+            {"document_id": 1, "ielts_scores": {"listening": 8.0}},
+        ]
+
+        response = self.client.post(
+            reverse("eligibility-batch-check"), {"checks": checks}, content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(sorted(response.data["errors"]["checks"]), [1, 2])
+
+    def test_non_finite_and_boolean_scores_are_rejected(self):
+        document = make_document(percentage=85.0)
+        # Bare NaN/Infinity tokens are already refused by DRF's strict JSON parser
+        bad_values = ["nan", "NaN", "inf", "-Infinity", True, False, 9.5]
+        checks = [
+            {"document_id": document.pk, "ielts_scores": {**GOOD_SCORES, "listening": value}}
+            for value in bad_values
+        ]
+
+        response = self.client.post(
+            reverse("eligibility-batch-check"), {"checks": checks}, content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(sorted(response.data["errors"]["checks"]), list(range(len(bad_values))))
+
+        for value in bad_values:
+            response = self.client.post(
+                reverse("eligibility-check"),
+                {"document_id": document.pk, "ielts_scores": {**GOOD_SCORES, "listening": value}},
+                content_type="application/json",
+            )
+            self.assertEqual(response.status_code, 400, value)
+        self.assertFalse(EligibilityCheck.objects.exists())
+
+
+class RulesEngineTests(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.rows = []
+        for i in range(300):
+            if i % 3:
+                extracted = {"percentage": float(rng.integers(60, 100))}
+            else:
+                extracted = {"gpa": float(rng.integers(60, 100)) / 10}
+            scores = {band: float(rng.choice([6.5, 7.0, 7.5, 8.0, 8.5])) for band in IELTS_BANDS}
+            if i % 50 == 0:
+                extracted = {}
+            self.rows.append((i, extracted, scores))
+        self.cohort = Cohort.from_rows(self.rows)
+
+    def test_vectorized_matches_row_by_row(self):
+        rules = RuleSet(min_percentage=75, ielts_min={"writing": 7.0})
+
+        mask = evaluate(self.cohort, rules)
+
+        expected = [compute_eligibility(extracted, scores, rules)[0] for _, extracted, scores in self.rows]
+        self.assertEqual(mask.tolist(), expected)
+
+    def test_sweep_counts_every_combination(self):
+        grid = {"ielts.writing": [7.0, 7.5, 8.0], "min_percentage": [75, 80]}
+
+        results = sweep(self.cohort, grid)
+
+        self.assertEqual(len(results), 6)
+        for result in results:
+            rules = DEFAULT_RULES.replace(**result["thresholds"])
+            self.assertEqual(result["eligible"], int(evaluate(self.cohort, rules).sum()))
+
+    def test_sweep_endpoint_uses_latest_check_per_document(self):
+        document = make_document(percentage=85.0)
+        EligibilityCheck.objects.create(
+            document=document, ielts_scores={**GOOD_SCORES, "writing": 6.0}, is_eligible=False, reasons=[]
+        )
+        EligibilityCheck.objects.create(
+            document=document, ielts_scores={**GOOD_SCORES, "writing": 7.5}, is_eligible=False, reasons=[]
+        )
+
+        response = self.client.post(
+            reverse("eligibility-sweep"), {"grid": {"ielts.writing": [7.0, 7.5, 8.0]}}, content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["cohort_size"], 1)
+        self.assertEqual(response.data["baseline"]["eligible"], 0)
+        self.assertEqual([r["eligible"] for r in response.data["results"]], [1, 1, 0])
+
+    def test_sweep_rejects_unknown_parameters(self):
+        response = self.client.post(
+            reverse("eligibility-sweep"), {"grid": {"ielts.cooking": [7.0]}}, content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+
+class RuleSetCacheTests(TestCase):
+    def setUp(self):
+        # The caches are per process; don't leak rows from rolled-back tests
+        rule_cache.invalidate()
+        recent_checks.clear()
+        self.addCleanup(rule_cache.invalidate)
+        self.addCleanup(recent_checks.clear)
+
+    def check(self, document, **extra):
+        return self.client.post(
+            reverse("eligibility-check"),
+            {"document_id": document.pk, "ielts_scores": {**GOOD_SCORES, "writing": 7.5}, **extra},
+            content_type="application/json",
+        )
+
+    def test_check_records_rule_version_and_follows_version_bumps(self):
+        document = make_document(percentage=85.0)
+
+        first = self.check(document)
+        self.assertFalse(first.data["eligible"])
+        self.assertEqual(first.data["rule_set"], {"program": "default", "version": 1})
+
+        EligibilityRuleSet.objects.create(
+            program="default", version=rule_cache.next_version("default"), ielts_writing=7.5
+        )
+        second = self.check(document)
+
+        self.assertTrue(second.data["eligible"])
+        self.assertEqual(second.data["rule_set"], {"program": "default", "version": 2})
+        self.assertEqual(
+            list(EligibilityCheck.objects.order_by("id").values_list("rule_set__version", flat=True)), [1, 2]
+        )
+
+    def test_program_rules_with_default_fallback(self):
+        EligibilityRuleSet.objects.create(program="mba", version=1, min_percentage=60, ielts_writing=7.0)
+        document = make_document(percentage=65.0)
+
+        self.assertTrue(self.check(document, program="mba").data["eligible"])
+        unknown = self.check(document, program="unknown-program")
+        self.assertEqual(unknown.data["rule_set"], {"program": "default", "version": 1})
+
+    def test_hot_path_does_not_query_rules(self):
+        rule_cache.get_rules()
+
+        with self.assertNumQueries(0):
+            rules = rule_cache.get_rules("default")
+        self.assertEqual(rules.version, 1)
+
+    @override_settings(ELIGIBILITY_RULES_REFRESH_SECONDS=0)
+    def test_other_processes_pick_up_changes_after_refresh_interval(self):
+        rule_cache.get_rules()
+        # Bypass signals, as a change made by another process would
+        EligibilityRuleSet.objects.bulk_create([EligibilityRuleSet(program="default", version=2, min_gpa=7.0)])
+
+        self.assertEqual(rule_cache.get_rules().version, 2)
@@ -1,6 +1,9 @@
 from django.urls import path
-from .views import EligibilityCheckView
+from .views import EligibilityCheckView, EligibilityBatchCheckView, EligibilityCheckListView, EligibilitySweepView
 
 urlpatterns = [
     path("check/", EligibilityCheckView.as_view(), name="eligibility-check"),
+    path("batch-check/", EligibilityBatchCheckView.as_view(), name="eligibility-batch-check"),
+    path("checks/", EligibilityCheckListView.as_view(), name="eligibility-check-list"),
+    path("sweep/", EligibilitySweepView.as_view(), name="eligibility-sweep"),
 ]
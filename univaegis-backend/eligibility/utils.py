@@ -1,11 +1,23 @@
-from typing import Dict, Any, Tuple, List
+from typing import Dict, Any, Optional, Tuple, List
 
+from core.metrics import timed
 
-def compute_eligibility(extracted_data: Dict[str, Any], ielts_scores: Dict[str, float]) -> Tuple[bool, List[str]]:
+from .rules import DEFAULT_RULES, IELTS_BANDS, Cohort, RuleSet
+
+
+@timed("eligibility")
+def compute_eligibility(
+    extracted_data: Dict[str, Any],
+    ielts_scores: Dict[str, float],
+    rules: RuleSet = DEFAULT_RULES,
+) -> Tuple[bool, List[str]]:
     """
     Compute eligibility based on:
       - extracted academic data (percentage or GPA)
       - IELTS scores (listening, reading, writing, speaking)
+    against the thresholds in `rules` (80% / GPA 8.0 / 8.0 per band by default).
+
+    For many applicants at once, see eligibility.rules.evaluate().
 
     Returns:
       (is_eligible: bool, reasons: list of strings)
@@ -22,26 +34,66 @@ def compute_eligibility(extracted_data: Dict[str, Any], ielts_scores: Dict[str,
         eligible = False
         reasons.append("No percentage or GPA found in the document.")
     else:
-        # Apply academic rule: >=80% OR GPA >=8.0
+        # Apply academic rule: >= min percentage OR GPA >= min GPA
         academic_ok = False
-        if percentage is not None and percentage >= 80.0:
+        if percentage is not None and percentage >= rules.min_percentage:
             academic_ok = True
-        if gpa is not None and gpa >= 8.0:
+        if gpa is not None and gpa >= rules.min_gpa:
             academic_ok = True
 
         if not academic_ok:
             eligible = False
-            reasons.append("Academic score below threshold (need >=80% or GPA>=8.0).")
+            reasons.append(
+                f"Academic score below threshold (need >={rules.min_percentage:g}% or GPA>={rules.min_gpa})."
+            )
 
     # 2) IELTS rules
-    required_bands = ["listening", "reading", "writing", "speaking"]
-    for band in required_bands:
+    for band in IELTS_BANDS:
         val = ielts_scores.get(band)
+        minimum = rules.ielts_min[band]
         if val is None:
             eligible = False
             reasons.append(f"IELTS {band} score is missing.")
-        elif val < 8.0:
+        elif val < minimum:
             eligible = False
-            reasons.append(f"IELTS {band} below 8.0 (got {val}).")
+            reasons.append(f"IELTS {band} below {minimum} (got {val}).")
 
     return eligible, reasons
+
+
+def document_error(doc_type: str, extracted_data: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    Why a document can't be evaluated, or None if it can.
+    """
+    if not extracted_data:
+        return "No extracted data available for this document."
+    # Eligibility rules apply to academic documents only
+    if doc_type != "academic":
+        return "Eligibility rules are defined only for academic documents."
+    return None
+
+
+def load_cohort(document_ids: Optional[List[int]] = None) -> Cohort:
+    """
+    The screened cohort: every academic document with its extracted data
+    and the IELTS scores of its most recent eligibility check.
+    Streams one row per check, newest first, keeping the first per document.
+    """
+    from .models import EligibilityCheck
+
+    checks = EligibilityCheck.objects.filter(document__doc_type="academic")
+    if document_ids is not None:
+        checks = checks.filter(document_id__in=document_ids)
+    # The typed percentage / gpa columns, not the whole extracted_data JSON
+    rows = checks.order_by("document_id", "-id").values_list(
+        "document_id", "document__percentage", "document__gpa", "ielts_scores"
+    )
+
+    def latest_per_document():
+        previous = None
+        for document_id, percentage, gpa, scores in rows.iterator(chunk_size=2000):
+            if document_id != previous:
+                previous = document_id
+                yield document_id, {"percentage": percentage, "gpa": gpa}, scores
+
+    return Cohort.from_rows(latest_per_document())
@@ -1,13 +1,23 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status
+from rest_framework import serializers, status
 
 from django.shortcuts import get_object_or_404
 
+from core.pagination import KeysetPagination
 from documents.models import Document
 from .models import EligibilityCheck
-from .serializers import EligibilityRequestSerializer, EligibilityCheckSerializer
-from .utils import compute_eligibility
+from .serializers import (
+    BatchEligibilityRequestSerializer,
+    EligibilityRequestSerializer,
+    EligibilityCheckSerializer,
+    EligibilityCheckListQuerySerializer,
+    EligibilitySweepSerializer,
+)
+from .rules import evaluate, sweep
+from .rule_cache import get_rules
+from .utils import compute_eligibility, document_error, load_cohort
+from .fingerprints import find_existing, fingerprint, save_checks
 
 
 class EligibilityCheckView(APIView):
@@ -22,7 +32,8 @@ class EligibilityCheckView(APIView):
         "reading": 8.5,
         "writing": 8.0,
         "speaking": 8.0
-      }
+      },
+      "program": "default"          # optional
     }
 
     Response:
@@ -32,8 +43,13 @@ class EligibilityCheckView(APIView):
       "reasons": [],
       "document_id": 6,
       "ielts_scores": {...},
+      "rule_set": {"program": "default", "version": 3},
+      "reused": false,
       "check": { ... saved EligibilityCheck data ... }
     }
+
+    Checks are idempotent: the same document data, scores and rule
+    version return the existing check ("reused": true) without a write.
     """
 
     def post(self, request, format=None):
@@ -50,53 +66,252 @@ class EligibilityCheckView(APIView):
         ielts_scores = data["ielts_scores"]
 
         # 2) Load Document from DB
-        document = get_object_or_404(Document, pk=document_id)
+        document = get_object_or_404(Document.objects.only("id", "doc_type", "extracted_data"), pk=document_id)
 
-        # Ensure we have extracted_data from OCR step
+        # Ensure we have extracted_data from OCR step, for an academic document
         extracted_data = document.extracted_data or {}
-        if not extracted_data:
+        error = document_error(document.doc_type, extracted_data)
+        if error:
             return Response(
                 {
                     "success": False,
                     "eligible": False,
-                    "reasons": ["No extracted data available for this document."],
+                    "reasons": [error],
                 },
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Optionally, ensure it's academic doc, since eligibility rules apply to academics
-        if document.doc_type != "academic":
-            # We don't strictly have to block, but it's clearer for this assignment
-            return Response(
-                {
-                    "success": False,
-                    "eligible": False,
-                    "reasons": ["Eligibility rules are defined only for academic documents."],
-                },
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        # 3) Same inputs as an earlier check? Return that one instead of writing a new row
+        rules = get_rules(data.get("program"))
+        fp = fingerprint(document.id, extracted_data, ielts_scores, rules)
+        eligibility_check = find_existing([fp]).get(fp)
+        reused = eligibility_check is not None
 
-        # 3) Compute eligibility
-        is_eligible, reasons = compute_eligibility(extracted_data, ielts_scores)
+        if eligibility_check is None:
+            # 4) Compute eligibility (rules come from the in-process cache, no query)
+            is_eligible, reasons = compute_eligibility(extracted_data, ielts_scores, rules)
 
-        # 4) Save record to DB
-        eligibility_check = EligibilityCheck.objects.create(
-            document=document,
-            ielts_scores=ielts_scores,
-            is_eligible=is_eligible,
-            reasons=reasons,
-        )
+            # 5) Save record to DB
+            eligibility_check = save_checks(
+                [
+                    EligibilityCheck(
+                        document=document,
+                        ielts_scores=ielts_scores,
+                        is_eligible=is_eligible,
+                        reasons=reasons,
+                        rule_set_id=rules.pk,
+                        fingerprint=fp,
+                    )
+                ]
+            )[fp]
 
         check_serializer = EligibilityCheckSerializer(eligibility_check)
 
-        # 5) Build response
+        # 6) Build response
         response_data = {
             "success": True,
-            "eligible": is_eligible,
-            "reasons": reasons,
+            "eligible": eligibility_check.is_eligible,
+            "reasons": eligibility_check.reasons,
             "document_id": document.id,
             "ielts_scores": ielts_scores,
+            "rule_set": rules.describe(),
+            "reused": reused,
             "check": check_serializer.data,
         }
 
         return Response(response_data, status=status.HTTP_200_OK)
+
+
+class EligibilityBatchCheckView(APIView):
+    """
+    POST /api/eligibility/batch-check/
+
+    Request body:
+    {
+      "checks": [
+        {"document_id": 6, "ielts_scores": {"listening": 8.0, ...}},
+        ...
+      ]
+    }
+
+    Evaluates every pair in one go: documents are loaded with a single
+    in_bulk query and the EligibilityCheck rows written with one
+    bulk_create. Pairs whose document is missing or can't be evaluated
+    get an error entry instead of failing the whole batch. Pairs already
+    checked with the same data and rule version reuse that check.
+
+    Response:
+    {
+      "success": true,
+      "rule_set": {"program": "default", "version": 3},
+      "results": [
+        {"document_id": 6, "success": true, "eligible": true, "reasons": [], "check_id": 41, "reused": false},
+        {"document_id": 7, "success": false, "eligible": false, "reasons": ["Document not found."]},
+        ...
+      ],
+      "summary": {"total": 2, "eligible": 1, "ineligible": 0, "errors": 1}
+    }
+    """
+
+    def post(self, request, format=None):
+        serializer = BatchEligibilityRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                {"success": False, "errors": serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        checks = serializer.validated_data["checks"]
+        rules = get_rules(serializer.validated_data.get("program"))
+
+        # 1) One query for every document in the batch
+        documents = Document.objects.only("id", "doc_type", "extracted_data").in_bulk(
+            {item["document_id"] for item in checks}
+        )
+
+        # 2) Fingerprint every check; earlier identical checks are reused (LRU, then one query)
+        results = []
+        fingerprints = []
+        for item in checks:
+            document = documents.get(item["document_id"])
+            error = "Document not found." if document is None else document_error(
+                document.doc_type, document.extracted_data
+            )
+            if error:
+                results.append(
+                    {"document_id": item["document_id"], "success": False, "eligible": False, "reasons": [error]}
+                )
+                fingerprints.append(None)
+                continue
+            results.append({"document_id": document.id, "success": True})
+            fingerprints.append(fingerprint(document.id, document.extracted_data, item["ielts_scores"], rules))
+
+        existing = find_existing(fp for fp in fingerprints if fp)
+
+        # 3) Evaluate the rest in memory, each distinct fingerprint once
+        to_create = {}
+        for item, fp in zip(checks, fingerprints):
+            if fp is None or fp in existing or fp in to_create:
+                continue
+            document = documents[item["document_id"]]
+            is_eligible, reasons = compute_eligibility(document.extracted_data, item["ielts_scores"], rules)
+            to_create[fp] = EligibilityCheck(
+                document_id=document.id,
+                ielts_scores=item["ielts_scores"],
+                is_eligible=is_eligible,
+                reasons=reasons,
+                rule_set_id=rules.pk,
+                fingerprint=fp,
+            )
+
+        # 4) One INSERT for all new results
+        created = save_checks(list(to_create.values()))
+        for result, fp in zip(results, fingerprints):
+            if fp is None:
+                continue
+            check = existing.get(fp) or created[fp]
+            result.update(
+                {
+                    "eligible": check.is_eligible,
+                    "reasons": check.reasons,
+                    "check_id": check.id,
+                    "reused": fp in existing,
+                }
+            )
+
+        eligible = sum(1 for r in results if r["success"] and r["eligible"])
+        errors = sum(1 for r in results if not r["success"])
+        response_data = {
+            "success": True,
+            "rule_set": rules.describe(),
+            "results": results,
+            "summary": {
+                "total": len(results),
+                "eligible": eligible,
+                "ineligible": len(results) - eligible - errors,
+                "errors": errors,
+            },
+        }
+        return Response(response_data, status=status.HTTP_200_OK)
+
+
+class EligibilitySweepView(APIView):
+    """
+    POST /api/eligibility/sweep/
+
+    What-if analysis: how many screened applicants (latest check per
+    academic document) would pass under each combination of thresholds.
+
+    Request body:
+    {
+      "grid": {"ielts.writing": [7.0, 7.5, 8.0], "min_percentage": [75, 80]},
+      "document_ids": [1, 2, 3],         # optional
+      "program": "default"               # optional, baseline rule set
+    }
+
+    Response:
+    {
+      "success": true,
+      "cohort_size": 1200,
+      "baseline": {"rule_set": {...}, "thresholds": {...current rules...}, "eligible": 310},
+      "results": [{"thresholds": {...}, "eligible": 412, "eligible_ratio": 0.3433}, ...]
+    }
+
+    Nothing is written; the cohort is evaluated as NumPy masks.
+    """
+
+    def post(self, request, format=None):
+        serializer = EligibilitySweepSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                {"success": False, "errors": serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        data = serializer.validated_data
+        rules = get_rules(data.get("program"))
+        cohort = load_cohort(data.get("document_ids"))
+
+        response_data = {
+            "success": True,
+            "cohort_size": len(cohort),
+            "baseline": {
+                "rule_set": rules.describe(),
+                "thresholds": rules.params(),
+                "eligible": int(evaluate(cohort, rules).sum()),
+            },
+            "results": sweep(cohort, data["grid"], rules),
+        }
+        return Response(response_data, status=status.HTTP_200_OK)
+
+
+class EligibilityCheckListView(APIView):
+    """
+    GET /api/eligibility/checks/?eligible=false&doc_type=academic&document_id=6&program=default&cursor=...
+
+    Newest checks first, keyset-paginated on (created_at, id) like
+    GET /api/documents/.
+    """
+
+    def get(self, request, format=None):
+        query = EligibilityCheckListQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response({"success": False, "errors": query.errors}, status=status.HTTP_400_BAD_REQUEST)
+        filters = query.validated_data
+
+        checks = EligibilityCheck.objects.all()
+        if filters.get("eligible") is not None:
+            checks = checks.filter(is_eligible=filters["eligible"])
+        if filters.get("document_id"):
+            checks = checks.filter(document_id=filters["document_id"])
+        if filters.get("doc_type"):
+            checks = checks.filter(document__doc_type=filters["doc_type"])
+        if filters.get("program"):
+            checks = checks.filter(rule_set__program=filters["program"])
+
+        paginator = KeysetPagination("created_at")
+        try:
+            page = paginator.paginate_queryset(checks, request)
+        except serializers.ValidationError as e:
+            return Response({"success": False, "errors": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        return paginator.get_paginated_response(EligibilityCheckSerializer(page, many=True).data)
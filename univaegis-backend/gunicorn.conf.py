@@ -0,0 +1,20 @@
+"""
+Gunicorn settings picked up automatically from the working directory.
+Command-line flags and GUNICORN_CMD_ARGS still override anything here.
+"""
+bind = "0.0.0.0:8080"
+# Size with `manage.py loadtest`; override with GUNICORN_CMD_ARGS="--workers=N --threads=M"
+workers = 3
+
+
+def on_starting(server):
+    # Prometheus multi-process files from a previous run would be merged into /metrics
+    from core.metrics import reset_multiprocess_dir
+
+    reset_multiprocess_dir()
+
+
+def child_exit(server, worker):
+    from core.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid)
@@ -19,6 +19,22 @@ import CancelIcon from "@mui/icons-material/Cancel";
 import axios from "axios";
 
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL;
+const JOB_POLL_INTERVAL_MS = 1000;
+
+// Upload returns 202 + an OCR job; poll until the worker has finished it
+const waitForOcrJob = async (jobId) => {
+  for (;;) {
+    const response = await axios.get(`${API_BASE_URL}/documents/jobs/${jobId}/`);
+    const data = response.data;
+    if (data.job.status === "done") {
+      return data;
+    }
+    if (data.job.status === "failed") {
+      throw new Error(data.job.error || "OCR job failed.");
+    }
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+  }
+};
 
 function App() {
   // Upload state
@@ -91,7 +107,10 @@ function App() {
         }
       );
 
-      const data = response.data;
+      let data = response.data;
+      if (data.success && data.job) {
+        data = await waitForOcrJob(data.job.id);
+      }
       if (data.success) {
         setDocumentData(data.document);
         const extracted = data.extracted || data.document.extracted_data || null;
@@ -117,6 +136,8 @@ function App() {
         setUploadError(
           `Upload failed: ${JSON.stringify(error.response.data)}`
         );
+      } else if (error.message) {
+        setUploadError(`Upload failed: ${error.message}`);
       } else {
         setUploadError("Upload failed due to a network or server error.");
       }
@@ -257,7 +278,10 @@ function App() {
         payload
       );
 
-      const data = response.data;
+      let data = response.data;
+      if (data.success && data.job) {
+        data = await waitForOcrJob(data.job.id);
+      }
       if (data.success) {
         setDocumentData(data.document);
         setExtractedData(data.document.extracted_data);